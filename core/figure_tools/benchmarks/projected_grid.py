@@ -0,0 +1,54 @@
+"""Compares rendering a four-panel radiation decomposition figure with cartopy
+projecting every contour path and with contours drawn on the cached projected grid.
+
+Usage:
+    python projected_grid.py [--nlat 180] [--nlon 288] [--repeat 3]
+"""
+from argparse import ArgumentParser
+from time import perf_counter
+
+from numpy import arange, cos, linspace, meshgrid, radians, random, sin
+
+from figure_tools import LonLatMap, radiation_decomposition, Renderer
+
+
+def synthetic_maps(nlat, nlon):
+    """Creates four smooth, noisy longitude-latitude maps."""
+    latitude = linspace(-90. + 90./nlat, 90. - 90./nlat, nlat)
+    longitude = arange(nlon)*360./nlon
+    x, y = meshgrid(radians(longitude), radians(latitude))
+    maps = []
+    for i in range(4):
+        data = 240.*cos(y) + 20.*sin((i + 2)*x) + random.random(x.shape)
+        maps.append(LonLatMap(data, longitude, latitude, units="W m-2"))
+    return maps
+
+
+def render_time(renderer, spec, repeat):
+    """Returns the fastest time to draw and encode a figure."""
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        renderer.image(spec)
+        times.append(perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--nlat", type=int, default=180)
+    parser.add_argument("--nlon", type=int, default=288)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    spec = radiation_decomposition(*synthetic_maps(args.nlat, args.nlon), "OLR")
+    projected = render_time(Renderer(project_grids=False), spec, args.repeat)
+    cached = render_time(Renderer(project_grids=True), spec, args.repeat)
+
+    print(f"4 panels, {args.nlat}x{args.nlon} grid")
+    print(f"projected contour paths:  {projected:8.3f} s")
+    print(f"cached projected grid:    {cached:8.3f} s")
+
+
+if __name__ == "__main__":
+    main()
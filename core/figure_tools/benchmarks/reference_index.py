@@ -0,0 +1,106 @@
+"""Compares cold opens of a synthetic timeseries archive with and without a reference index.
+
+Each open runs in a fresh python process so that nothing is cached by xarray, netCDF4
+or HDF5 between runs (the operating system's page cache is not cleared).
+
+Usage:
+    python reference_index.py [--files 120] [--nlat 180] [--nlon 288] [--repeat 3]
+"""
+from argparse import ArgumentParser
+from pathlib import Path
+from subprocess import run
+import sys
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from numpy import arange, float32, linspace, random
+from pandas import DataFrame
+from xarray import Dataset
+
+from figure_tools import build_reference_index
+
+
+_open_script = """
+from time import perf_counter
+import pandas
+from figure_tools import LonLatMap, open_variable_dataset
+start = perf_counter()
+dataset = open_variable_dataset(pandas.read_csv("{catalog}"), "olr", {options})
+map_ = LonLatMap.from_xarray_dataset(dataset, "olr", time_method="annual mean",
+                                     year={year})
+print(perf_counter() - start)
+"""
+
+
+def create_archive(directory, num_files, nlat, nlon):
+    """Writes one year of monthly data per file, GFDL timeseries style.
+
+    Returns:
+        Path to a csv catalog of the files.
+    """
+    latitude = linspace(-89.5, 89.5, nlat)
+    longitude = arange(nlon)*360./nlon
+    rows = []
+    for i in range(num_files):
+        year = 1 + i
+        time = 365.*i + arange(12)*365./12. + 15.
+        dataset = Dataset(
+            {
+                "olr": (["time", "lat", "lon"],
+                        random.random((12, nlat, nlon)).astype(float32),
+                        {"units": "W m-2"}),
+            },
+            coords={
+                "time": ("time", time, {"axis": "T", "calendar": "noleap",
+                                        "units": "days since 0001-01-01 00:00:00"}),
+                "lat": ("lat", latitude, {"axis": "Y", "units": "degrees_north"}),
+                "lon": ("lon", longitude, {"axis": "X", "units": "degrees_east"}),
+            },
+        )
+        path = Path(directory) / f"atmos.{year:04d}01-{year:04d}12.olr.nc"
+        dataset.to_netcdf(path)
+        rows.append({"realm": "atmos", "frequency": "mon", "variable_id": "olr",
+                     "time_range": f"{year:04d}01-{year:04d}12", "path": str(path)})
+    catalog = Path(directory) / "catalog.csv"
+    DataFrame(rows).to_csv(catalog, index=False)
+    return catalog
+
+
+def cold_open(catalog, year, options="", repeat=3):
+    """Returns the fastest time to open the archive and make an annual mean map."""
+    script = _open_script.format(catalog=catalog, options=options, year=year)
+    times = []
+    for _ in range(repeat):
+        output = run([sys.executable, "-c", script], capture_output=True, check=True,
+                     text=True)
+        times.append(float(output.stdout.split()[-1]))
+    return min(times)
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--files", type=int, default=120)
+    parser.add_argument("--nlat", type=int, default=180)
+    parser.add_argument("--nlon", type=int, default=288)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with TemporaryDirectory() as tmp:
+        catalog = create_archive(tmp, args.files, args.nlat, args.nlon)
+        year = args.files//2
+        without_index = cold_open(catalog, year, repeat=args.repeat)
+
+        start = perf_counter()
+        index = Path(tmp) / "olr.parq"
+        build_reference_index(sorted(Path(tmp).glob("*.nc")), index)
+        build_time = perf_counter() - start
+        with_index = cold_open(catalog, year, f"reference_index='{index}'", args.repeat)
+
+    print(f"{args.files} files, {args.nlat}x{args.nlon} grid")
+    print(f"open_mfdataset:           {without_index:8.3f} s")
+    print(f"reference index:          {with_index:8.3f} s")
+    print(f"index build (one time):   {build_time:8.3f} s")
+
+
+if __name__ == "__main__":
+    main()
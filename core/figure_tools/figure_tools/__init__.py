@@ -1,8 +1,23 @@
+from .aggregation_cache import AggregationCache
 from .anomaly_timeseries import AnomalyTimeSeries
+from .area_weights import area_weights, AreaWeights, set_cell_area
+from .catalog_loader import open_static_field, open_variable_dataset, register_cell_area
+from .cf_time import CFDates, decode_cf_time, decode_time_axis
 from .common_plots import observation_vs_model_maps, radiation_decomposition, \
                           timeseries_and_anomalies, zonal_mean_vertical_and_column_integrated_map, \
                           chuck_radiation
 from .figure import Figure
+from .geometry_store import build_geometry_store, draw_borders, draw_coastlines, \
+                            GeometryStore
 from .global_mean_timeseries import GlobalMeanTimeSeries
+from .grid import get_grid, Grid
 from .lon_lat_map import LonLatMap
+from .map_expression import MapExpression
+from .reference_index import build_reference_index, open_reference_index
+from .regions import continents, Region, regional_means, Regions
+from .regrid import get_regridder, Regridder
+from .render_pool import RenderPool
+from .renderer import ImageCache, render, Renderer
+from .spec import FigureSpec, LinePanel, MapPanel
+from .statistics import MapStatistics
 from .zonal_mean_map import ZonalMeanMap
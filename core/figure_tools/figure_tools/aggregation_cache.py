@@ -0,0 +1,242 @@
+from threading import Lock
+from weakref import finalize
+
+from numpy import array, ones, stack, where
+
+from .time_subsets import bin_means, default_memory_budget, partial_options, TimeSubset
+
+
+# Months of the standard seasons, in the order they are stored.  December is grouped
+# with the January and February of the same year, like TimeSubset.seasonal_climatology.
+seasons = {"DJF": [12, 2], "MAM": [3, 5], "JJA": [6, 8], "SON": [9, 11]}
+
+
+class YearSeasonPartials(object):
+    """Sums and counts of the monthly means of a variable for every (year, season).
+
+    Months that are missing time steps are summed separately from the complete
+    months, so that they can be handled like TimeSubset handles them.
+
+    Attributes:
+        counts: Integer numpy array of the number of complete months with (year,
+                season) dimensions.
+        partial_counts: Integer numpy array of the number of incomplete months with
+                        (year, season) dimensions.
+        partial_sums: Numpy array of the sums of the means of the incomplete months
+                      with (year, season, ...) dimensions.
+        sums: Numpy array of the sums of the means of the complete months with (year,
+              season, ...) dimensions.
+        years: Integer numpy array of years.
+    """
+    def __init__(self, years, sums, counts, partial_sums, partial_counts):
+        self.years = years
+        self.sums = sums
+        self.counts = counts
+        self.partial_sums = partial_sums
+        self.partial_counts = partial_counts
+
+    def select(self, year_range=None, season=None, partial="raise"):
+        """Selects partial sums and counts.
+
+        Args:
+            year_range: List of the integer first and last years (inclusive).
+            season: String season name (i.e. "DJF").
+            partial: How to handle months with missing time steps ("raise", "drop" or
+                     "keep").
+
+        Returns:
+            Numpy arrays of the sums and counts with a leading year dimension.
+
+        Raises:
+            ValueError if a selected month is incomplete and partial is "raise".
+        """
+        if partial not in partial_options:
+            raise ValueError(f"partial must be one of: {partial_options}.")
+        arrays = [self.sums, self.counts, self.partial_sums, self.partial_counts]
+        if year_range is not None:
+            years = (self.years >= year_range[0]) & (self.years <= year_range[1])
+            arrays = [x[years] for x in arrays]
+        if season is None:
+            arrays = [x.sum(axis=1) for x in arrays]
+        else:
+            i = list(seasons.keys()).index(season)
+            arrays = [x[:, i] for x in arrays]
+        sums, counts, partial_sums, partial_counts = arrays
+        if partial == "raise" and partial_counts.any():
+            raise ValueError("found months that are missing time steps.")
+        if partial == "keep":
+            return sums + partial_sums, counts + partial_counts
+        return sums, counts
+
+
+class AggregationCache(object):
+    """Cache of the per-(year, season) partial sums of variables.
+
+    The raw data of a variable is read once, and annual means, annual mean series,
+    climatologies and seasonal composites are then assembled from the partial sums.
+    Entries are keyed by the identity of the dataset, and are freed when the dataset
+    is garbage collected.
+
+    Attributes:
+        memory_budget: Maximum size in bytes of the blocks of data read at once.
+    """
+    def __init__(self, memory_budget=default_memory_budget):
+        self.memory_budget = memory_budget
+        # Datasets are not hashable, so entries are keyed by id and removed when the
+        # dataset is garbage collected.
+        self._entries = {}
+        self._lock = Lock()
+
+    def _variables(self, dataset):
+        """Returns the dictionary of partial sums for a dataset (holding the lock)."""
+        key = id(dataset)
+        if key not in self._entries:
+            self._entries[key] = {}
+            finalize(dataset, self._remove, key)
+        return self._entries[key]
+
+    def _remove(self, key):
+        """Removes the entries of a dataset that was garbage collected."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def partials(self, dataset, variable):
+        """Returns the partial sums of a variable, reading its data if necessary.
+
+        Months with missing time steps are kept apart from the complete months.
+
+        Args:
+            dataset: xarray Dataset.
+            variable: String name of the variable.
+
+        Returns:
+            A YearSeasonPartials object.
+        """
+        with self._lock:
+            entries = self._variables(dataset)
+            if variable in entries:
+                return entries[variable]
+
+        v = dataset.data_vars[variable]
+        time = TimeSubset(array(dataset.coords[v.dims[0]].data), self.memory_budget)
+        years = time.years
+        index = {year: i for i, year in enumerate(years)}
+
+        def month_bin(year, month):
+            return 12*index[year] + month - 1
+
+        sums, counts = time.monthly_sums(v, month_bin, 12*years.size, partial="keep")
+        complete = ones(12*years.size, dtype=bool)
+        for year, month, is_complete in zip(*time.complete_months()):
+            complete[month_bin(year, month)] &= is_complete
+        mask = complete.reshape((-1,) + (1,)*(sums.ndim - 1))
+        shape = (years.size, 12)
+        partials = YearSeasonPartials(
+            years,
+            _season_sums(where(mask, sums, 0.).reshape(shape + sums.shape[1:])),
+            _season_sums(where(complete, counts, 0).reshape(shape)),
+            _season_sums(where(mask, 0., sums).reshape(shape + sums.shape[1:])),
+            _season_sums(where(complete, 0, counts).reshape(shape)),
+        )
+        with self._lock:
+            return self._variables(dataset).setdefault(variable, partials)
+
+    def annual_mean(self, dataset, variable, year, partial="raise"):
+        """Calculates the annual mean of a variable for a year.
+
+        Args:
+            dataset: xarray Dataset.
+            variable: String name of the variable.
+            year: Integer year.
+            partial: How to handle missing months ("raise", "drop" or "keep").
+
+        Returns:
+            Numpy array of the average data.
+        """
+        years, means = self.annual_means(dataset, variable, partial, [year, year])
+        if years.size == 0:
+            raise ValueError(f"could not find year {year}.")
+        return means[0]
+
+    def annual_means(self, dataset, variable, partial="raise", year_range=None):
+        """Calculates the annual means of a variable for every year.
+
+        Args:
+            dataset: xarray Dataset.
+            variable: String name of the variable.
+            partial: How to handle missing months ("raise", "drop" or "keep").
+            year_range: List of the integer first and last years (inclusive).
+
+        Returns:
+            Numpy array of years and a numpy array of the average data.
+        """
+        partials = self.partials(dataset, variable)
+        sums, counts = partials.select(year_range, partial=partial)
+        years = partials.years
+        if year_range is not None:
+            years = years[(years >= year_range[0]) & (years <= year_range[1])]
+        means, kept = bin_means(sums, counts, 12, partial)
+        return years[kept], means
+
+    def annual_climatology(self, dataset, variable, year_range, partial="raise"):
+        """Calculates the mean of a variable over a range of years.
+
+        Args:
+            dataset: xarray Dataset.
+            variable: String name of the variable.
+            year_range: List of the integer first and last years (inclusive).
+            partial: How to handle missing months ("raise", "drop" or "keep").
+
+        Returns:
+            Numpy array of the average data.
+        """
+        sums, counts = self.partials(dataset, variable).select(year_range, partial=partial)
+        return _climatology(sums, counts, 12, year_range, partial)
+
+    def seasonal_climatology(self, dataset, variable, year_range, month_range,
+                             partial="raise"):
+        """Calculates the mean of a variable over a season in a range of years.
+
+        Seasons other than DJF, MAM, JJA and SON are calculated from the raw data.
+
+        Args:
+            dataset: xarray Dataset.
+            variable: String name of the variable.
+            year_range: List of the integer first and last years (inclusive).
+            month_range: List of the integer first and last months (inclusive).
+            partial: How to handle missing months ("raise", "drop" or "keep").
+
+        Returns:
+            Numpy array of the average data.
+        """
+        for season, months in seasons.items():
+            if list(month_range) == months:
+                break
+        else:
+            v = dataset.data_vars[variable]
+            time = TimeSubset(array(dataset.coords[v.dims[0]].data), self.memory_budget)
+            return time.seasonal_climatology(v, year_range, month_range, partial)
+        sums, counts = self.partials(dataset, variable).select(year_range, season, partial)
+        return _climatology(sums, counts, 3, year_range, partial)
+
+
+def _season_sums(data):
+    """Sums data with (year, month, ...) dimensions into (year, season, ...)."""
+    return stack([data[:, [(month % 12)//3 == i for month in range(1, 13)]].sum(axis=1)
+                  for i in range(len(seasons))], axis=1)
+
+
+def _climatology(sums, counts, months_per_year, year_range, partial):
+    """Averages the partial sums of a range of years."""
+    if partial == "drop":
+        # Leave out the incomplete years.
+        complete = counts >= months_per_year
+        sums, counts = sums[complete], counts[complete]
+        expected_months = 1
+    else:
+        expected_months = months_per_year*(year_range[1] - year_range[0] + 1)
+    means, _ = bin_means(sums.sum(axis=0)[None, ...], array([counts.sum()]),
+                         expected_months, partial)
+    if means.shape[0] == 0:
+        raise ValueError("Expected monthly data and did not find correct number of months.")
+    return means[0]
@@ -1,5 +1,7 @@
-from numpy import array, mean, transpose
+from numpy import array, cos, mean, radians, transpose, zeros
 
+from .coarsen import block_centers, block_factors, block_mean
+from .statistics import MapStatistics
 from .time_subsets import TimeSubset
 
 
@@ -11,6 +13,37 @@ class AnomalyTimeSeries(object):
         self.x_label = "Time"
         self.y_label = "Latitude"
         self.data_label = units
+        self._statistics = None
+
+    @property
+    def statistics(self):
+        """MapStatistics of the data, which are calculated the first time they are
+           needed."""
+        if self._statistics is None:
+            self._statistics = MapStatistics(self.data)
+        return self._statistics
+
+    def coarsen(self, shape):
+        """Block-averages the latitudes to about the resolution that they are displayed
+           at.
+
+        The averages are weighted by cos(latitude) and skip missing values.  Every
+        time is kept.
+
+        Args:
+            shape: Tuple of the number of (rows, columns) of pixels that the data is
+                   displayed on.
+
+        Returns:
+            An AnomalyTimeSeries object, which is this object if it is not finer than
+            the pixels.
+        """
+        factor, _ = block_factors(self.data.shape, shape)
+        if factor == 1:
+            return self
+        weights = cos(radians(self.y_data))[:, None] + zeros(self.data.shape)
+        return AnomalyTimeSeries(block_mean(self.data, weights, (factor, 1)), self.x_data,
+                                 block_centers(self.y_data, factor), self.data_label)
 
     @classmethod
     def from_xarray_dataset(cls, dataset, variable):
@@ -20,9 +53,8 @@ class AnomalyTimeSeries(object):
 
         time = TimeSubset(array(dataset.coords[v.dims[0]].data))
         latitude = array(dataset.coords[v.dims[-2]].data)
-        data = mean(array(v.data), axis=-1) # Average over longitude.
-
-        time, data = time.annual_means(data)
+        time, data = time.annual_means(v.data, partial="drop")
+        data = mean(data, axis=-1) # Average over longitude.
         average = mean(data, axis=0) # Average over longitude and time.
         anomaly = data
         for i in range(time.size):
@@ -0,0 +1,75 @@
+from numpy import asarray, cos, float64, ones, pi, tensordot, where
+
+
+class AreaWeights(object):
+    """Area weights for a longitude-latitude grid.
+
+    Attributes:
+        total: Sum of the weights.
+        weights: Read-only 2D numpy array of weights with (latitude, longitude)
+                 dimensions.
+    """
+    def __init__(self, weights):
+        self.weights = asarray(weights, dtype=float64)
+        self.weights.flags.writeable = False
+        self.total = self.weights.sum()
+
+    def global_mean(self, data, mask=None):
+        """Calculates area-weighted means over the last two (latitude, longitude)
+           dimensions of the data.
+
+        All leading dimensions (i.e. every time step of a timeseries) are reduced in
+        a single tensor contraction.
+
+        Args:
+            data: numpy array with (..., latitude, longitude) dimensions.
+            mask: Boolean numpy array with (latitude, longitude) dimensions that is
+                  True for cells that should be included (i.e. land cells).
+
+        Returns:
+            Numpy array (or scalar) of global mean values.
+        """
+        if mask is None:
+            weights, total = self.weights, self.total
+        else:
+            weights = where(mask, self.weights, 0.)
+            total = weights.sum()
+        return tensordot(data, weights, axes=2)/total
+
+
+def area_weights(grid):
+    """Returns the cached area weights for a longitude-latitude grid.
+
+    The cell areas registered for the grid with set_cell_area (i.e. by
+    register_cell_area from a catalog's static files) are used if available,
+    otherwise the weights are proportional to cos(latitude).
+
+    Args:
+        grid: Grid object with longitude x values and latitude y values.
+
+    Returns:
+        An AreaWeights object.
+    """
+    return grid.cached("area_weights", lambda: _cosine_latitude_weights(grid))
+
+
+def set_cell_area(grid, cell_area):
+    """Registers true cell areas (i.e. from a catalog static file) for a grid, so that
+       every map on the grid uses them for area weighting.
+
+    Args:
+        grid: Grid object with longitude x values and latitude y values.
+        cell_area: numpy array of the total area of each cell (not just the land or
+                   ocean part of it) with (latitude, longitude) dimensions.
+    """
+    cell_area = asarray(cell_area, dtype=float64)
+    if cell_area.shape != (grid.y.size, grid.x.size):
+        raise ValueError(f"cell area shape {cell_area.shape} does not match the grid.")
+    # Missing (i.e. ocean) cells are not counted.
+    grid.store("area_weights", AreaWeights(where(cell_area > 0, cell_area, 0.)))
+
+
+def _cosine_latitude_weights(grid):
+    """Creates area weights proportional to cos(latitude)."""
+    weights = cos(2.*pi*grid.y/360.)
+    return AreaWeights(weights[:, None]*ones((1, grid.x.size)))
@@ -0,0 +1,121 @@
+from xarray import open_dataset, open_mfdataset
+
+from .area_weights import set_cell_area
+from .grid import get_grid
+from .reference_index import build_reference_index, open_reference_index, \
+                             reference_index_sources
+
+
+# Chunk size used along the time dimension when the files are opened.
+_time_chunk_size = 12
+
+
+def open_variable_dataset(catalog, variable, chunks=None, parallel=True,
+                          reference_index=None, **kwargs):
+    """Opens the files for a single variable directly as one xarray dataset.
+
+    GFDL timeseries (ts) output stores one variable per file, so when a catalog
+    search returns files for a single variable, realm and frequency the files can
+    be concatenated along time directly without going through intake-esm's
+    aggregation machinery (to_dataset_dict).
+
+    Args:
+        catalog: intake-esm datastore (usually the result of a search) or a pandas
+                 DataFrame with the same columns.
+        variable: String name of the variable.
+        chunks: Dictionary of dask chunk sizes.  Defaults to chunking by year of
+                monthly data.
+        parallel: Flag that determines if the files are opened (or indexed) in
+                  parallel.
+        reference_index: Path to a byte-range reference index for the files.  If
+                         provided, the files are opened as a single virtual zarr
+                         store through the index, which is (re)built first if it
+                         does not exist yet or was built from different files.
+        kwargs: Extra keyword arguments passed to xarray.open_mfdataset.
+
+    Returns:
+        An xarray Dataset.
+
+    Raises:
+        ValueError if the catalog does not contain exactly one variable, realm and
+        frequency.
+    """
+    paths = catalog_paths(catalog, variable)
+    if chunks is None:
+        chunks = {"time": _time_chunk_size}
+    if reference_index is not None:
+        if reference_index_sources(reference_index) != paths:
+            build_reference_index(paths, reference_index, parallel=parallel)
+        return open_reference_index(reference_index, chunks=chunks, **kwargs)
+    return open_mfdataset(paths, combine="nested", concat_dim="time",
+                          data_vars="minimal", coords="minimal", compat="override",
+                          join="override", chunks=chunks, parallel=parallel, **kwargs)
+
+
+def open_static_field(catalog, variable, frequency="fx"):
+    """Reads a time-invariant field (i.e. cell area) from a catalog's static files.
+
+    Args:
+        catalog: intake-esm datastore or pandas DataFrame.
+        variable: String name of the variable.
+        frequency: Frequency used in the catalog for static files.
+
+    Returns:
+        An xarray DataArray, or None if the catalog does not contain the variable.
+    """
+    df = getattr(catalog, "df", catalog)
+    df = df[(df["variable_id"] == variable) & (df["frequency"] == frequency)]
+    if df.empty:
+        return None
+    with open_dataset(df["path"].iloc[0]) as dataset:
+        return dataset[variable].load()
+
+
+def register_cell_area(catalog, variables=("area", "cell_area"), frequency="fx"):
+    """Registers the cell areas in a catalog's static files for their grid, so that
+       every map on the grid is weighted by the true cell areas.
+
+    Args:
+        catalog: intake-esm datastore or pandas DataFrame, usually searched down to
+                 one realm.
+        variables: Names of the cell area variable, in the order they are looked for.
+        frequency: Frequency used in the catalog for static files.
+
+    Returns:
+        The Grid object that the cell areas were registered for, or None if the
+        catalog does not contain them.
+    """
+    for variable in variables:
+        area = open_static_field(catalog, variable, frequency)
+        if area is not None:
+            grid = get_grid(area[area.dims[-1]].values, area[area.dims[-2]].values)
+            set_cell_area(grid, area.values)
+            return grid
+    return None
+
+
+def catalog_paths(catalog, variable):
+    """Returns the paths to the files of a single variable sorted in time.
+
+    Args:
+        catalog: intake-esm datastore or pandas DataFrame.
+        variable: String name of the variable.
+
+    Returns:
+        List of string paths.
+
+    Raises:
+        ValueError if the catalog does not contain exactly one variable, realm and
+        frequency.
+    """
+    df = getattr(catalog, "df", catalog)
+    if "variable_id" in df.columns:
+        df = df[df["variable_id"] == variable]
+    if df.empty:
+        raise ValueError(f"could not find any files for variable {variable}.")
+    for column in ["realm", "frequency"]:
+        if column in df.columns and df[column].nunique() > 1:
+            raise ValueError("could not filter the catalog down to a single dataset" +
+                             f" for {variable} (found multiple {column} values).")
+    keys = ["time_range", "path"] if "time_range" in df.columns else ["path",]
+    return [str(x) for x in df.sort_values(by=keys)["path"]]
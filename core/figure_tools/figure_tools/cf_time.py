@@ -0,0 +1,175 @@
+from re import match
+
+from numpy import array, asarray, concatenate, cumsum, float64, int64, rint, searchsorted, \
+                  where
+
+
+# Length of the months in the calendars that have the same number of days every year.
+_fixed_calendars = {
+    "360_day": [30,]*12,
+    "365_day": [31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31],
+    "366_day": [31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31],
+}
+_aliases = {
+    "all_leap": "366_day",
+    "gregorian": "standard",
+    "noleap": "365_day",
+}
+_calendars = list(_fixed_calendars.keys()) + list(_aliases.keys()) + \
+             ["julian", "proleptic_gregorian", "standard"]
+_seconds = {"day": 86400, "hour": 3600, "minute": 60, "second": 1}
+
+# Julian day number of the first day of the Gregorian calendar (1582-10-15).
+_gregorian_start = 2299161
+
+
+class CFDates(object):
+    """Integer calendar dates decoded from a CF time axis.
+
+    Attributes:
+        calendar: String name of the CF calendar.
+        day: Read-only integer numpy array of days of the month.
+        month: Read-only integer numpy array of months (1-12).
+        year: Read-only integer numpy array of years.
+    """
+    def __init__(self, year, month, day, calendar):
+        self.calendar = calendar
+        self.year, self.month, self.day = [_read_only(x) for x in (year, month, day)]
+
+    def __getitem__(self, index):
+        return CFDates(self.year[index], self.month[index], self.day[index], self.calendar)
+
+    def __len__(self):
+        return self.year.size
+
+    def __repr__(self):
+        return f"CFDates(size={len(self)}, calendar={self.calendar})"
+
+    @classmethod
+    def concatenate(cls, dates):
+        """Concatenates dates that were decoded separately (i.e. one per file).
+
+        Args:
+            dates: List of CFDates objects.
+
+        Returns:
+            A CFDates object.
+
+        Raises:
+            ValueError if the dates do not use the same calendar.
+        """
+        calendars = {d.calendar for d in dates}
+        if len(calendars) != 1:
+            raise ValueError(f"cannot concatenate dates with calendars {calendars}.")
+        return cls(concatenate([d.year for d in dates]),
+                   concatenate([d.month for d in dates]),
+                   concatenate([d.day for d in dates]), calendars.pop())
+
+
+def decode_cf_time(values, units, calendar="standard"):
+    """Converts CF time values to integer calendar dates, without creating a
+       datetime object for each value.
+
+    Years before 1 use astronomical numbering (the year before 1 is 0).
+
+    Args:
+        values: numpy array of time values.
+        units: String CF time units (i.e. "days since 0001-01-01 00:00:00").
+        calendar: String CF calendar name.
+
+    Returns:
+        A CFDates object.
+
+    Raises:
+        ValueError if the units or calendar are not supported.
+    """
+    calendar = calendar.lower()
+    if calendar not in _calendars:
+        raise ValueError(f"calendar must be one of: {_calendars}.")
+    canonical = _aliases.get(calendar, calendar)
+
+    result = match(r"\s*(\w+?)s?\s+since\s+(-?\d+)-(\d+)-(\d+)" +
+                   r"(?:[ T](\d+):(\d+)(?::(\d+(?:\.\d*)?))?)?", units)
+    if result is None or result.group(1).lower() not in _seconds:
+        raise ValueError(f"unsupported time units {units}.")
+    unit, year, month, day, hour, minute, second = result.groups()
+    reference_seconds = int(hour or 0)*3600 + int(minute or 0)*60 + float(second or 0)
+
+    # Work in whole seconds, so that values like 15.5 days are not affected by rounding.
+    seconds = rint(asarray(values, dtype=float64)*_seconds[unit.lower()] +
+                   reference_seconds).astype(int64)
+    days = _day_number(int(year), int(month), int(day), canonical) + seconds//86400
+    year, month, day = _calendar_date(days, canonical)
+    return CFDates(year, month, day, calendar)
+
+
+def decode_time_axis(time):
+    """Converts a time axis opened with decode_times=False to integer calendar dates.
+
+    Args:
+        time: xarray DataArray with "units" and (optionally) "calendar" attributes.
+
+    Returns:
+        A CFDates object.
+    """
+    return decode_cf_time(time.values, time.attrs["units"],
+                          time.attrs.get("calendar", "standard"))
+
+
+def _day_number(year, month, day, calendar):
+    """Returns a day count for a date, which increases by one every day of the calendar."""
+    if calendar in _fixed_calendars:
+        lengths = _fixed_calendars[calendar]
+        return year*sum(lengths) + sum(lengths[:month - 1]) + day - 1
+    gregorian = calendar == "proleptic_gregorian" or \
+                (calendar == "standard" and (year, month, day) >= (1582, 10, 15))
+    return _julian_day_number(year, month, day, gregorian)
+
+
+def _julian_day_number(year, month, day, gregorian):
+    """Converts a date in the Julian or Gregorian calendar to a Julian day number."""
+    a = (14 - month)//12
+    y = year + 4800 - a
+    m = month + 12*a - 3
+    days = day + (153*m + 2)//5 + 365*y + y//4
+    if gregorian:
+        return days - y//100 + y//400 - 32045
+    return days - 32083
+
+
+def _calendar_date(days, calendar):
+    """Converts day counts to year, month and day arrays."""
+    if calendar in _fixed_calendars:
+        lengths = _fixed_calendars[calendar]
+        starts = cumsum([0,] + lengths)
+        year, day_of_year = days//starts[-1], days % starts[-1]
+        month = searchsorted(starts, day_of_year, side="right")
+        return year, month, day_of_year - starts[month - 1] + 1
+    if calendar == "julian":
+        return _from_julian_day_number(days, False)
+    if calendar == "proleptic_gregorian":
+        return _from_julian_day_number(days, True)
+    gregorian = _from_julian_day_number(days, True)
+    julian = _from_julian_day_number(days, False)
+    mixed = days >= _gregorian_start
+    return tuple(where(mixed, g, j) for g, j in zip(gregorian, julian))
+
+
+def _from_julian_day_number(days, gregorian):
+    """Converts Julian day numbers to dates in the Julian or Gregorian calendar."""
+    f = days + 1401
+    if gregorian:
+        f = f + (((4*days + 274277)//146097)*3)//4 - 38
+    e = 4*f + 3
+    h = 5*((e % 1461)//4) + 2
+    day = (h % 153)//5 + 1
+    month = (h//153 + 2) % 12 + 1
+    year = e//1461 - 4716 + (14 - month)//12
+    return year, month, day
+
+
+def _read_only(values):
+    """Creates a read-only integer copy of an array."""
+    values = array(values, dtype=int64)
+    values.flags.writeable = False
+    return values
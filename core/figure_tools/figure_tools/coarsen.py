@@ -0,0 +1,82 @@
+from matplotlib import rcParams
+from numpy import asarray, concatenate, float64, full, isfinite, nan, nanmean, where
+
+
+def display_shape(size, num_rows=1, num_columns=1, dpi=None):
+    """Estimates the number of (rows, columns) of pixels of each panel of a figure.
+
+    Args:
+        size: Tuple of the width and height of the figure in inches.
+        num_rows: Number of rows of plots.
+        num_columns: Number of columns of plots.
+        dpi: Resolution of the figure in dots per inch, or None to use matplotlib's
+             default.
+
+    Returns:
+        Tuple of the number of rows and columns of pixels.
+    """
+    dpi = rcParams["figure.dpi"] if dpi is None else dpi
+    return (max(1, int(size[1]*dpi/num_rows)), max(1, int(size[0]*dpi/num_columns)))
+
+
+def block_factors(data_shape, shape):
+    """Finds how many cells to average along each axis to reach about a resolution.
+
+    Args:
+        data_shape: Tuple of the number of (y, x) cells of the data.
+        shape: Tuple of the number of (rows, columns) of pixels to display them on.
+
+    Returns:
+        Tuple of the integer number of cells in each block along the (y, x) axes.
+    """
+    return tuple(max(1, cells//pixels) for cells, pixels in zip(data_shape[-2:], shape))
+
+
+def block_mean(data, weights, factors):
+    """Averages blocks of cells, skipping missing values.
+
+    Blocks at the ends of the axes are smaller if the number of cells is not a
+    multiple of the block size.
+
+    Args:
+        data: numpy array with (y, x) dimensions.
+        weights: numpy array of the weight (i.e. area) of each cell with (y, x)
+                 dimensions.
+        factors: Tuple of the number of cells in each block along the (y, x) axes.
+
+    Returns:
+        numpy array of the weighted mean of the valid values in each block, which is
+        NaN for blocks without any.
+    """
+    data = asarray(data, dtype=float64)
+    valid = isfinite(data)
+    weights = where(valid, weights, 0.)
+    data = where(valid, data, 0.)*weights
+    weights_sum, data_sum = (_block_sum(x, factors) for x in (weights, data))
+    has_values = weights_sum > 0
+    return where(has_values, data_sum/where(has_values, weights_sum, 1.), nan)
+
+
+def block_centers(axis, factor):
+    """Averages the coordinates of the cells in each block along an axis.
+
+    Args:
+        axis: numpy array of cell centers.
+        factor: Number of cells in each block.
+
+    Returns:
+        numpy array of block centers.
+    """
+    axis = asarray(axis, dtype=float64)
+    padding = -axis.size % factor
+    axis = concatenate((axis, full(padding, nan)))
+    return nanmean(axis.reshape(-1, factor), axis=-1)
+
+
+def _block_sum(data, factors):
+    """Sums blocks of cells, padding the axes with zeros to a multiple of the block
+       size."""
+    (ny, nx), (fy, fx) = data.shape, factors
+    padded = full((ny + (-ny % fy), nx + (-nx % fx)), 0.)
+    padded[:ny, :nx] = data
+    return padded.reshape(padded.shape[0]//fy, fy, padded.shape[1]//fx, fx).sum(axis=(1, 3))
@@ -1,40 +1,45 @@
 from math import ceil, floor
 
-from numpy import abs, max, min, percentile
-
-from .figure import Figure
+from .spec import FigureSpec, LinePanel, MapPanel
 
 
 def chuck_radiation(reference, model, title):
-    figure = Figure(num_rows=3, num_columns=1, title=title, size=(14, 12))
+    spec = FigureSpec(num_rows=3, num_columns=1, title=title, size=(14, 12))
+    shape = spec.display_shape()
+    panels = []
 
     # Create a common color bar for the reference and model.
     colorbar_range = [120, 340]
 
     # Model data.
     global_mean = model.global_mean()
-    figure.add_map(model, f"Model [Mean: {global_mean:.2f}]", 1,
-                   colorbar_range=colorbar_range, num_levels=11, colormap="jet")
+    panels.append(MapPanel.from_map(model, f"Model [Mean: {global_mean:.2f}]", 1,
+                                    colorbar_range=colorbar_range, num_levels=11,
+                                    colormap="jet", display_shape=shape))
 
     # Reference data.
     global_mean = reference.global_mean()
-    figure.add_map(reference, f"Obersvations [Mean: {global_mean:.2f}]", 2,
-                   colorbar_range=colorbar_range, num_levels=11, colormap="jet")
+    panels.append(MapPanel.from_map(reference, f"Obersvations [Mean: {global_mean:.2f}]", 2,
+                                    colorbar_range=colorbar_range, num_levels=11,
+                                    colormap="jet", display_shape=shape))
 
     # Difference between the reference and the model.
     difference = model - reference
     color_range = [-34., 34.]
-    figure.add_map(difference, f"Model - Obs [Mean: {global_mean:.2f}]", 3,
-                   colorbar_range=color_range, colormap="jet", normalize_colors=True)
-    return figure
+    panels.append(MapPanel.from_map(difference, f"Model - Obs [Mean: {global_mean:.2f}]", 3,
+                                    colorbar_range=color_range, colormap="jet",
+                                    normalize_colors=True, display_shape=shape))
+    return spec.add(*panels)
 
 
 def observation_vs_model_maps(reference, model, title):
-    figure = Figure(num_rows=2, num_columns=2, title=title, size=(14, 12))
+    spec = FigureSpec(num_rows=2, num_columns=2, title=title, size=(14, 12))
+    shape = spec.display_shape()
+    panels = []
 
     # Create common color bar for reference and model.
-    reference_range = [floor(min(reference.data)), ceil(max(reference.data))]
-    model_range = [floor(min(model.data)), ceil(max(model.data))]
+    reference_range = [floor(reference.statistics.min), ceil(reference.statistics.max)]
+    model_range = [floor(model.statistics.min), ceil(model.statistics.max)]
     colorbar_range = [None, None]
     colorbar_range[0] = reference_range[0] if reference_range[0] < model_range[0] \
                         else model_range[0]
@@ -43,65 +48,75 @@ def observation_vs_model_maps(reference, model, title):
 
     # Reference data.
     global_mean = reference.global_mean()
-    figure.add_map(reference, f"Observations [Mean: {global_mean:.2f}]", 1,
-                   colorbar_range=colorbar_range)
+    panels.append(MapPanel.from_map(reference, f"Observations [Mean: {global_mean:.2f}]", 1,
+                                    colorbar_range=colorbar_range, display_shape=shape))
 
     # Model data.
     global_mean = model.global_mean()
-    figure.add_map(model, f"Model [Mean: {global_mean:.2f}]", 2,
-                   colorbar_range=colorbar_range)
+    panels.append(MapPanel.from_map(model, f"Model [Mean: {global_mean:.2f}]", 2,
+                                    colorbar_range=colorbar_range, display_shape=shape))
 
     # Difference between the reference and model.
     difference = reference - model
-    color_range = _symmetric_colorbar_range(difference.data)
+    color_range = _symmetric_colorbar_range(difference)
     global_mean = difference.global_mean()
-    figure.add_map(difference, f"Obs - Model [Mean: {global_mean:.2f}]", 3,
-                   colorbar_range=color_range,
-                   normalize_colors=True)
+    panels.append(MapPanel.from_map(difference, f"Obs - Model [Mean: {global_mean:.2f}]", 3,
+                                    colorbar_range=color_range,
+                                    normalize_colors=True, display_shape=shape))
 
     # Use percentiles.
-    zoom = int(ceil(percentile(abs(difference.data), 95)))
-    figure.add_map(difference, f"Obs - Model [Mean: {global_mean:.2f}]", 4,
-                   colorbar_range=[-1*zoom, zoom], num_levels=19,
-                   normalize_colors=True)
-    return figure
+    zoom = int(ceil(difference.statistics.quantile(0.95, absolute=True)))
+    panels.append(MapPanel.from_map(difference, f"Obs - Model [Mean: {global_mean:.2f}]", 4,
+                                    colorbar_range=[-1*zoom, zoom], num_levels=19,
+                                    normalize_colors=True, display_shape=shape))
+    return spec.add(*panels)
 
 
 def radiation_decomposition(clean_clear_sky, clean_sky, clear_sky, all_sky, title):
-    figure = Figure(num_rows=2, num_columns=2, title=title, size=(16, 10))
+    spec = FigureSpec(num_rows=2, num_columns=2, title=title, size=(16, 10))
+    shape = spec.display_shape()
+    panels = []
     maps = [clean_clear_sky, clean_sky - clean_clear_sky, all_sky - clean_sky, all_sky]
     titles = ["Clean-clear Sky", "Cloud Effects", "Aerosol Effects", "All Sky"]
-    for i, (map_, title) in enumerate(zip(maps, titles)):
+    for i, (map_, panel_title) in enumerate(zip(maps, titles)):
         global_mean = map_.global_mean()
-        updated_title = f"{title} [Mean: {global_mean:.2f}]"
-        if title in ["Cloud Effects", "Aerosol Effects"]:
-            figure.add_map(map_, updated_title, i + 1,
-                           colorbar_range=_symmetric_colorbar_range(map_.data),
-                           normalize_colors=True)
+        updated_title = f"{panel_title} [Mean: {global_mean:.2f}]"
+        if panel_title in ["Cloud Effects", "Aerosol Effects"]:
+            panels.append(MapPanel.from_map(map_, updated_title, i + 1,
+                                            colorbar_range=_symmetric_colorbar_range(map_),
+                                            normalize_colors=True, display_shape=shape))
         else:
-            figure.add_map(map_, updated_title, i + 1,
-                           normalize_colors=True, colorbar_center=global_mean)
-    return figure
+            panels.append(MapPanel.from_map(map_, updated_title, i + 1,
+                                            normalize_colors=True, colorbar_center=global_mean,
+                                            display_shape=shape))
+    return spec.add(*panels)
 
 
 def timeseries_and_anomalies(timeseries, map_, title):
-    figure = Figure(num_rows=1, num_columns=2, title=title, size=(16, 10))
-    figure.add_line_plot(timeseries, "Timeseries", 1)
-    figure.add_map(map_, "Zonal Mean Anomalies", 2,
-                   colorbar_range=_symmetric_colorbar_range(map_.data),
-                   normalize_colors=True)
-    return figure
+    spec = FigureSpec(num_rows=1, num_columns=2, title=title, size=(16, 10))
+    shape = spec.display_shape()
+    panels = [
+        LinePanel.from_line_plot(timeseries, "Timeseries", 1),
+        MapPanel.from_map(map_, "Zonal Mean Anomalies", 2,
+                          colorbar_range=_symmetric_colorbar_range(map_),
+                          normalize_colors=True, display_shape=shape),
+    ]
+    return spec.add(*panels)
 
 
 def zonal_mean_vertical_and_column_integrated_map(zonal_mean, lon_lat, title):
-    figure = Figure(num_rows=1, num_columns=2, title=title, size=(16, 10))
-    figure.add_map(zonal_mean, "Zonal Mean Vertical Profile", 1)
-    figure.add_map(lon_lat, "Column-integrated", 2)
-    return figure
-
-
-def _symmetric_colorbar_range(data):
-    colorbar_range = [int(floor(min(data))), int(ceil(max(data)))]
+    spec = FigureSpec(num_rows=1, num_columns=2, title=title, size=(16, 10))
+    shape = spec.display_shape()
+    panels = [
+        MapPanel.from_map(zonal_mean, "Zonal Mean Vertical Profile", 1,
+                          display_shape=shape),
+        MapPanel.from_map(lon_lat, "Column-integrated", 2, display_shape=shape),
+    ]
+    return spec.add(*panels)
+
+
+def _symmetric_colorbar_range(map_):
+    colorbar_range = [int(floor(map_.statistics.min)), int(ceil(map_.statistics.max))]
     if abs(colorbar_range[0]) > abs(colorbar_range[1]):
         colorbar_range[1] = -1*colorbar_range[0]
     else:
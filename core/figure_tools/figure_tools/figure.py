@@ -1,32 +1,53 @@
-from math import ceil
+from numpy import unravel_index
 
-import cartopy.crs as ccrs
-import matplotlib as mpl
-import matplotlib.colors as colors
-import matplotlib.pyplot as plt
-from numpy import linspace, max, min, unravel_index
-
-from .lon_lat_map import LonLatMap
-from .zonal_mean_map import ZonalMeanMap
+from .renderer import default_renderer, draw_panel
+from .spec import FigureSpec, LinePanel, MapPanel
 
 
 class Figure(object):
-    def __init__(self, num_rows=1, num_columns=1, size=(16, 12), title=None):
+    """Figure made up of a grid of plots.
+
+    This is a thin wrapper that builds a FigureSpec.  Adding plots only records them
+    in the specification, which is rendered (or found in the image cache) when the
+    figure is saved, and can be handed to a RenderPool to be drawn in another
+    process.  The matplotlib figure is only drawn, on its own Agg canvas, when the
+    figure is displayed or its plots are needed.  Figures should be closed when they
+    are no longer needed, either with close or by using them as context managers:
+
+        with Figure(num_rows=2) as figure:
+            figure.add_map(...)
+            figure.save("map.png")
+
+    Attributes:
+        figure: matplotlib Figure object, or None if the figure has not been drawn.
+        plot: Nested list of the matplotlib axes of each plot, indexed by row and
+              column.
+        spec: FigureSpec object describing the figure.
+    """
+    def __init__(self, num_rows=1, num_columns=1, size=(16, 12), title=None, dpi=None):
         """Creates a figure for the input number of plots.
 
         Args:
             num_rows: Number of rows of plots.
             num_columns: Number of columns of plots.
+            dpi: Resolution of the figure in dots per inch, or None to use the
+                 renderer's (see FigureSpec).
         """
-        self.figure = plt.figure(figsize=size, layout="compressed")
-        if title is not None:
-            self.figure.suptitle(title.title())
-        self.num_rows = num_rows
-        self.num_columns = num_columns
+        self.spec = FigureSpec(num_rows, num_columns, size, title, dpi=dpi)
+        self.figure = None
         self.plot = [[None for y in range(num_columns)] for x in range(num_rows)]
 
+    @property
+    def num_columns(self):
+        return self.spec.num_columns
+
+    @property
+    def num_rows(self):
+        return self.spec.num_rows
+
     def add_map(self, map_, title, position=1, colorbar_range=None, colormap="coolwarm",
-                normalize_colors=False, colorbar_center=0, num_levels=51, extend=None):
+                normalize_colors=False, colorbar_center=0, num_levels=51, extend=None,
+                render_mode="contour"):
         """Adds a map to the figure.
 
         Args:
@@ -34,61 +55,17 @@ class Figure(object):
             total: String title for the plot.
             position: Integer position index for the plot in the figure.
             colorbar_range: List of integers describing the colorbar limits.
+            render_mode: String way that the map is drawn ("contour", "pcolormesh" or
+                         "image").  The raster modes are much faster on high-resolution
+                         grids.
+
+        Data that is finer than the plot's pixels is block-averaged (area-weighted,
+        skipping missing values) before it is drawn, so the title (i.e. a global
+        mean) should be calculated from the full-resolution map.
         """
-        # Create the plotting axes.
-        optional_args = {}
-        if isinstance(map_, LonLatMap):
-            optional_args["projection"] = map_.projection
-        plot = self.figure.add_subplot(self.num_rows, self.num_columns,
-                                       position, **optional_args)
-
-        # Set the colorbar properties.
-        if colorbar_range == None:
-            levels = num_levels
-        else:
-            # There seems to be some strange behavior if the number of level is too
-            # big for a given range.
-            levels = linspace(colorbar_range[0], colorbar_range[-1], num_levels, endpoint=True)
-            if extend == None:
-                data_max = max(map_.data)
-                data_min = min(map_.data)
-                if data_max > colorbar_range[1] and data_min < colorbar_range[0]:
-                    extend = "both"
-                elif data_max > colorbar_range[1]:
-                    extend = "max"
-                elif data_min < colorbar_range[0]:
-                    extend = "min"
-        if normalize_colors:
-            norm = colors.CenteredNorm(vcenter=colorbar_center)
-        else:
-            norm = None
-
-        # Make the map.
-        optional_args = {"levels": levels, "cmap": colormap, "norm": norm, "extend": extend}
-        if isinstance(map_, LonLatMap):
-            optional_args["transform"] = ccrs.PlateCarree()
-        cs = plot.contourf(map_.x_data, map_.y_data, map_.data, **optional_args)
-
-        # Set the metadata.
-        self.figure.colorbar(cs, ax=plot, label=map_.data_label)
-        if isinstance(map_, LonLatMap):
-            plot.coastlines()
-            grid = plot.gridlines(draw_labels=True, dms=True, x_inline=False, y_inline=False)
-            grid.bottom_labels = False
-            grid.top_labels = False
-        if isinstance(map_, ZonalMeanMap) and map_.invert_y_axis:
-            plot.invert_yaxis()
-        plot.set_title(title.replace("_", " ").title())
-        plot.set_xlabel(map_.x_label)
-        plot.set_ylabel(map_.y_label)
-
-        # Add date information if necessary.
-        if hasattr(map_, "timestamp") and map_.timestamp != None:
-            plot.text(0.85, 1, map_.timestamp, transform=plot.transAxes)
-
-        # Store the plot in the figure object.
-        x, y = self._plot_position_to_indices(position)
-        self.plot[x][y] = plot
+        self._add(MapPanel.from_map(map_, title, position, colorbar_range, colormap,
+                                    normalize_colors, colorbar_center, num_levels, extend,
+                                    render_mode, self.spec.display_shape()))
 
     def add_line_plot(self, line_plot, title, position=1):
         """Adds a line plot to the figure.
@@ -98,25 +75,66 @@ class Figure(object):
             total: String title for the plot.
             position: Integer position index for the plot in the figure.
         """
-        plot = self.figure.add_subplot(self.num_rows, self.num_columns, position)
-        plot.plot(line_plot.x_data, line_plot.data)
-#       if isinstance(line_plot, GlobalMeanVerticalPlot) and line_plot.invert_y_axis:
-#           plot.invert_yaxis()
-        plot.set_title(title)
-        plot.set_xlabel(line_plot.x_label)
-        plot.set_ylabel(line_plot.y_label)
-
-        # Store the plot in the figure object.
-        x, y = self._plot_position_to_indices(position)
-        self.plot[x][y] = plot
+        self._add(LinePanel.from_line_plot(line_plot, title, position))
+
+    def draw(self):
+        """Draws the figure, if it has not already been drawn.
+
+        Returns:
+            The matplotlib Figure object.
+        """
+        if self.figure is None:
+            self.figure, self.plot = default_renderer.draw(self.spec)
+        return self.figure
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Releases the matplotlib figure and its plots."""
+        if self.figure is None:
+            return
+        if self.figure.canvas.manager is not None:
+            # The figure was handed to pyplot by display.
+            import matplotlib.pyplot as plt
+            plt.close(self.figure)
+        self.figure.clear()
+        self.figure = None
+        self.plot = [[None for y in range(self.num_columns)] for x in range(self.num_rows)]
 
     def display(self):
         """Shows the figure in a new window."""
+        # Only interactive use needs pyplot, so it is not imported by default.
+        import matplotlib.pyplot as plt
+        plt.figure(self.draw())
         plt.show()
 
-    def save(self, path):
-        plt.savefig(path)
-        plt.clf()
+    def save(self, path, thumbnail=None, wait=True):
+        """Writes the figure to a file.
+
+        Args:
+            path: Path to the output file, whose suffix sets the image format ("png",
+                  "jpeg", "webp", "pdf", etc.).
+            thumbnail: Path to a thumbnail file, or None.
+            wait: Flag that determines if this waits for the file to be written.  If
+                  not, this returns as soon as the figure is drawn.
+
+        Returns:
+            The path to the output file, or a concurrent.futures.Future object whose
+            result is the path if wait is False.
+        """
+        return self.spec.save(path, thumbnail, wait)
+
+    def _add(self, panel):
+        """Adds a panel to the specification, and draws it if the figure has already
+           been drawn."""
+        self.spec = self.spec.add(panel)
+        if self.figure is not None:
+            x, y = self._plot_position_to_indices(panel.position)
+            self.plot[x][y] = draw_panel(self.figure, panel, self.num_rows, self.num_columns)
 
     def _plot_position_to_indices(self, position):
         """Converts from a plot position to its x and y indices.
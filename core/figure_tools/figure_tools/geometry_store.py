@@ -0,0 +1,222 @@
+from argparse import ArgumentParser
+from os import environ
+from pathlib import Path
+from threading import Lock
+from warnings import warn
+
+import cartopy.crs as ccrs
+from cartopy.mpl.path import shapely_to_path
+from matplotlib.patches import PathPatch
+from numpy import array, concatenate, cumsum, float32, load, savez_compressed, split
+from shapely.geometry import MultiLineString
+
+from .projected_grid import projection_key
+
+
+# Natural Earth (category, name) of each feature.
+features = {
+    "borders": ("cultural", "admin_0_boundary_lines_land"),
+    "coastlines": ("physical", "coastline"),
+}
+
+# Simplification tolerance in degrees for each Natural Earth resolution.
+tolerances = {"110m": 0.05, "50m": 0.02, "10m": 0.005}
+
+# The store is looked for in this directory, so that geometries built before the
+# package is installed are shipped with it.
+default_directory = environ.get("FIGURE_TOOLS_GEOMETRY_DIRECTORY",
+                                str(Path(__file__).parent / "geometries"))
+
+
+class GeometryStore(object):
+    """Local store of simplified coastline and border geometries.
+
+    Cartopy downloads the Natural Earth shapefiles the first time that they are
+    used, which fails on nodes without network access, and parses and projects the
+    full-resolution geometries every time that they are drawn.  The store reads
+    simplified geometries from files made by build_geometry_store, and caches them
+    projected into each map projection, so they can be drawn without any network
+    access or reparsing.
+
+    Attributes:
+        directory: Path to the directory that contains the geometry files.
+    """
+    def __init__(self, directory=default_directory):
+        self.directory = Path(directory)
+        self._lines = {}
+        self._paths = {}
+        self._lock = Lock()
+
+    def lines(self, feature, resolution="110m"):
+        """Reads the simplified lines of a feature.
+
+        Args:
+            feature: String name of the feature ("coastlines" or "borders").
+            resolution: String Natural Earth resolution ("110m", "50m" or "10m").
+
+        Returns:
+            List of numpy arrays of (longitude, latitude) vertices, or None if the
+            feature is not in the store.
+        """
+        key = (feature, resolution)
+        with self._lock:
+            if key in self._lines:
+                return self._lines[key]
+        path = self.directory / f"{feature}_{resolution}.npz"
+        if path.is_file():
+            with load(path) as data:
+                lines = split(data["vertices"], data["offsets"][1:-1])
+        else:
+            lines = None
+        with self._lock:
+            return self._lines.setdefault(key, lines)
+
+    def path(self, feature, resolution, projection):
+        """Returns the lines of a feature projected into a map projection.
+
+        Args:
+            feature: String name of the feature ("coastlines" or "borders").
+            resolution: String Natural Earth resolution ("110m", "50m" or "10m").
+            projection: Cartopy map projection.
+
+        Returns:
+            A matplotlib Path object in projected coordinates, or None if the feature
+            is not in the store.
+        """
+        key = (feature, resolution, projection_key(projection))
+        with self._lock:
+            if key in self._paths:
+                return self._paths[key]
+        lines = self.lines(feature, resolution)
+        if lines is None:
+            path = None
+        else:
+            geometry = projection.project_geometry(MultiLineString(lines),
+                                                   ccrs.PlateCarree())
+            path = shapely_to_path(geometry)
+        with self._lock:
+            return self._paths.setdefault(key, path)
+
+    def draw(self, axes, feature, resolution="110m", color="black", **kwargs):
+        """Draws a feature on a cartopy GeoAxes.
+
+        Args:
+            axes: Cartopy GeoAxes object.
+            feature: String name of the feature ("coastlines" or "borders").
+            resolution: String Natural Earth resolution ("110m", "50m" or "10m").
+            color: Color of the lines.
+            kwargs: Extra arguments for matplotlib.patches.PathPatch.
+
+        Returns:
+            The PathPatch object, or None if the feature is not in the store.
+        """
+        path = self.path(feature, resolution, axes.projection)
+        if path is None:
+            return None
+        # Like cartopy's features, draw on top of filled contours and images.
+        kwargs.setdefault("zorder", 1.5)
+        patch = PathPatch(path, edgecolor=color, facecolor="none", transform=axes.transData,
+                          **kwargs)
+        # add_artist does not walk the path to update the data limits like add_patch,
+        # which is slow for long paths and not needed because maps set their extent.
+        patch.set_clip_path(axes.patch)
+        return axes.add_artist(patch)
+
+
+def build_geometry_store(directory=default_directory, resolutions=("110m", "50m")):
+    """Simplifies the Natural Earth coastlines and borders and writes them to a store.
+
+    This must be run where cartopy can find (or download) the Natural Earth
+    shapefiles.
+
+    Args:
+        directory: Path to the output directory.
+        resolutions: List of Natural Earth resolutions.
+
+    Returns:
+        List of paths to the geometry files.
+    """
+    from cartopy.io import shapereader
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for feature, (category, name) in features.items():
+        for resolution in resolutions:
+            reader = shapereader.Reader(shapereader.natural_earth(resolution, category, name))
+            lines = []
+            for geometry in reader.geometries():
+                geometry = geometry.simplify(tolerances[resolution], preserve_topology=False)
+                if geometry.geom_type in ("Polygon", "MultiPolygon"):
+                    geometry = geometry.boundary
+                parts = getattr(geometry, "geoms", [geometry])
+                lines += [array(part.coords, dtype=float32) for part in parts
+                          if len(part.coords) > 1]
+            offsets = cumsum([0,] + [len(line) for line in lines])
+            paths.append(directory / f"{feature}_{resolution}.npz")
+            savez_compressed(paths[-1], vertices=concatenate(lines), offsets=offsets)
+    return paths
+
+
+def draw_borders(axes, resolution="110m", **kwargs):
+    """Draws country borders from the default store, or with cartopy (and a warning)
+       if they are not in the store.
+
+    Args:
+        axes: Cartopy GeoAxes object.
+        resolution: String Natural Earth resolution ("110m", "50m" or "10m").
+        kwargs: Extra arguments for matplotlib.patches.PathPatch.
+    """
+    if default_store.draw(axes, "borders", resolution, **kwargs) is None:
+        _warn_missing("borders", resolution)
+        from cartopy.feature import BORDERS
+        axes.add_feature(BORDERS.with_scale(resolution), **kwargs)
+
+
+def draw_coastlines(axes, resolution="110m", **kwargs):
+    """Draws coastlines from the default store, or with cartopy (and a warning) if they
+       are not in the store.
+
+    Args:
+        axes: Cartopy GeoAxes object.
+        resolution: String Natural Earth resolution ("110m", "50m" or "10m").
+        kwargs: Extra arguments for matplotlib.patches.PathPatch.
+    """
+    if default_store.draw(axes, "coastlines", resolution, **kwargs) is None:
+        _warn_missing("coastlines", resolution)
+        axes.coastlines(resolution, **kwargs)
+
+
+def _warn_missing(feature, resolution):
+    """Warns, once per feature, that it is drawn with cartopy because it is not in the
+       default store."""
+    if (feature, resolution) in _missing:
+        return
+    _missing.add((feature, resolution))
+    warn(f"{feature} ({resolution}) are not in the geometry store in"
+         f" {default_store.directory}, so they are drawn with cartopy, which may download"
+         " the Natural Earth files.  Run build-geometry-store to build the store.",
+         stacklevel=3)
+
+
+def main():
+    """Command line tool that builds the geometry store."""
+    parser = ArgumentParser(description="Build the local coastline and border store.")
+    parser.add_argument("--directory", default=default_directory,
+                        help="Path to the output directory.")
+    parser.add_argument("--resolutions", nargs="*", default=["110m", "50m"],
+                        choices=list(tolerances.keys()), help="Natural Earth resolutions.")
+    args = parser.parse_args()
+    for path in build_geometry_store(args.directory, args.resolutions):
+        print(path)
+
+
+# Store used by the renderer and the draw functions.
+default_store = GeometryStore()
+
+# Features that were drawn with cartopy because they are not in the default store.
+_missing = set()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
-from numpy import array, cos, mean, pi, sum
+from numpy import array
 
+from .area_weights import area_weights
+from .grid import get_grid
 from .time_subsets import TimeSubset
 
 
@@ -11,15 +13,22 @@ class GlobalMeanTimeSeries(object):
         self.y_label = units
 
     @classmethod
-    def from_xarray_dataset(cls, dataset, variable):
-        """Instantiates an AnomalyTimeSeries object from an xarray dataset."""
+    def from_xarray_dataset(cls, dataset, variable, cache=None):
+        """Instantiates an AnomalyTimeSeries object from an xarray dataset.
+
+        If an AggregationCache is provided, the annual means are assembled from its
+        partial sums.
+        """
         v = dataset.data_vars[variable]
         axis_attrs = _dimension_order(dataset, v)
 
-        time = TimeSubset(array(dataset.coords[v.dims[0]].data))
-        latitude = array(dataset.coords[v.dims[-2]].data)
-        time, data = time.annual_means(v.data)
-        data = _global_mean(data, latitude)
+        grid = get_grid(dataset.coords[v.dims[-1]].data, dataset.coords[v.dims[-2]].data)
+        if cache is None:
+            time = TimeSubset(array(dataset.coords[v.dims[0]].data))
+            time, data = time.annual_means(v, partial="drop")
+        else:
+            time, data = cache.annual_means(dataset, variable, partial="drop")
+        data = area_weights(grid).global_mean(data)
 
         return cls(data, time, v.attrs["units"])
 
@@ -37,12 +46,3 @@ def _dimension_order(dataset, variable):
         return axis_attrs
     raise ValueError(f"variable {variable} contains unexpected axes ordering {axis_attrs}.")
 
-
-def _global_mean(data, latitude):
-    """Performs a global mean over the longitude and latitude dimensions.
-
-    Returns:
-        Gobal mean value.
-    """
-    weights = cos(2.*pi*latitude/360.)
-    return sum(mean(data, axis=-1)*weights, axis=-1)/sum(weights)
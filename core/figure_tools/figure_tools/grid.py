@@ -0,0 +1,131 @@
+from hashlib import sha1
+from threading import Lock
+from weakref import WeakValueDictionary
+
+from numpy import array, float64
+
+
+# Interned grids, keyed by the hash of their coordinate values.
+_grids = WeakValueDictionary()
+_lock = Lock()
+
+# Interned grids, keyed by the ids of their coordinate arrays, so that maps that are
+# made from another map's coordinates (i.e. by arithmetic) do not hash them again.
+_grids_by_id = WeakValueDictionary()
+
+# Quantities registered for grids (i.e. cell areas read from a static file), keyed by
+# (grid key, name).  Grids are only interned while a map holds them, so registered
+# quantities are kept here, where a grid that is interned again finds them.
+_registered = {}
+_missing = object()
+
+
+class Grid(object):
+    """Immutable pair of coordinate arrays that is shared by all maps on the same grid.
+
+    Grids should be created with get_grid, which interns them by content, so that
+    maps on the same grid hold the same Grid object and can be checked for
+    compatibility with an identity check.  Quantities derived from the coordinates
+    (area weights, cyclic coordinates, etc.) are cached on the grid, and are lost
+    when no map holds it any more, unless they are registered (see store).
+
+    Attributes:
+        key: String hash of the coordinate values.
+        x: Read-only numpy array of x-axis coordinate values.
+        y: Read-only numpy array of y-axis coordinate values.
+    """
+    def __init__(self, x, y, key):
+        self.x = x
+        self.y = y
+        self.key = key
+        self._cache = {}
+
+    def __reduce__(self):
+        """Re-interns grids when they are unpickled (i.e. in another process)."""
+        return get_grid, (self.x, self.y)
+
+    def __repr__(self):
+        return f"Grid(x={self.x.size}, y={self.y.size}, key={self.key[:12]})"
+
+    def cached(self, name, function, register=False):
+        """Returns a quantity derived from the grid, computing it only once.
+
+        Args:
+            name: String name of the quantity.
+            function: Function that computes the quantity.
+            register: Flag that determines if the quantity is registered (see store),
+                      i.e. because it is expensive to read.
+
+        Returns:
+            The return value of function.
+        """
+        try:
+            return self._cache[name]
+        except KeyError:
+            pass
+        with _lock:
+            value = _registered.get((self.key, name), _missing)
+        if value is _missing:
+            value = function()
+            if register:
+                self.store(name, value)
+        self._cache[name] = value
+        return value
+
+    def store(self, name, value):
+        """Registers a quantity for the grid, replacing any cached value.
+
+        Registered quantities are kept for the life of the process, so they are
+        found again even if the grid is released and interned again later.
+
+        Args:
+            name: String name of the quantity.
+            value: The quantity.
+        """
+        with _lock:
+            _registered[(self.key, name)] = value
+        self._cache[name] = value
+
+
+def get_grid(x, y):
+    """Returns the interned grid for the input coordinates.
+
+    Args:
+        x: numpy array of x-axis coordinate values.
+        y: numpy array of y-axis coordinate values.
+
+    Returns:
+        The Grid object shared by all maps with the same coordinate values.
+    """
+    with _lock:
+        grid = _grids_by_id.get((id(x), id(y)))
+    if grid is not None and grid.x is x and grid.y is y:
+        return grid
+    x, y = _read_only(x), _read_only(y)
+    key = _content_hash(x, y)
+    with _lock:
+        grid = _grids.get(key)
+        if grid is None:
+            grid = _grids[key] = Grid(x, y, key)
+            _grids_by_id[(id(x), id(y))] = grid
+    return grid
+
+
+def _content_hash(x, y):
+    """Hashes the shapes and values of the coordinate arrays."""
+    hash_ = sha1()
+    for axis in (x, y):
+        hash_.update(str(axis.shape).encode("utf-8"))
+        hash_.update(axis.tobytes())
+    return hash_.hexdigest()
+
+
+def _read_only(axis):
+    """Creates a read-only float64 copy of a coordinate array.
+
+    The grid is shared by every map with the same coordinates, so it must not see
+    changes that the caller makes to its arrays afterwards.
+    """
+    axis = array(axis, dtype=float64)
+    axis.flags.writeable = False
+    return axis
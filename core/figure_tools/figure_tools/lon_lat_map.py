@@ -1,8 +1,13 @@
 import cartopy.crs as ccrs
 from cartopy.util import add_cyclic
-from numpy import array, array_equal, cos, mean, ndarray, pi, sum
-from xarray import DataArray
+from numpy import asarray, concatenate
 
+from .area_weights import area_weights
+from .coarsen import block_centers, block_factors, block_mean
+from .grid import get_grid
+from .map_expression import MapExpression
+from .regrid import get_regridder
+from .statistics import MapStatistics
 from .time_subsets import TimeSubset
 
 
@@ -10,9 +15,12 @@ class LonLatMap(object):
     """Longitude-latitude data map.
 
     Attributes:
+        add_cyclic_point: Flag that determines if a cyclic point is added when the
+                          map is drawn.
         coastlines: Flag that determines if coastlines are drawn on the map.
         data: numpy array of data values.
         data_label: String units for the colorbar.
+        grid: Grid object holding the longitude and latitude values.
         projection: Cartopy map projection to use.
         x_data: numpy array of data values for the x-axis.
         xlabel: String label for the x-axis ("Longitude")
@@ -22,120 +30,199 @@ class LonLatMap(object):
     def __init__(self, data, longitude, latitude, units=None,
                  projection=ccrs.Mollweide(), coastlines=True, add_cyclic_point=True,
                  timestamp=None):
-        if add_cyclic_point:
-            self.data, self.x_data, self.y_data = add_cyclic(data[...], longitude[...],
-                                                             latitude[...])
-        else:
-            self.data = data[...]
-            self.x_data = longitude[...]
-            self.y_data = latitude[...]
+        self.data = read_only_view(data)
+        self.grid = get_grid(longitude, latitude)
+        self.add_cyclic_point = add_cyclic_point
         self.projection = projection
         self.coastlines = coastlines
         self.x_label = "Longitude"
         self.y_label = "Latitude"
         self.data_label = units
         self.timestamp = timestamp
+        self._statistics = None
 
     def __add__(self, arg):
         """Allows LonLatMap objects to be added together."""
+        if isinstance(arg, MapExpression):
+            return self.lazy() + arg
         self._compatible(arg)
-        return LonLatMap(self.data + arg.data, self.x_data, self.y_data,
-                         units=self.data_label, projection=self.projection,
-                         coastlines=self.coastlines, add_cyclic_point=False,
-                         timestamp=self.timestamp)
+        return self._like(self.data + arg.data)
 
     def __sub__(self, arg):
         """Allows LonLatMap objects to be subtracted from one another."""
+        if isinstance(arg, MapExpression):
+            return self.lazy() - arg
         self._compatible(arg)
-        return LonLatMap(self.data - arg.data, self.x_data, self.y_data,
-                         units=self.data_label, projection=self.projection,
-                         coastlines=self.coastlines, add_cyclic_point=False,
-                         timestamp=self.timestamp)
+        return self._like(self.data - arg.data)
+
+    def coarsen(self, shape):
+        """Block-averages the data to about the resolution that it is displayed at.
+
+        The averages are area-weighted and skip missing values.
+
+        Args:
+            shape: Tuple of the number of (rows, columns) of pixels that the map is
+                   displayed on.
+
+        Returns:
+            A LonLatMap object, which is this map if it is not finer than the pixels.
+        """
+        factors = block_factors(self.data.shape, shape)
+        if factors == (1, 1):
+            return self
+        data = block_mean(self.data, area_weights(self.grid).weights, factors)
+        return LonLatMap(data, block_centers(self.x_data, factors[1]),
+                         block_centers(self.y_data, factors[0]), units=self.data_label,
+                         projection=self.projection, coastlines=self.coastlines,
+                         add_cyclic_point=self.add_cyclic_point, timestamp=self.timestamp)
+
+    def cyclic(self):
+        """Adds the cyclic point to the data, which is only needed to draw the map.
+
+        Returns:
+            numpy arrays of data values, longitudes and latitudes.
+        """
+        if not self.add_cyclic_point:
+            return self.data, self.x_data, self.y_data
+        longitude = self.grid.cached("cyclic_x", lambda: add_cyclic(self.x_data,
+                                                                    x=self.x_data)[1])
+        if longitude.size == self.x_data.size:
+            # The longitudes are already cyclic.
+            return self.data, self.x_data, self.y_data
+        return concatenate((self.data, self.data[..., :1]), axis=-1), longitude, self.y_data
+
+    @property
+    def statistics(self):
+        """MapStatistics of the data, which are calculated the first time they are
+           needed."""
+        if self._statistics is None:
+            self._statistics = MapStatistics(self.data, area_weights(self.grid))
+        return self._statistics
+
+    @property
+    def x_data(self):
+        return self.grid.x
+
+    @property
+    def y_data(self):
+        return self.grid.y
+
+    def lazy(self):
+        """Starts a lazy arithmetic expression.
+
+        Returns:
+            A MapExpression that is evaluated in a single pass when its evaluate
+            method is called.
+        """
+        return MapExpression([(1, self),])
 
     @classmethod
     def from_xarray_dataset(cls, dataset, variable, time_method=None, time_index=None,
-                            year=None, year_range=None, month_range=None):
-        """Instantiates a LonLatMap object from an xarray dataset."""
+                            year=None, year_range=None, month_range=None, cache=None):
+        """Instantiates a LonLatMap object from an xarray dataset.
+
+        If an AggregationCache is provided, annual means and climatologies are
+        assembled from its partial sums, so the raw data is only read the first time
+        the variable is used.
+        """
         v = dataset.data_vars[variable]
-        data = array(v.data[...])
+        data = v
         axis_attrs = _dimension_order(dataset, v)
-        longitude = array(dataset.coords[v.dims[-1]].data[...])
-        latitude = array(dataset.coords[v.dims[-2]].data[...])
+        longitude = asarray(dataset.coords[v.dims[-1]].data)
+        latitude = asarray(dataset.coords[v.dims[-2]].data)
 
         if axis_attrs[0] == "t":
-            time = array(dataset.coords[v.dims[0]].data[...])
+            time = asarray(dataset.coords[v.dims[0]].data)
             if time_method == "instantaneous":
                 if time_method == None:
                     raise ValueError("time_index is required when time_method='instantaneous.'")
-                data = data[time_index, ...]
+                data = asarray(data[time_index, ...])
                 timestamp = f"@ {str(time[time_index])}"
             elif time_method == "annual mean":
                 if year == None:
                     raise ValueError("year is required when time_method='annual mean'.")
-                time = TimeSubset(time)
-                data = time.annual_mean(data, year)
+                if cache is None:
+                    data = TimeSubset(time).annual_mean(data, year)
+                else:
+                    data = cache.annual_mean(dataset, variable, year)
                 timestamp = r"$\bar{t} = $" + str(year)
             elif "climatology" in time_method:
                 if year_range == None or len(year_range) != 2:
                     raise ValueError("year_range is required ([star year, end year]" +
                                      " when time_method is a climatology.")
                 if time_method == "annual climatology":
-                    time = TimeSubset(time)
-                    data = time.annual_climatology(data, year_range)
+                    if cache is None:
+                        data = TimeSubset(time).annual_climatology(data, year_range)
+                    else:
+                        data = cache.annual_climatology(dataset, variable, year_range)
                     timestamp = f"{year_range[0]} - {year_range[1]} annual climatology"
                 elif time_method == "seasonal climatology":
                     if month_range == None or len(month_range) != 2:
                         raise ValueError("month_range is required ([start month, end month])" +
                                          " when time_method='seasonal climatology'.")
-                    time = TimeSubset(time)
-                    data = time.seasonal_climatology(data, year_range, month_range)
+                    if cache is None:
+                        data = TimeSubset(time).seasonal_climatology(data, year_range,
+                                                                     month_range)
+                    else:
+                        data = cache.seasonal_climatology(dataset, variable, year_range,
+                                                          month_range)
                     timestamp = ""
             else:
                 valid_values = ["instantaneous", "annual mean", "annual climatology",
                                 "seasonal climatology"]
                 raise ValueError(f"time_method must one of :{valid_values}.")
         else:
+            data = asarray(v.data)
             timestamp = None
 
         return cls(data, longitude, latitude, units=v.attrs["units"], timestamp=timestamp)
 
-    def global_mean(self):
+    def global_mean(self, mask=None):
         """Performs a global mean over the longitude and latitude dimensions.
 
+        Args:
+            mask: Boolean numpy array that is True for cells that should be included
+                  in the mean (i.e. land cells).
+
         Returns:
             Gobal mean value.
         """
+        if mask is None:
+            return self.statistics.global_mean
+        return area_weights(self.grid).global_mean(self.data, mask)
 
-        weights = cos(2.*pi*self.y_data/360.)
-        return sum(mean(self.data, axis=-1)*weights, axis=-1)/sum(weights)
-
-    def regrid_to_map(self, map_):
+    def regrid_to_map(self, map_, method="bilinear"):
         """Regrid the data to match in the input map.
 
+        The regridding weights for each pair of grids are computed once and cached.
+
         Args:
             map_: A LonLatMap to regrid to.
+            method: String regridding method ("bilinear" or "conservative").
         """
         if not isinstance(map_, LonLatMap):
             raise TypeError("input map must be a LonLatMap.")
-        try:
-            self._compatible(map_)
+        if map_.grid is self.grid:
             return
-        except ValueError:
-            da = DataArray(self.data, dims=["y", "x"],
-                           coords={"x": self.x_data, "y": self.y_data})
-            da2 = DataArray(map_.data, dims=["y", "x"],
-                            coords={"x": map_.x_data, "y": map_.y_data})
-            self.data = array(da.interp_like(da2, kwargs={"fill_value": "extrapolate"}))
-            self.x_data = map_.x_data
-            self.y_data = map_.y_data
+        regridder = get_regridder(self.grid, map_.grid, method)
+        self.data = read_only_view(regridder(self.data))
+        self.grid = map_.grid
+        self._statistics = None
+
+    def _like(self, data):
+        """Creates a LonLatMap with the input data and the same grid and metadata."""
+        return LonLatMap(data, self.x_data, self.y_data, units=self.data_label,
+                         projection=self.projection, coastlines=self.coastlines,
+                         add_cyclic_point=self.add_cyclic_point, timestamp=self.timestamp)
 
     def _compatible(self, arg):
         """Raises a ValueError if two objects are not compatible."""
         if not isinstance(arg, LonLatMap):
             raise TypeError("input map must be a LonLatMap.")
-        for attr in ["x_data", "y_data", "projection", "data_label"]:
-            if isinstance(getattr(self, attr), ndarray):
-                equal = array_equal(getattr(self, attr), getattr(arg, attr))
+        for attr in ["grid", "projection", "data_label"]:
+            if attr == "grid":
+                # Grids are interned, so identical grids are the same object.
+                equal = self.grid is arg.grid
             else:
                 equal = getattr(self, attr) == getattr(arg, attr)
             if not equal:
@@ -156,3 +243,17 @@ def _dimension_order(dataset, variable):
         if axis_attrs == config:
             return axis_attrs
     raise ValueError(f"variable {variable} contains unexpected axes ordering {axis_attrs}.")
+
+
+def read_only_view(data):
+    """Returns a read-only view of the input array without copying it.
+
+    Args:
+        data: numpy array (or object that can be converted to one).
+
+    Returns:
+        A read-only numpy array that shares memory with the input.
+    """
+    view = asarray(data).view()
+    view.flags.writeable = False
+    return view
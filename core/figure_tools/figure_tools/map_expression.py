@@ -0,0 +1,102 @@
+from numbers import Number
+
+from numpy import add, copyto, empty, multiply, result_type, subtract
+
+
+# Approximate size in bytes of the blocks of output that are evaluated at once, so that
+# a block stays in cache while every term is accumulated into it.
+_block_size = 256*1024
+
+
+class MapExpression(object):
+    """Lazy arithmetic expression of LonLatMap or ZonalMeanMap objects.
+
+    Adding and subtracting maps (or multiplying them by scalars) builds up the
+    expression instead of allocating a temporary array for every operation.  The
+    expression is flattened into a list of (coefficient, map) terms as it is built,
+    and is evaluated in one pass into a single preallocated output array.  For
+    example:
+
+        budget = (maps["rlds"].lazy() + maps["rsds"] - maps["rlus"] - maps["rsus"]).evaluate()
+
+    Attributes:
+        terms: List of (coefficient, map) tuples.
+    """
+    def __init__(self, terms):
+        self.terms = list(terms)
+
+    def __add__(self, arg):
+        return MapExpression(self.terms + _terms(arg))
+
+    def __radd__(self, arg):
+        return MapExpression(_terms(arg) + self.terms)
+
+    def __sub__(self, arg):
+        return MapExpression(self.terms + [(-1*c, m) for c, m in _terms(arg)])
+
+    def __rsub__(self, arg):
+        return MapExpression(_terms(arg) + [(-1*c, m) for c, m in self.terms])
+
+    def __neg__(self):
+        return MapExpression([(-1*c, m) for c, m in self.terms])
+
+    def __mul__(self, arg):
+        if not isinstance(arg, Number):
+            raise TypeError("expressions can only be multiplied by scalars.")
+        return MapExpression([(arg*c, m) for c, m in self.terms])
+
+    __rmul__ = __mul__
+
+    def evaluate(self):
+        """Checks that all of the maps are compatible and evaluates the expression.
+
+        Returns:
+            A map of the same type as the maps in the expression.
+        """
+        first = self.terms[0][1]
+        for _, map_ in self.terms[1:]:
+            if map_ is not first:
+                first._compatible(map_)
+
+        data = [m.data for _, m in self.terms]
+        # The coefficients can promote the type (i.e. integer data times 0.5).
+        out = empty(first.data.shape,
+                    dtype=result_type(*data, *(c for c, _ in self.terms)))
+
+        # Evaluate the expression over blocks of rows (second-to-last axis).
+        if out.ndim > 1:
+            rows = out.shape[-2]
+            block = max(1, _block_size*rows//max(1, out.nbytes))
+            blocks = [(Ellipsis, slice(x, x + block), slice(None))
+                      for x in range(0, rows, block)]
+        else:
+            blocks = [(Ellipsis,),]
+        scratch = None
+        for index in blocks:
+            o = out[index]
+            for i, ((coefficient, _), d) in enumerate(zip(self.terms, data)):
+                d = d[index]
+                if i == 0:
+                    if coefficient == 1:
+                        copyto(o, d)
+                    else:
+                        multiply(d, coefficient, out=o)
+                elif coefficient == 1:
+                    add(o, d, out=o)
+                elif coefficient == -1:
+                    subtract(o, d, out=o)
+                else:
+                    if scratch is None or scratch.shape != o.shape:
+                        scratch = empty(o.shape, dtype=out.dtype)
+                    multiply(d, coefficient, out=scratch)
+                    add(o, scratch, out=o)
+        return first._like(out)
+
+
+def _terms(arg):
+    """Converts the input map or expression to a list of (coefficient, map) terms."""
+    if isinstance(arg, MapExpression):
+        return arg.terms
+    if hasattr(arg, "lazy"):
+        return [(1, arg),]
+    raise TypeError("only maps and map expressions can be added or subtracted.")
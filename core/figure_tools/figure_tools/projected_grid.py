@@ -0,0 +1,243 @@
+from collections import OrderedDict
+from threading import Lock
+
+import cartopy.crs as ccrs
+from numpy import abs, arange, argsort, asarray, clip, concatenate, diff, float64, full, \
+                  hypot, isfinite, meshgrid, median, nan, r_, searchsorted, unique, where
+
+from .grid import get_grid
+
+
+# Projections whose boundary is the meridian opposite their central longitude, so
+# that a global grid can be unrolled into one continuous mesh.
+_cylindrical = (ccrs.EqualEarth, ccrs.LambertCylindrical, ccrs.Miller, ccrs.Mollweide,
+                ccrs.PlateCarree, ccrs.Robinson, ccrs.Sinusoidal)
+
+# Most recently used projected grids and pixel indices, keyed by grid and projection.
+_max_entries = 16
+_projected = OrderedDict()
+_lock = Lock()
+
+
+class ProjectedGrid(object):
+    """Longitude-latitude grid whose cell centers have been projected into a map
+       projection.
+
+    Contouring data on the projected mesh (and drawing it with the projection as its
+    transform) skips cartopy's reprojection of every contour path, which is far
+    slower than contouring itself.  The longitudes are reordered to run continuously
+    from one edge of the projection to the other, and a column is added at each edge
+    whose values are interpolated between the first and last columns (the western
+    edge column is left out if the first column already lies on the edge).
+
+    Attributes:
+        columns: Integer numpy array of the source longitude index of each column.
+        edge_weight: Weight of the last column in the interpolated edge columns.
+        west_edge: Flag telling if a column is added at the western edge.
+        x: numpy array of projected x coordinates with (latitude, column) dimensions.
+        y: numpy array of projected y coordinates with (latitude, column) dimensions.
+    """
+    def __init__(self, columns, edge_weight, west_edge, x, y):
+        self.columns = columns
+        self.edge_weight = edge_weight
+        self.west_edge = west_edge
+        self.x = x
+        self.y = y
+
+    def project(self, data):
+        """Reorders data to match the projected mesh.
+
+        Args:
+            data: numpy array with (latitude, longitude) dimensions.
+
+        Returns:
+            numpy array with (latitude, column) dimensions.
+        """
+        data = data[..., self.columns]
+        edge = data[..., :1]*(1. - self.edge_weight) + data[..., -1:]*self.edge_weight
+        if self.west_edge:
+            return concatenate((edge, data, edge), axis=-1)
+        return concatenate((data, edge), axis=-1)
+
+
+def projected_grid(longitude, latitude, projection):
+    """Returns the cached projected mesh of a global longitude-latitude grid.
+
+    Args:
+        longitude: numpy array of longitudes.
+        latitude: numpy array of latitudes.
+        projection: Cartopy map projection.
+
+    Returns:
+        A ProjectedGrid object, or None if the grid or projection are not supported (in
+        which case cartopy should project the contours).
+    """
+    if not isinstance(projection, _cylindrical):
+        return None
+    key = ("mesh", get_grid(longitude, latitude).key, projection_key(projection))
+    return _cached(key, lambda: _project(longitude, latitude, projection))
+
+
+def pixel_index(longitude, latitude, projection, shape):
+    """Returns the cached map from the pixels of a map projection to grid cells.
+
+    Args:
+        longitude: numpy array of longitudes.
+        latitude: numpy array of latitudes.
+        projection: Cartopy map projection.
+        shape: Tuple of the number of (rows, columns) of pixels.
+
+    Returns:
+        A PixelIndex object.
+    """
+    key = ("pixels", get_grid(longitude, latitude).key, projection_key(projection),
+           tuple(shape))
+    return _cached(key, lambda: PixelIndex.from_grid(longitude, latitude, projection,
+                                                     shape))
+
+
+class PixelIndex(object):
+    """Map from the pixels of a map projection's domain to the grid cell that covers
+       each of them, so that data can be resampled into an image without projecting
+       anything.
+
+    Attributes:
+        extent: Tuple of the (left, right, bottom, top) projected coordinates of the
+                image.
+        index: Integer numpy array of the flat (latitude*longitude) grid index of each
+               pixel with (row, column) dimensions, or -1 for pixels that are outside
+               of the grid or the projection's domain.
+    """
+    def __init__(self, index, extent):
+        self.index = index
+        self.extent = extent
+
+    @classmethod
+    def from_grid(cls, longitude, latitude, projection, shape):
+        """Finds the grid cell that is closest to the center of each pixel.
+
+        Args:
+            longitude: numpy array of longitudes.
+            latitude: numpy array of latitudes.
+            projection: Cartopy map projection.
+            shape: Tuple of the number of (rows, columns) of pixels.
+
+        Returns:
+            A PixelIndex object.
+        """
+        rows, columns = shape
+        (left, right), (bottom, top) = projection.x_limits, projection.y_limits
+        x, y = meshgrid(left + (arange(columns) + 0.5)*(right - left)/columns,
+                        bottom + (arange(rows) + 0.5)*(top - bottom)/rows)
+        points = ccrs.PlateCarree().transform_points(projection, x, y)
+        lon, lat = points[..., 0], points[..., 1]
+
+        # Pixels outside of the projection's domain do not map back onto themselves.
+        valid = isfinite(lon) & isfinite(lat)
+        lon, lat = where(valid, lon, 0.), where(valid, lat, 0.)
+        back = projection.transform_points(ccrs.PlateCarree(), lon, lat)
+        size = max(right - left, top - bottom)/max(rows, columns)
+        valid &= hypot(back[..., 0] - x, back[..., 1] - y) < size
+
+        i, inside_x = _nearest(asarray(longitude, dtype=float64), lon, periodic=True)
+        j, inside_y = _nearest(asarray(latitude, dtype=float64), lat, periodic=False)
+        index = where(valid & inside_x & inside_y, j*len(longitude) + i, -1)
+        return cls(index, (left, right, bottom, top))
+
+    def resample(self, data):
+        """Resamples data into an image.
+
+        Args:
+            data: numpy array with (latitude, longitude) dimensions.
+
+        Returns:
+            numpy array with (row, column) dimensions, with NaN outside of the grid.
+        """
+        values = asarray(data, dtype=float64).ravel()[clip(self.index, 0, None)]
+        values[self.index < 0] = nan
+        return values
+
+
+def projection_key(projection):
+    """Returns a hashable key that identifies a cartopy projection."""
+    return (type(projection).__name__, projection.proj4_init)
+
+
+def _project(longitude, latitude, projection):
+    """Projects a global longitude-latitude grid, or returns None if it is not global."""
+    # Unroll the longitudes so that they increase from the western edge of the
+    # projection, which is opposite its center (the central longitude is not always
+    # lon_0, i.e. PlateCarree shifts the prime meridian instead).  A cyclic point, if
+    # present, becomes a duplicate and is dropped.
+    center, _ = ccrs.PlateCarree().transform_point(0.5*sum(projection.x_limits), 0.,
+                                                   projection)
+    if not isfinite(center):
+        return None
+    west = center - 180.
+    shifted, columns = unique(west + (longitude - west) % 360., return_index=True)
+    if shifted.size < 2:
+        return None
+    spacing = median(diff(shifted))
+    gap = shifted[0] + 360. - shifted[-1]
+    if gap > 1.5*spacing:
+        # The grid is not global.
+        return None
+
+    # Nudge the edge columns inside of the projection's boundary.
+    epsilon = 1.e-6*spacing
+    west_edge = shifted[0] > west + epsilon
+    if west_edge:
+        x = concatenate(([west + epsilon], shifted, [west + 360. - epsilon]))
+    else:
+        x = concatenate(([west + epsilon], shifted[1:], [west + 360. - epsilon]))
+    x, y = meshgrid(x, latitude)
+    points = projection.transform_points(ccrs.PlateCarree(), x, y)
+    if not isfinite(points[..., :2]).all() or (diff(points[..., 0], axis=-1) <= 0).any():
+        # The mesh is not continuous.
+        return None
+    return ProjectedGrid(columns, (shifted[0] - west)/gap, west_edge, points[..., 0],
+                         points[..., 1])
+
+
+def _cached(key, function):
+    """Returns a cached value, computing and storing it if necessary."""
+    with _lock:
+        if key in _projected:
+            _projected.move_to_end(key)
+            return _projected[key]
+    value = function()
+    with _lock:
+        _projected[key] = value
+        while len(_projected) > _max_entries:
+            _projected.popitem(last=False)
+    return value
+
+
+def _nearest(axis, values, periodic):
+    """Finds the index of the closest axis value (i.e. cell center) to each value.
+
+    Args:
+        axis: numpy array of cell centers.
+        values: numpy array of values.
+        periodic: Flag telling if the axis is a longitude axis that may wrap around.
+
+    Returns:
+        Integer numpy array of the axis indices and a boolean numpy array telling if
+        each value is inside of the axis' cells.
+    """
+    order = argsort(axis, kind="stable")
+    centers = axis[order]
+    spacing = median(diff(centers)) if centers.size > 1 else 360.
+    wraps = False
+    if periodic:
+        values = centers[0] + (values - centers[0]) % 360.
+        wraps = centers[0] + 360. - centers[-1] <= 1.5*spacing
+        if wraps:
+            # Let values past the last cell wrap around to the first one.
+            centers = r_[centers, centers[0] + 360.]
+            order = r_[order, order[0]]
+    k = clip(searchsorted(centers, values), 1, centers.size - 1)
+    k = where(abs(values - centers[k - 1]) <= abs(centers[k] - values), k - 1, k)
+    if wraps:
+        return order[k], full(values.shape, True)
+    return order[k], abs(centers[k] - values) <= 0.5*spacing*(1. + 1.e-6)
@@ -0,0 +1,156 @@
+from argparse import ArgumentParser
+import json
+from pathlib import Path
+from shutil import rmtree
+
+from xarray import open_dataset
+
+
+# Global attribute of the indexed dataset that lists the files that the index was
+# built from, so that a stale index can be detected.
+_sources_attribute = "reference_index_sources"
+
+
+def build_reference_index(paths, output, concat_dim="time", inline_threshold=300,
+                          parallel=False):
+    """Builds a byte-range reference index (kerchunk format) over a set of netCDF files.
+
+    The HDF5 metadata of every file is parsed once and the locations of all of the
+    chunks are stored in the index, so that the whole collection can later be opened
+    as a single virtual zarr store without touching the metadata of each file.
+
+    Args:
+        paths: List of paths to the netCDF files, sorted in time.
+        output: Path to the output index.  Indices ending in ".json" are written as
+                json, otherwise they are written as a parquet directory.
+        concat_dim: Name of the dimension the files are concatenated along.
+        inline_threshold: Chunks smaller than this number of bytes (i.e. coordinates)
+                          are stored directly in the index.
+        parallel: Flag that determines if the files are parsed in parallel with dask.
+
+    Returns:
+        Path to the index.
+    """
+    from kerchunk.combine import MultiZarrToZarr
+    from kerchunk.hdf import SingleHdf5ToZarr
+
+    def translate(path):
+        return SingleHdf5ToZarr(str(path), inline_threshold=inline_threshold).translate()
+
+    if parallel:
+        import dask
+        references = list(dask.compute(*[dask.delayed(translate)(x) for x in paths]))
+    else:
+        references = [translate(x) for x in paths]
+    if len(references) == 1:
+        combined = references[0]
+    else:
+        # Variables without the concatenation dimension (i.e. lat, lon, lat_bnds)
+        # are assumed to be the same in all of the files.
+        combined = MultiZarrToZarr(references, concat_dims=[concat_dim,],
+                                   identical_dims=_static_variables(references[0],
+                                                                    concat_dim)).translate()
+
+    # Record the source files in the dataset's global attributes.
+    attrs = combined["refs"].get(".zattrs", {})
+    attrs = json.loads(attrs) if isinstance(attrs, (str, bytes)) else dict(attrs)
+    attrs[_sources_attribute] = [str(x) for x in paths]
+    combined["refs"][".zattrs"] = json.dumps(attrs)
+
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    if output.is_dir():
+        # Parquet indices are directories, which are not overwritten.
+        rmtree(output)
+    if output.suffix == ".json":
+        with open(output, "w") as index:
+            json.dump(combined, index)
+    else:
+        from kerchunk.df import refs_to_dataframe
+        refs_to_dataframe(combined, str(output))
+    return output
+
+
+def open_reference_index(path, chunks=None, **kwargs):
+    """Opens a collection of files described by a reference index as one dataset.
+
+    Args:
+        path: Path to a json or parquet reference index.
+        chunks: Dictionary of dask chunk sizes.  Defaults to the chunking of the
+                underlying files.
+        kwargs: Extra keyword arguments passed to xarray.open_dataset.
+
+    Returns:
+        An xarray Dataset.
+    """
+    dataset = _open(path, chunks={} if chunks is None else chunks, **kwargs)
+    dataset.attrs.pop(_sources_attribute, None)
+    return dataset
+
+
+def reference_index_sources(path):
+    """Returns the paths to the files that a reference index was built from.
+
+    Args:
+        path: Path to a json or parquet reference index.
+
+    Returns:
+        List of string paths, or None if the index does not exist or does not record
+        its source files.
+    """
+    if not Path(path).exists():
+        return None
+    with _open(path) as dataset:
+        sources = dataset.attrs.get(_sources_attribute)
+    return None if sources is None else [str(x) for x in sources]
+
+
+def _open(path, **kwargs):
+    """Opens a reference index as a lazy xarray Dataset."""
+    return open_dataset("reference://", engine="zarr",
+                        backend_kwargs={"consolidated": False,
+                                        "storage_options": {"fo": str(path)}},
+                        **kwargs)
+
+
+def _static_variables(references, concat_dim):
+    """Finds the variables that do not depend on the concatenation dimension.
+
+    Args:
+        references: Dictionary of kerchunk references for a single file.
+        concat_dim: Name of the dimension the files are concatenated along.
+
+    Returns:
+        List of string variable names.
+    """
+    names = []
+    for key, value in references["refs"].items():
+        if key.endswith("/.zattrs"):
+            attrs = json.loads(value) if isinstance(value, str) else value
+            if concat_dim not in attrs.get("_ARRAY_DIMENSIONS", [concat_dim,]):
+                names.append(key[:-len("/.zattrs")])
+    return sorted(names)
+
+
+def main():
+    """Command line tool that builds a reference index for a variable in a catalog."""
+    parser = ArgumentParser(description="Build a reference index over a catalog's files.")
+    parser.add_argument("catalog", help="Path to the intake-esm catalog json file.")
+    parser.add_argument("variable", help="Name of the variable.")
+    parser.add_argument("output", help="Path to the output index (.json or .parq).")
+    parser.add_argument("--query", nargs="*", default=[], metavar="KEY=VALUE",
+                        help="Extra catalog search parameters.")
+    args = parser.parse_args()
+
+    import intake
+
+    from .catalog_loader import catalog_paths
+
+    query_params = dict(x.split("=", 1) for x in args.query)
+    catalog = intake.open_esm_datastore(args.catalog).search(variable_id=args.variable,
+                                                             **query_params)
+    print(build_reference_index(catalog_paths(catalog, args.variable), args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+from hashlib import sha1
+
+from matplotlib.path import Path
+from numpy import abs, arange, argsort, asarray, concatenate, diff, errstate, float64, \
+                  full, isfinite, median, meshgrid, nan, nonzero, ones, stack, where
+from scipy.sparse import csr_matrix
+
+from .area_weights import area_weights
+
+
+class Region(object):
+    """Named longitude-latitude region, defined by a bounding box or a polygon.
+
+    Attributes:
+        box: Tuple of (min longitude, max longitude, min latitude, max latitude), or None.
+        name: String name of the region.
+        polygon: numpy array of (longitude, latitude) vertices, or None.
+    """
+    def __init__(self, name, box=None, polygon=None):
+        if (box is None) == (polygon is None):
+            raise ValueError("a region must be defined by either a box or a polygon.")
+        self.name = name
+        self.box = None if box is None else tuple(float(x) for x in box)
+        self.polygon = None if polygon is None else asarray(polygon, dtype=float64)
+
+    def __repr__(self):
+        return f"Region({self.name})"
+
+    @property
+    def extent(self):
+        """Returns the (min longitude, max longitude, min latitude, max latitude) of the region."""
+        if self.box is not None:
+            return self.box
+        return (self.polygon[:, 0].min(), self.polygon[:, 0].max(),
+                self.polygon[:, 1].min(), self.polygon[:, 1].max())
+
+    def mask(self, grid):
+        """Rasterizes the region onto a grid, using the cell centers.
+
+        Args:
+            grid: Grid object with longitude x values and latitude y values.
+
+        Returns:
+            Boolean numpy array with (latitude, longitude) dimensions.
+        """
+        min_lon, max_lon, min_lat, max_lat = self.extent
+        if self.box is not None:
+            # Longitudes are compared modulo 360 so that boxes may cross the date line.
+            span = max_lon - min_lon
+            if span >= 360.:
+                lon = ones(grid.x.size, dtype=bool)
+            else:
+                lon = ((grid.x - min_lon) % 360.) <= span
+            lat = (grid.y >= min_lat) & (grid.y <= max_lat)
+            return lat[:, None] & lon[None, :]
+        x, y = meshgrid(min_lon + (grid.x - min_lon) % 360., grid.y)
+        inside = Path(self.polygon).contains_points(stack((x.ravel(), y.ravel()), axis=-1))
+        return inside.reshape(x.shape)
+
+    def window(self, grid, halo=2):
+        """Finds the part of a grid that covers the region's extent, so that only it
+           has to be drawn.
+
+        Args:
+            grid: Grid object with longitude x values and latitude y values.
+            halo: Number of extra cells to include around the extent.
+
+        Returns:
+            Tuple of numpy arrays of the latitude indices, longitude indices and
+            longitudes of the window.  The longitudes are shifted so that they increase
+            continuously across the date line or prime meridian.
+        """
+        min_lon, max_lon, min_lat, max_lat = self.extent
+        dx, dy = [median(abs(diff(axis))) if axis.size > 1 else 0.
+                  for axis in (grid.x, grid.y)]
+        latitude = nonzero((grid.y >= min_lat - halo*dy) & (grid.y <= max_lat + halo*dy))[0]
+        start = min_lon - halo*dx
+        shifted = start + (grid.x - start) % 360.
+        longitude = nonzero(shifted <= max_lon + halo*dx)[0]
+        longitude = longitude[argsort(shifted[longitude], kind="stable")]
+        return latitude, longitude, shifted[longitude]
+
+    def _key(self):
+        """Returns a string that uniquely identifies the region's definition."""
+        if self.box is not None:
+            return f"{self.name}:box:{self.box}"
+        return f"{self.name}:polygon:{self.polygon.tobytes().hex()}"
+
+
+class Regions(object):
+    """Ordered collection of regions, whose statistics are calculated together.
+
+    Attributes:
+        key: String hash of the region definitions.
+        regions: List of Region objects.
+    """
+    def __init__(self, regions):
+        self.regions = list(regions)
+        self.key = sha1("\n".join(r._key() for r in self.regions).encode("utf-8")).hexdigest()
+
+    def __getitem__(self, i):
+        return self.regions[i]
+
+    def __iter__(self):
+        return iter(self.regions)
+
+    def __len__(self):
+        return len(self.regions)
+
+    @property
+    def names(self):
+        return [r.name for r in self.regions]
+
+    def labels(self, grid):
+        """Returns the cached region labels for a grid, rasterizing the regions once.
+
+        Args:
+            grid: Grid object with longitude x values and latitude y values.
+
+        Returns:
+            A RegionLabels object.
+        """
+        return grid.cached(f"region_labels:{self.key}",
+                           lambda: RegionLabels([r.mask(grid) for r in self.regions]))
+
+
+class RegionLabels(object):
+    """Integer label arrays of a set of regions on a grid.
+
+    Each cell is labeled with the index of the region it belongs to, or -1.  Regions
+    that overlap (i.e. a box inside of another box) are stored in additional layers.
+
+    Attributes:
+        cells: Flat (latitude*longitude) grid index of every labeled cell of every layer.
+        layers: Read-only integer numpy array with (layer, latitude, longitude) dimensions.
+        regions: Region index of every entry in cells.
+        size: Number of regions.
+    """
+    def __init__(self, masks):
+        self.size = len(masks)
+        layers = []
+        for i, mask in enumerate(masks):
+            for layer in layers:
+                if not (mask & (layer >= 0)).any():
+                    break
+            else:
+                layer = full(mask.shape, -1)
+                layers.append(layer)
+            layer[mask] = i
+        self.layers = stack(layers)
+        self.layers.flags.writeable = False
+        flat = self.layers.reshape((len(layers), -1))
+        self.cells = concatenate([(l >= 0).nonzero()[0] for l in flat])
+        self.regions = concatenate([l[l >= 0] for l in flat])
+
+
+def regional_means(data, grid, regions, weights=None, index=None):
+    """Calculates area-weighted means over each region for all leading dimensions
+       (i.e. every time step) in a single segment reduction.
+
+    The labeled cells and their weights form a sparse (cell, region) matrix, so the
+    sums for every region and time step come from one sparse matrix product.  NaN
+    values are left out of the means.
+
+    Args:
+        data: numpy array with (..., latitude, longitude) dimensions, or with (..., cell)
+              dimensions if index is provided.
+        grid: Grid object with longitude x values and latitude y values.
+        regions: Regions object.
+        weights: numpy array of weights with (latitude, longitude) dimensions (i.e. cell
+                 or land area).  Defaults to the grid's area weights.
+        index: numpy array of the flat (latitude*longitude) grid index of each cell of
+               compressed data (i.e. land points).
+
+    Returns:
+        numpy array with (..., region) dimensions.  Regions without any valid cells are
+        NaN.
+    """
+    labels = regions.labels(grid)
+    if weights is None:
+        weights = area_weights(grid).weights
+    weights = asarray(weights, dtype=float64).ravel()
+
+    data = asarray(data)
+    cells, region = labels.cells, labels.regions
+    if index is None:
+        shape = data.shape[:-2]
+    else:
+        shape = data.shape[:-1]
+        # Map grid cells to positions in the compressed data.
+        position = full(weights.size, -1)
+        position[index] = arange(index.size)
+        keep = position[cells] >= 0
+        cells, region = position[cells[keep]], region[keep]
+        weights = weights[index]
+    segments = csr_matrix((weights[cells], (cells, region)),
+                          shape=(weights.size, labels.size))
+
+    flat = data.reshape((-1, weights.size))
+    valid = isfinite(flat)
+    if valid.all():
+        sums = flat @ segments
+        total = asarray(segments.sum(axis=0))
+    else:
+        sums = where(valid, flat, 0.) @ segments
+        total = valid.astype(float64) @ segments
+    with errstate(invalid="ignore", divide="ignore"):
+        means = where(total > 0, sums/total, nan)
+    return means.reshape(shape + (labels.size,))
+
+
+# Continental bounding boxes.
+continents = Regions([
+    Region("North America", box=(-170, -47, 0, 85)),
+    Region("South America", box=(-90, -30, -60, 15)),
+    Region("Europe", box=(-10, 60, 30, 75)),
+    Region("Africa", box=(-20, 50, -35, 37)),
+    Region("Asia", box=(60, 150, 5, 75)),
+    Region("Australia", box=(110, 180, -50, 0)),
+])
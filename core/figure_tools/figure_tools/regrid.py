@@ -0,0 +1,256 @@
+from os import environ, fdopen, remove, replace
+from pathlib import Path
+from tempfile import mkstemp
+from threading import Lock
+from zipfile import BadZipFile
+
+from numpy import abs, argsort, arange, asarray, clip, concatenate, diff, float64, isclose, \
+                  maximum, median, minimum, nan, newaxis, nonzero, ones, pi, searchsorted, \
+                  sin, zeros
+from scipy.sparse import csr_matrix, diags, kron, load_npz, save_npz
+
+
+# Regridders that have already been created, keyed by grid hashes and method.
+_regridders = {}
+_lock = Lock()
+methods = ["bilinear", "conservative"]
+
+
+class Regridder(object):
+    """Regrids data from one longitude-latitude grid to another with precomputed weights.
+
+    The interpolation weights are stored as a sparse matrix, so regridding is a
+    sparse matrix-vector product that is batched over any leading dimensions of the
+    data.
+
+    Attributes:
+        method: String regridding method ("bilinear" or "conservative").
+        source: Grid object the data is regridded from.
+        target: Grid object the data is regridded to.
+        weights: scipy sparse matrix of shape (target cells, source cells).
+    """
+    def __init__(self, source, target, method="bilinear", weights=None):
+        if method not in methods:
+            raise ValueError(f"method must be one of: {methods}.")
+        self.source = source
+        self.target = target
+        self.method = method
+        if weights is None:
+            weights = _bilinear_weights(source, target) if method == "bilinear" \
+                      else _conservative_weights(source, target)
+        self.weights = weights.tocsr()
+        # Target cells that do not overlap any source cells.
+        self._uncovered = nonzero(self.weights.getnnz(axis=1) == 0)[0]
+
+    def __call__(self, data):
+        """Regrids the data.
+
+        Args:
+            data: numpy array with (..., source y, source x) dimensions.  Integer and
+                  boolean data (i.e. masks) are regridded as float64.
+
+        Returns:
+            Floating point numpy array with (..., target y, target x) dimensions, which
+            is NaN in the target cells that the source grid does not cover.
+        """
+        data = asarray(data)
+        if data.dtype.kind not in "fc":
+            # The result holds fractions and NaNs.
+            data = data.astype(float64)
+        shape = data.shape[:-2]
+        flat = data.reshape((-1, self.source.y.size*self.source.x.size))
+        result = self.weights.dot(flat.T).T
+        if self._uncovered.size:
+            result[:, self._uncovered] = nan
+        return result.reshape(shape + (self.target.y.size, self.target.x.size))
+
+    def save(self, path):
+        """Writes the weights to a file.
+
+        The weights are written to a temporary file that is then renamed, so that a
+        process that is interrupted (or another process reading the file) never
+        leaves or sees a partial file.
+
+        Args:
+            path: Path to the output npz file.
+        """
+        path = Path(path)
+        descriptor, temporary = mkstemp(suffix=".npz", dir=path.parent)
+        try:
+            with fdopen(descriptor, "wb") as output:
+                save_npz(output, self.weights)
+            replace(temporary, path)
+        except BaseException:
+            remove(temporary)
+            raise
+
+
+def get_regridder(source, target, method="bilinear", cache_directory=None):
+    """Returns a regridder for a pair of grids, reusing cached weights when possible.
+
+    Weights are cached in memory and on disk, keyed by the hashes of the grids, so
+    they are only computed once per (source grid, target grid, method).
+
+    Args:
+        source: Grid object the data is regridded from.
+        target: Grid object the data is regridded to.
+        method: String regridding method ("bilinear" or "conservative").
+        cache_directory: Directory where weights are stored.  Defaults to
+                         $XDG_CACHE_HOME/figure_tools/regrid.
+
+    Returns:
+        A Regridder object.
+    """
+    key = (source.key, target.key, method)
+    with _lock:
+        if key in _regridders:
+            return _regridders[key]
+
+    if cache_directory is None:
+        cache_directory = Path(environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / \
+                          "figure_tools" / "regrid"
+    path = Path(cache_directory) / f"{source.key}-{target.key}-{method}.npz"
+    try:
+        regridder = Regridder(source, target, method, load_npz(path))
+    except (BadZipFile, OSError, ValueError):
+        # The weights are not cached yet, or the file is unreadable and is replaced.
+        regridder = Regridder(source, target, method)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            regridder.save(path)
+        except OSError:
+            # The cache directory is not writable, so only cache in memory.
+            pass
+
+    with _lock:
+        return _regridders.setdefault(key, regridder)
+
+
+def _bilinear_weights(source, target):
+    """Calculates bilinear interpolation weights, extrapolating outside of the source grid.
+
+    Returns:
+        scipy sparse matrix of shape (target cells, source cells).
+    """
+    x = _linear_weights(source.x, target.x, _is_periodic(source.x))
+    y = _linear_weights(source.y, target.y, False)
+    return kron(y, x, format="csr")
+
+
+def _conservative_weights(source, target):
+    """Calculates first-order conservative weights (fraction of each target cell's
+       area covered by each source cell).
+
+    Returns:
+        scipy sparse matrix of shape (target cells, source cells).
+    """
+    x = _overlap_weights(source.x, target.x, _is_periodic(source.x), _is_periodic(target.x))
+    y = _overlap_weights(source.y, target.y, False, False, lambda edge: sin(pi*edge/180.),
+                         bounds=(-90., 90.))
+    return kron(y, x, format="csr")
+
+
+def _is_periodic(longitude):
+    """Determines if the longitudes span the entire globe."""
+    if longitude.size < 2:
+        return False
+    spacing = median(abs(diff(longitude)))
+    return isclose(abs(longitude.max() - longitude.min()) + spacing, 360., atol=0.01*spacing)
+
+
+def _linear_weights(source, target, periodic):
+    """Calculates 1D linear interpolation weights.
+
+    Returns:
+        scipy sparse matrix of shape (target points, source points).
+    """
+    order = argsort(source)
+    s = source[order]
+    n = s.size
+    if n == 1:
+        return csr_matrix((ones(target.size), (arange(target.size), zeros(target.size))),
+                          shape=(target.size, n))
+    if periodic:
+        t = s[0] + (target - s[0]) % 360.
+        left = searchsorted(s, t, side="right") - 1
+        right = (left + 1) % n
+        width = (s[right] - s[left]) % 360.
+    else:
+        t = target
+        left = clip(searchsorted(s, t, side="right") - 1, 0, n - 2)
+        right = left + 1
+        width = s[right] - s[left]
+    weight = (t - s[left])/width
+    rows = arange(target.size)
+    return csr_matrix((concatenate((1. - weight, weight)),
+                       (concatenate((rows, rows)), concatenate((order[left], order[right])))),
+                      shape=(target.size, n))
+
+
+def _overlap_weights(source, target, source_periodic, target_periodic, function=None,
+                     bounds=None):
+    """Calculates 1D weights proportional to the overlap between cells.
+
+    Args:
+        source: numpy array of source cell centers.
+        target: numpy array of target cell centers.
+        source_periodic: Flag telling if the source cells wrap around the globe.
+        target_periodic: Flag telling if the target cells wrap around the globe.
+        function: Function applied to the cell edges, so that the overlap is
+                  proportional to area (i.e. sin for latitude).
+        bounds: Tuple of the lowest and highest allowed cell edge values.
+
+    Returns:
+        scipy sparse matrix of shape (target cells, source cells).
+    """
+    order = argsort(source)
+    source_lower, source_upper = _edges(source[order], source_periodic, bounds)
+    target_order = argsort(target)
+    lower, upper = _edges(target[target_order], target_periodic, bounds)
+    inverse = argsort(target_order)
+    lower, upper = lower[inverse], upper[inverse]
+
+    shifts = [-360., 0., 360.] if source_periodic or target_periodic else [0.,]
+    overlap = zeros((target.size, source.size))
+    for shift in shifts:
+        high = minimum(upper[:, newaxis], source_upper[newaxis, :] + shift)
+        low = maximum(lower[:, newaxis], source_lower[newaxis, :] + shift)
+        if function is None:
+            overlap += maximum(high - low, 0.)
+        else:
+            overlap += maximum(function(high) - function(low), 0.)
+
+    # Normalize by the covered part of each target cell.
+    total = overlap.sum(axis=1)
+    total[total == 0] = 1.
+    weights = diags(1./total) @ csr_matrix(overlap)
+    return csr_matrix(weights)[:, argsort(order)]
+
+
+def _edges(centers, periodic, bounds=None):
+    """Calculates the lower and upper cell edges from sorted cell centers.
+
+    Args:
+        centers: Sorted numpy array of cell centers.
+        periodic: Flag telling if the cells wrap around the globe.
+        bounds: Tuple of the lowest and highest allowed cell edge values.
+
+    Returns:
+        Two numpy arrays of lower and upper edges.
+    """
+    if centers.size == 1:
+        return centers - 0.5, centers + 0.5
+    midpoints = 0.5*(centers[1:] + centers[:-1])
+    if periodic:
+        first = 0.5*(centers[-1] - 360. + centers[0])
+        last = first + 360.
+    else:
+        first = centers[0] - 0.5*(centers[1] - centers[0])
+        last = centers[-1] + 0.5*(centers[-1] - centers[-2])
+        if bounds is not None:
+            first, last = clip([first, last], *bounds)
+    lower = zeros(centers.size)
+    upper = zeros(centers.size)
+    lower[0], lower[1:] = first, midpoints
+    upper[:-1], upper[-1] = midpoints, last
+    return lower, upper
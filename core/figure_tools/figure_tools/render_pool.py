@@ -0,0 +1,81 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from . import renderer
+
+
+class RenderPool(object):
+    """Pool of processes that draw figures and write them to files.
+
+    Drawing a figure (contouring, projecting, drawing coastlines and encoding the
+    PNG) is often slower than calculating its data.  Figure specifications are
+    submitted to the pool and rendered in the background, so a script can keep
+    calculating the data for its next figure.  The processes are started by a fork
+    server, so they do not inherit the threads, locks or open files of the script:
+
+        with RenderPool() as pool:
+            for name in names:
+                pool.submit(make_figure_spec(name), f"{name}.png")
+            paths = pool.paths()
+
+    Attributes:
+        max_workers: Maximum number of rendering processes.
+        renderer_options: Dictionary of Renderer attributes (i.e. {"dpi": 150,
+                          "compression": 9}) that are set in each process.
+    """
+    def __init__(self, max_workers=None, renderer_options=None):
+        self.max_workers = max_workers
+        self.renderer_options = dict(renderer_options or {})
+        self._executor = ProcessPoolExecutor(max_workers=max_workers,
+                                             mp_context=get_context("forkserver"),
+                                             initializer=_configure_renderer,
+                                             initargs=(self.renderer_options,))
+        self._futures = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close(wait=exc_type is None)
+
+    def submit(self, spec, path, thumbnail=None):
+        """Schedules a figure to be rendered.
+
+        Args:
+            spec: FigureSpec object (i.e. from radiation_decomposition or Figure.spec).
+            path: Path to the output file.
+            thumbnail: Path to a thumbnail file, or None.
+
+        Returns:
+            A concurrent.futures.Future object, whose result is the path to the output
+            file.
+        """
+        future = self._executor.submit(renderer.render, spec, path, thumbnail)
+        self._futures.append(future)
+        return future
+
+    def paths(self):
+        """Waits for every submitted figure to be rendered.
+
+        Returns:
+            List of the paths to the output files, in the order they were submitted.
+
+        Raises:
+            The first exception raised while rendering a figure.
+        """
+        return [future.result() for future in self._futures]
+
+    def close(self, wait=True):
+        """Shuts down the rendering processes.
+
+        Args:
+            wait: Flag that determines if the figures that were already submitted are
+                  rendered before returning.
+        """
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+
+def _configure_renderer(options):
+    """Sets the attributes of a rendering process' default renderer."""
+    for name, value in options.items():
+        setattr(renderer.default_renderer, name, value)
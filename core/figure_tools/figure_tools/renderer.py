@@ -0,0 +1,457 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from io import BytesIO
+from os import getpid
+from pathlib import Path
+from threading import Lock
+
+import cartopy.crs as ccrs
+from matplotlib import colormaps
+import matplotlib.colors as colors
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure as MatplotlibFigure
+from matplotlib.ticker import MaxNLocator
+from numpy import array, asarray, isfinite, nanmax, nanmin, nonzero, unravel_index
+from PIL import Image
+
+from .geometry_store import draw_coastlines
+from .projected_grid import pixel_index, projected_grid
+from .spec import LinePanel, MapPanel
+
+
+# Formats that are encoded from the rendered pixels with Pillow, and their Pillow
+# format names.
+raster_formats = {"jpeg": "JPEG", "jpg": "JPEG", "png": "PNG", "webp": "WEBP"}
+
+
+class ImageCache(object):
+    """Least-recently-used cache of rendered images, keyed by figure specification.
+
+    Attributes:
+        max_bytes: Maximum total size of the cached images in bytes.
+    """
+    def __init__(self, max_bytes=256*1024*1024):
+        self.max_bytes = max_bytes
+        self._images = OrderedDict()
+        self._size = 0
+        self._lock = Lock()
+
+    def get(self, key):
+        """Returns the cached image bytes for a key, or None."""
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+            return image
+
+    def put(self, key, image):
+        """Stores image bytes, removing the least recently used images if necessary."""
+        if len(image) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._images:
+                self._size -= len(self._images.pop(key))
+            self._images[key] = image
+            self._size += len(image)
+            while self._size > self.max_bytes:
+                _, oldest = self._images.popitem(last=False)
+                self._size -= len(oldest)
+
+
+class Renderer(object):
+    """Draws figure specifications with matplotlib.
+
+    Each figure is drawn on its own Agg canvas, which is not registered with pyplot.
+    PNG, JPEG and WebP images are encoded from the canvas' pixels with Pillow in a
+    pool of threads, so a caller that submits a figure gets control back as soon as
+    it is drawn, and thumbnails are made from the same pixels without drawing the
+    figure again.  Other formats (i.e. "pdf" or "svg") are written by matplotlib.
+    Other backends can consume the same specifications by providing an image method.
+
+    Attributes:
+        cache: ImageCache object, or None if images are not cached.
+        compression: PNG compression level from 0 (none) to 9 (smallest files).
+        dpi: Resolution of the images in dots per inch, or None to use matplotlib's
+             default.  Specifications that set their own dpi, which their maps were
+             block-averaged for, are drawn at that resolution instead.
+        max_encoders: Maximum number of threads that encode and write images, or None
+                      for the concurrent.futures default.
+        project_grids: Flag that determines if longitude-latitude data is contoured on
+                       a cached, projected mesh of its grid, instead of cartopy
+                       projecting every contour path.
+        quality: JPEG and WebP quality from 0 to 100.
+        thumbnail_size: Tuple of the maximum width and height of thumbnails in pixels.
+    """
+    def __init__(self, cache=None, project_grids=True, dpi=None, compression=6,
+                 quality=90, thumbnail_size=(480, 360), max_encoders=None):
+        self.cache = cache
+        self.project_grids = project_grids
+        self.dpi = dpi
+        self.compression = compression
+        self.quality = quality
+        self.thumbnail_size = tuple(thumbnail_size)
+        self.max_encoders = max_encoders
+        self._encoders = None
+        self._encoders_pid = None
+        self._lock = Lock()
+
+    def draw(self, spec):
+        """Draws a figure specification.
+
+        Args:
+            spec: FigureSpec object.
+
+        Returns:
+            The matplotlib Figure object and a nested list of the axes of each plot,
+            indexed by row and column.
+        """
+        dpi = self.dpi if spec.dpi is None else spec.dpi
+        figure = MatplotlibFigure(figsize=spec.size, dpi=dpi, layout="compressed")
+        FigureCanvasAgg(figure)
+        if spec.title is not None:
+            figure.suptitle(spec.title.title())
+        plots = [[None for y in range(spec.num_columns)] for x in range(spec.num_rows)]
+        for panel in spec.panels:
+            x, y = unravel_index(panel.position - 1, (spec.num_rows, spec.num_columns))
+            plots[x][y] = draw_panel(figure, panel, spec.num_rows, spec.num_columns,
+                                     self.project_grids)
+        return figure, plots
+
+    def pixels(self, spec):
+        """Draws a figure specification on the canvas.
+
+        Args:
+            spec: FigureSpec object.
+
+        Returns:
+            numpy array of RGBA pixels with (row, column, channel) dimensions.
+        """
+        figure, _ = self.draw(spec)
+        try:
+            figure.canvas.draw()
+            return array(figure.canvas.buffer_rgba())
+        finally:
+            figure.clear()
+
+    def encode(self, pixels, format="png", size=None):
+        """Encodes pixels into an image.
+
+        Args:
+            pixels: numpy array of RGBA pixels with (row, column, channel) dimensions.
+            format: String image format ("png", "jpeg" or "webp").
+            size: Tuple of the maximum width and height of a thumbnail in pixels, or
+                  None for a full size image.
+
+        Returns:
+            The bytes of the encoded image.
+        """
+        image = Image.fromarray(pixels)
+        if size is not None:
+            image.thumbnail(size, Image.Resampling.LANCZOS)
+        options = {"format": raster_formats[format]}
+        if options["format"] == "PNG":
+            options["compress_level"] = self.compression
+        else:
+            # The figure's background is opaque, so nothing is lost.
+            image = image.convert("RGB")
+            options["quality"] = self.quality
+        buffer = BytesIO()
+        image.save(buffer, **options)
+        return buffer.getvalue()
+
+    def image(self, spec, format="png", size=None):
+        """Renders a figure specification, or finds it in the cache.
+
+        Args:
+            spec: FigureSpec object.
+            format: String image format (i.e. "png").
+            size: Tuple of the maximum width and height of a thumbnail in pixels, or
+                  None for a full size image.
+
+        Returns:
+            The bytes of the encoded image.
+        """
+        key = self._key(spec, format, size)
+        image = self._cached(key)
+        if image is None:
+            image = self._render(spec, format, size)
+            self._store(key, image)
+        return image
+
+    def save(self, spec, path, thumbnail=None):
+        """Renders a figure specification and writes it to a file.
+
+        Args:
+            spec: FigureSpec object.
+            path: Path to the output file, whose suffix sets the image format.
+            thumbnail: Path to a thumbnail file (i.e. "figure.thumbnail.webp"), or None.
+
+        Returns:
+            The path to the output file.
+        """
+        return self.submit(spec, path, thumbnail).result()
+
+    def submit(self, spec, path, thumbnail=None):
+        """Draws a figure specification, and encodes and writes it in the background.
+
+        Args:
+            spec: FigureSpec object.
+            path: Path to the output file, whose suffix sets the image format.
+            thumbnail: Path to a thumbnail file (i.e. "figure.thumbnail.webp"), or None.
+
+        Returns:
+            A concurrent.futures.Future object, whose result is the path to the output
+            file.
+        """
+        outputs = [(path, None),]
+        if thumbnail is not None:
+            outputs.append((thumbnail, self.thumbnail_size))
+        images, pixels = [], None
+        for output, size in outputs:
+            format = _format(output)
+            key = self._key(spec, format, size)
+            image = self._cached(key)
+            if image is None and format in raster_formats:
+                # Draw the figure once for the image and its thumbnail.
+                if pixels is None:
+                    pixels = self.pixels(spec)
+                image = partial(self.encode, pixels, format, size)
+            elif image is None:
+                image = self._render(spec, format, size)
+                self._store(key, image)
+            images.append((output, key, image))
+        return self._encoder_pool().submit(self._write, images)
+
+    def _cached(self, key):
+        """Returns a cached image, or None."""
+        return None if self.cache is None else self.cache.get(key)
+
+    def _encoder_pool(self):
+        """Returns the pool of encoding threads.
+
+        A forked process (i.e. of a multiprocessing.Pool) does not inherit the
+        threads, so each process starts its own pool.
+        """
+        with self._lock:
+            if self._encoders_pid != getpid():
+                self._encoders = ThreadPoolExecutor(max_workers=self.max_encoders)
+                self._encoders_pid = getpid()
+            return self._encoders
+
+    def _key(self, spec, format, size):
+        """Returns the cache key of an image, which includes the encoding settings.
+
+        Raises:
+            ValueError if a thumbnail is requested in a format that is not encoded
+            from pixels.
+        """
+        if size is not None and format not in raster_formats:
+            raise ValueError(f"thumbnails must be one of: {list(raster_formats)}.")
+        return (spec.key, format, size, self.dpi, self.compression, self.quality)
+
+    def _render(self, spec, format, size):
+        """Draws and encodes an image."""
+        if format in raster_formats:
+            return self.encode(self.pixels(spec), format, size)
+        figure, _ = self.draw(spec)
+        try:
+            buffer = BytesIO()
+            figure.savefig(buffer, format=format)
+        finally:
+            figure.clear()
+        return buffer.getvalue()
+
+    def _store(self, key, image):
+        """Adds an image to the cache."""
+        if self.cache is not None:
+            self.cache.put(key, image)
+
+    def _write(self, images):
+        """Encodes images if necessary and writes them to their files.
+
+        Args:
+            images: List of tuples of the path, cache key and either the bytes of each
+                    image or a function that encodes it.
+
+        Returns:
+            The path to the first image.
+        """
+        for path, key, image in images:
+            if callable(image):
+                image = image()
+                self._store(key, image)
+            with open(path, "wb") as output:
+                output.write(image)
+        return images[0][0]
+
+
+def draw_panel(figure, panel, num_rows, num_columns, project_grids=True):
+    """Draws a panel of a figure.
+
+    Args:
+        figure: matplotlib Figure object.
+        panel: MapPanel or LinePanel object.
+        num_rows: Number of rows of plots in the figure.
+        num_columns: Number of columns of plots in the figure.
+        project_grids: Flag that determines if maps are contoured on a cached,
+                       projected mesh of their grid.
+
+    Returns:
+        The matplotlib axes of the plot.
+    """
+    if isinstance(panel, MapPanel):
+        return _draw_map(figure, panel, num_rows, num_columns, project_grids)
+    if isinstance(panel, LinePanel):
+        return _draw_line_plot(figure, panel, num_rows, num_columns)
+    raise TypeError(f"cannot draw a {type(panel).__name__}.")
+
+
+def render(spec, path, thumbnail=None, wait=True):
+    """Renders a figure specification with the default renderer and writes it to a file.
+
+    Args:
+        spec: FigureSpec object.
+        path: Path to the output file.
+        thumbnail: Path to a thumbnail file, or None.
+        wait: Flag that determines if this waits for the file to be written.  If not,
+              this returns as soon as the figure is drawn.
+
+    Returns:
+        The path to the output file, or a concurrent.futures.Future object whose
+        result is the path if wait is False.
+    """
+    future = default_renderer.submit(spec, path, thumbnail)
+    return future.result() if wait else future
+
+
+def _draw_map(figure, panel, num_rows, num_columns, project_grids):
+    """Draws a longitude-latitude or zonal mean map."""
+    # Create the plotting axes.
+    optional_args = {}
+    if panel.projection is not None:
+        optional_args["projection"] = panel.projection
+    plot = figure.add_subplot(num_rows, num_columns, panel.position, **optional_args)
+
+    # Make the map.
+    levels = panel.levels if isinstance(panel.levels, int) else list(panel.levels)
+    if panel.norm_center is None:
+        norm = None
+    else:
+        norm = colors.CenteredNorm(vcenter=panel.norm_center)
+    if panel.render_mode == "contour":
+        optional_args = {"levels": levels, "cmap": panel.colormap, "norm": norm,
+                         "extend": panel.extend}
+        colorbar_args = {}
+    else:
+        # Use the colors of the filled contours for the cells or pixels.
+        cmap, norm = _discrete_colors(panel, levels, norm)
+        optional_args = {"cmap": cmap, "norm": norm}
+        colorbar_args = {"extend": panel.extend or "neither"}
+
+    data, x, y = panel.data, panel.x, panel.y
+    if panel.projection is not None and panel.render_mode == "image":
+        index = pixel_index(x, y, panel.projection, _pixel_shape(figure, num_columns,
+                                                                 panel.projection))
+        cs = plot.imshow(index.resample(data), extent=index.extent, origin="lower",
+                         transform=panel.projection, interpolation="nearest",
+                         **optional_args)
+    else:
+        if panel.projection is not None:
+            projected = projected_grid(x, y, panel.projection) if project_grids else None
+            if projected is None:
+                optional_args["transform"] = ccrs.PlateCarree()
+            else:
+                # The mesh is already projected, so the contours do not need to be.
+                data, x, y = projected.project(data), projected.x, projected.y
+                optional_args["transform"] = panel.projection
+        if panel.render_mode == "contour":
+            cs = plot.contourf(x, y, data, **optional_args)
+        else:
+            cs = plot.pcolormesh(x, y, data, shading="nearest", **optional_args)
+
+    # Set the metadata.
+    figure.colorbar(cs, ax=plot, label=panel.data_label, **colorbar_args)
+    if panel.projection is not None:
+        draw_coastlines(plot)
+        grid = plot.gridlines(draw_labels=True, dms=True, x_inline=False, y_inline=False)
+        grid.bottom_labels = False
+        grid.top_labels = False
+    if panel.invert_y_axis:
+        plot.invert_yaxis()
+    plot.set_title(panel.title)
+    plot.set_xlabel(panel.x_label)
+    plot.set_ylabel(panel.y_label)
+
+    # Add date information if necessary.
+    if panel.timestamp is not None:
+        plot.text(0.85, 1, panel.timestamp, transform=plot.transAxes)
+    return plot
+
+
+def _contour_levels(data, num_levels, extend):
+    """Chooses contour levels for data the same way that matplotlib's contourf does."""
+    valid = data[isfinite(data)]
+    minimum, maximum = (nanmin(valid), nanmax(valid)) if valid.size else (0., 1.)
+    levels = MaxNLocator(num_levels + 1, min_n_ticks=1).tick_values(minimum, maximum)
+
+    # Trim the extra levels that the locator may have supplied.
+    under = nonzero(levels < minimum)[0]
+    i0 = under[-1] if len(under) else 0
+    over = nonzero(levels > maximum)[0]
+    i1 = over[0] + 1 if len(over) else len(levels)
+    if extend in ("min", "both"):
+        i0 += 1
+    if extend in ("max", "both"):
+        i1 -= 1
+    if i1 - i0 < 3:
+        i0, i1 = 0, len(levels)
+    return levels[i0:i1]
+
+
+def _discrete_colors(panel, levels, norm):
+    """Creates a colormap and norm that color values like filled contours.
+
+    Each band between two levels gets the color that contourf gives it, and values
+    outside of the levels get the colormap's under and over colors.
+
+    Returns:
+        A matplotlib ListedColormap and BoundaryNorm.
+    """
+    if isinstance(levels, int):
+        levels = _contour_levels(panel.data, levels, panel.extend)
+    levels = asarray(levels, dtype=float)
+    cmap = colormaps[panel.colormap]
+    norm = colors.Normalize() if norm is None else norm
+    norm.autoscale_None(levels)
+    discrete = colors.ListedColormap(cmap(norm(0.5*(levels[:-1] + levels[1:]))))
+    discrete = discrete.with_extremes(under=cmap(norm(levels[0] - 1.)),
+                                      over=cmap(norm(levels[-1] + 1.)),
+                                      bad=(0., 0., 0., 0.))
+    return discrete, colors.BoundaryNorm(levels, levels.size - 1)
+
+
+def _pixel_shape(figure, num_columns, projection):
+    """Estimates the number of (rows, columns) of pixels of a map panel."""
+    columns = max(1, int(figure.get_figwidth()*figure.dpi/num_columns))
+    (left, right), (bottom, top) = projection.x_limits, projection.y_limits
+    return max(1, int(columns*(top - bottom)/(right - left))), columns
+
+
+def _format(path):
+    """Returns the image format that is set by the suffix of a path."""
+    return Path(path).suffix.lstrip(".").lower() or "png"
+
+
+def _draw_line_plot(figure, panel, num_rows, num_columns):
+    """Draws a line plot."""
+    plot = figure.add_subplot(num_rows, num_columns, panel.position)
+    plot.plot(panel.x, panel.data)
+    plot.set_title(panel.title)
+    plot.set_xlabel(panel.x_label)
+    plot.set_ylabel(panel.y_label)
+    return plot
+
+
+# Renderer used by FigureSpec.save and RenderPool.  Every process has its own.
+default_renderer = Renderer(ImageCache())
@@ -0,0 +1,267 @@
+from hashlib import sha1
+
+from numpy import linspace, ndarray
+
+from .coarsen import display_shape
+from .lon_lat_map import LonLatMap, read_only_view
+from .projected_grid import projection_key
+
+
+# Ways that maps can be drawn.  "contour" fills contours between the levels,
+# "pcolormesh" draws each grid cell, and "image" resamples the data onto the
+# projection's pixels.  The raster modes use the same discrete colors as "contour".
+render_modes = ["contour", "pcolormesh", "image"]
+
+
+class _Spec(object):
+    """Base class for specifications, which are compared and hashed by their contents.
+
+    Specifications are treated as immutable once they are created, so their key is
+    only calculated once.
+    """
+    @property
+    def key(self):
+        """String hash of the contents of the specification."""
+        if "_key" not in self.__dict__:
+            self._key = _digest((type(self).__name__,) + self._fields())
+        return self._key
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __getstate__(self):
+        # The key is not sent to other processes.
+        state = self.__dict__.copy()
+        state.pop("_key", None)
+        return state
+
+    def _fields(self):
+        raise NotImplementedError("specifications must define their fields.")
+
+
+class MapPanel(_Spec):
+    """Everything that is needed to draw a longitude-latitude or zonal mean map.
+
+    Attributes:
+        colormap: String name of the colormap.
+        data: numpy array of data values.
+        data_label: String label for the colorbar.
+        extend: String telling which ends of the colorbar are extended, or None.
+        invert_y_axis: Flag that determines if the y-axis is inverted.
+        levels: Number of contour levels or tuple of contour level values.
+        norm_center: Center of the colors, or None if the colors are not normalized.
+        position: Integer position index for the plot in the figure.
+        projection: Cartopy map projection, or None if the map is not a
+                    longitude-latitude map.
+        render_mode: String way that the map is drawn ("contour", "pcolormesh" or
+                     "image").
+        timestamp: String date of the data, or None.
+        title: String title for the plot.
+        x: numpy array of x-axis values.
+        x_label: String label for the x-axis.
+        y: numpy array of y-axis values.
+        y_label: String label for the y-axis.
+    """
+    def __init__(self, data, x, y, title, position=1, levels=51, colormap="coolwarm",
+                 norm_center=None, extend=None, data_label=None, x_label=None,
+                 y_label=None, projection=None, invert_y_axis=False, timestamp=None,
+                 render_mode="contour"):
+        if render_mode not in render_modes:
+            raise ValueError(f"render_mode must be one of: {render_modes}.")
+        self.data = read_only_view(data)
+        self.x = read_only_view(x)
+        self.y = read_only_view(y)
+        self.title = title
+        self.position = position
+        self.levels = levels
+        self.colormap = colormap
+        self.norm_center = norm_center
+        self.extend = extend
+        self.data_label = data_label
+        self.x_label = x_label
+        self.y_label = y_label
+        self.projection = projection
+        self.invert_y_axis = invert_y_axis
+        self.timestamp = timestamp
+        self.render_mode = render_mode
+
+    @classmethod
+    def from_map(cls, map_, title, position=1, colorbar_range=None, colormap="coolwarm",
+                 normalize_colors=False, colorbar_center=0, num_levels=51, extend=None,
+                 render_mode="contour", display_shape=None):
+        """Describes how a map is drawn.
+
+        Args:
+            map_: LonLatMap or ZonalMeanMap object.
+            title: String title for the plot.
+            position: Integer position index for the plot in the figure.
+            colorbar_range: List of integers describing the colorbar limits.
+            render_mode: String way that the map is drawn ("contour", "pcolormesh" or
+                         "image").
+            display_shape: Tuple of the number of (rows, columns) of pixels of the plot
+                           (see FigureSpec.display_shape).  Data that is finer than
+                           this is block-averaged before it is drawn.  The colorbar
+                           limits are still set by the full-resolution data.
+
+        Returns:
+            A MapPanel object.
+        """
+        # Set the colorbar properties.
+        if colorbar_range is None:
+            levels = num_levels
+        else:
+            # There seems to be some strange behavior if the number of level is too
+            # big for a given range.
+            levels = tuple(linspace(colorbar_range[0], colorbar_range[-1], num_levels,
+                                    endpoint=True))
+            if extend is None:
+                data_max = map_.statistics.max
+                data_min = map_.statistics.min
+                if data_max > colorbar_range[1] and data_min < colorbar_range[0]:
+                    extend = "both"
+                elif data_max > colorbar_range[1]:
+                    extend = "max"
+                elif data_min < colorbar_range[0]:
+                    extend = "min"
+
+        if display_shape is not None:
+            map_ = map_.coarsen(display_shape)
+        if isinstance(map_, LonLatMap):
+            data, x, y = map_.cyclic()
+            projection = map_.projection
+        else:
+            data, x, y = map_.data, map_.x_data, map_.y_data
+            projection = None
+        return cls(data, x, y, title.replace("_", " ").title(), position, levels, colormap,
+                   colorbar_center if normalize_colors else None, extend, map_.data_label,
+                   map_.x_label, map_.y_label, projection,
+                   getattr(map_, "invert_y_axis", False), getattr(map_, "timestamp", None),
+                   render_mode)
+
+    def _fields(self):
+        projection = None if self.projection is None else projection_key(self.projection)
+        return (self.data, self.x, self.y, self.title, self.position, self.levels,
+                self.colormap, self.norm_center, self.extend, self.data_label,
+                self.x_label, self.y_label, projection, self.invert_y_axis,
+                self.timestamp, self.render_mode)
+
+
+class LinePanel(_Spec):
+    """Everything that is needed to draw a line plot.
+
+    Attributes:
+        data: numpy array of data values.
+        position: Integer position index for the plot in the figure.
+        title: String title for the plot.
+        x: numpy array of x-axis values.
+        x_label: String label for the x-axis.
+        y_label: String label for the y-axis.
+    """
+    def __init__(self, data, x, title, position=1, x_label=None, y_label=None):
+        self.data = read_only_view(data)
+        self.x = read_only_view(x)
+        self.title = title
+        self.position = position
+        self.x_label = x_label
+        self.y_label = y_label
+
+    @classmethod
+    def from_line_plot(cls, line_plot, title, position=1):
+        """Describes how a line plot is drawn.
+
+        Args:
+            line_plot: Object with x_data, data, x_label and y_label attributes (i.e.
+                       GlobalMeanTimeSeries).
+            title: String title for the plot.
+            position: Integer position index for the plot in the figure.
+
+        Returns:
+            A LinePanel object.
+        """
+        return cls(line_plot.data, line_plot.x_data, title, position, line_plot.x_label,
+                   line_plot.y_label)
+
+    def _fields(self):
+        return (self.data, self.x, self.title, self.position, self.x_label, self.y_label)
+
+
+class FigureSpec(_Spec):
+    """Declarative description of a figure.
+
+    Specifications hold plain numpy arrays and strings, so they can be pickled and
+    rendered in another process, and they are hashed by their contents, so an
+    identical figure can be served from an image cache.  They are turned into images
+    by a renderer (see renderer.py).
+
+    Attributes:
+        dpi: Resolution of the figure in dots per inch, or None to use the renderer's.
+             Maps are block-averaged to the pixels of their plots at this resolution
+             (or matplotlib's default if it is None), so it should be set here rather
+             than on the renderer to draw high-resolution images of fine data.
+        num_columns: Number of columns of plots.
+        num_rows: Number of rows of plots.
+        panels: Tuple of MapPanel and LinePanel objects.
+        size: Tuple of the width and height of the figure in inches.
+        title: String title of the figure, or None.
+    """
+    def __init__(self, num_rows=1, num_columns=1, size=(16, 12), title=None, panels=(),
+                 dpi=None):
+        self.num_rows = num_rows
+        self.num_columns = num_columns
+        self.size = tuple(size)
+        self.title = title
+        self.panels = tuple(panels)
+        self.dpi = dpi
+
+    def add(self, *panels):
+        """Creates a new specification with additional panels.
+
+        Args:
+            panels: MapPanel or LinePanel objects.
+
+        Returns:
+            A FigureSpec object.
+        """
+        return FigureSpec(self.num_rows, self.num_columns, self.size, self.title,
+                          self.panels + panels, self.dpi)
+
+    def display_shape(self):
+        """Estimates the number of (rows, columns) of pixels of each panel."""
+        return display_shape(self.size, self.num_rows, self.num_columns, self.dpi)
+
+    def save(self, path, thumbnail=None, wait=True):
+        """Renders the figure and writes it to a file.
+
+        Args:
+            path: Path to the output file, whose suffix sets the image format.
+            thumbnail: Path to a thumbnail file, or None.
+            wait: Flag that determines if this waits for the file to be written.  If
+                  not, this returns as soon as the figure is drawn.
+
+        Returns:
+            The path to the output file, or a concurrent.futures.Future object whose
+            result is the path if wait is False.
+        """
+        # The renderer depends on the specifications, so it is imported here.
+        from .renderer import render
+        return render(self, path, thumbnail, wait)
+
+    def _fields(self):
+        return (self.num_rows, self.num_columns, self.size, self.title, self.dpi) + \
+               tuple(panel.key for panel in self.panels)
+
+
+def _digest(fields):
+    """Hashes a tuple of numpy arrays and other values."""
+    digest = sha1()
+    for field in fields:
+        if isinstance(field, ndarray):
+            digest.update(f"array:{field.dtype.str}:{field.shape}:".encode("utf-8"))
+            digest.update(field.tobytes())
+        else:
+            digest.update(repr(field).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
@@ -0,0 +1,75 @@
+from numpy import abs, asarray, clip, count_nonzero, cumsum, histogram, isfinite, max, \
+                  min, nan, searchsorted
+
+
+# Number of histogram bins that quantiles are estimated from.
+default_num_bins = 4096
+
+
+class MapStatistics(object):
+    """Summary statistics of a map's data.
+
+    The statistics are calculated together the first time that they are needed, so
+    the helpers that pick colorbar limits and titles do not each scan the data again.
+    Quantiles are estimated from fixed-size histograms of the values and of their
+    absolute values instead of by sorting the data, and are accurate to about a bin
+    width.
+
+    Attributes:
+        global_mean: Area-weighted mean of the data, or None if the map does not have
+                     area weights.
+        max: Largest valid value, or NaN if there are none.
+        min: Smallest valid value, or NaN if there are none.
+        nan_count: Number of missing (non-finite) values.
+        size: Total number of values.
+    """
+    def __init__(self, data, weights=None, num_bins=default_num_bins):
+        """Calculates the statistics.
+
+        Args:
+            data: numpy array of data values.
+            weights: AreaWeights object used to calculate the global mean, or None.
+            num_bins: Number of histogram bins used to estimate quantiles.
+        """
+        data = asarray(data)
+        valid = isfinite(data)
+        self.size = data.size
+        self.nan_count = self.size - count_nonzero(valid)
+        values = data.ravel() if self.nan_count == 0 else data[valid]
+        self.global_mean = None if weights is None else weights.global_mean(data)
+        if values.size == 0:
+            self.min = self.max = nan
+            self._histograms = None
+            return
+        self.min, self.max = min(values), max(values)
+        largest = abs(self.min) if abs(self.min) > abs(self.max) else abs(self.max)
+        self._histograms = {
+            False: histogram(values, num_bins, (self.min, self.max)),
+            True: histogram(abs(values), num_bins, (0., largest)),
+        }
+
+    def quantile(self, q, absolute=False):
+        """Estimates a quantile of the valid values.
+
+        Args:
+            q: Quantile between 0 and 1 (i.e. 0.95).
+            absolute: Flag that determines if the quantile is of the absolute values.
+
+        Returns:
+            The estimated quantile, or NaN if there are no valid values.
+        """
+        if self._histograms is None:
+            return nan
+        counts, edges = self._histograms[absolute]
+        total = cumsum(counts)
+
+        # Find the bin that holds the value with the requested rank, and interpolate
+        # within it as if its values were evenly spaced.
+        rank = q*(total[-1] - 1)
+        i = searchsorted(total, rank, side="right")
+        below = total[i - 1] if i > 0 else 0
+        fraction = clip((rank - below + 0.5)/counts[i], 0., 1.)
+        value = edges[i] + fraction*(edges[i + 1] - edges[i])
+        if absolute:
+            return value
+        return clip(value, self.min, self.max)
@@ -1,33 +1,89 @@
-from numpy import array, datetime64, mean, zeros
+from numpy import add, arange, array, asarray, datetime64, flatnonzero, float64, full, \
+                  median, prod, r_, repeat, rint, unique, zeros
+
+
+# Default maximum size in bytes of the blocks of data read at once.
+default_memory_budget = 256*1024*1024
+
+# Ways that periods (months, years) with missing time steps can be handled.
+partial_options = ["raise", "drop", "keep"]
 
 
 class TimeSubset(object):
-    def __init__(self, data):
+    """Time averages of monthly, daily or sub-daily data.
+
+    The data is streamed through in blocks of time steps.  The time steps of each
+    month are averaged first, then the monthly means are averaged into years,
+    climatologies, etc., so daily and sub-daily data produce the same kind of
+    results as monthly data, without holding the whole record in memory.
+
+    Periods that are missing time steps (i.e. a year that starts in June) are
+    handled according to the partial argument of each method:
+
+        "raise": raise a ValueError.
+        "drop": leave the incomplete months and years out.
+        "keep": average whatever time steps are available.
+
+    Attributes:
+        data: Numpy array of time values (datetime64 or cftime objects).
+        memory_budget: Maximum size in bytes of the blocks of data read at once.
+        time_step: Median spacing of the time values in days.
+    """
+    def __init__(self, data, memory_budget=default_memory_budget):
         """Instantiates an object.
 
         Args:
             data: An xarray DataArray for the time dimension of an xarray Dataset.
+            memory_budget: Maximum size in bytes of the blocks of data read at once.
         """
         self.data = data
+        self.memory_budget = memory_budget
+        self._years, self._months, self._days_in_month = _calendar_fields(asarray(data))
+        self.time_step = _time_step(asarray(data))
+
+    @property
+    def years(self):
+        """Sorted numpy array of the unique integer years of the time values."""
+        return unique(self._years)
 
-    def annual_climatology(self, data, year_range):
-        years = [x for x in range(year_range[0], year_range[1] + 1)]
-        sum_, counter = None, 0
-        for i, point in enumerate(self.data):
-            _, year = self._month_and_year(point)
-            if year in years:
-                if sum_ is None:
-                    sum_ = data[i, ...]
-                else:
-                    sum_ += data[i, ...]
-                counter += 1
-
-        if counter != 12*len(years):
+    @property
+    def monthly(self):
+        """True if there is (at most) one time step per month."""
+        return self.time_step >= 28.
+
+    def annual_climatology(self, data, year_range, partial="raise"):
+        """Calculates the mean of the input data over a range of years.
+
+        Args:
+            data: Array of data with time as the first dimension.
+            year_range: List of the integer first and last years (inclusive).
+            partial: How to handle missing time steps ("raise", "drop" or "keep").
+
+        Returns:
+            Numpy array of the average data.
+        """
+        years = range(year_range[0], year_range[1] + 1)
+        means, _ = self._reduce(data, lambda y, m: 0 if y in years else None, 1,
+                                12*len(years), partial)
+        if means.shape[0] == 0:
             raise ValueError("Expected monthly data and did not find correct number of months.")
-        return array(sum_[...]/counter)
+        return means[0]
+
+    def seasonal_climatology(self, data, year_range, month_range, partial="raise"):
+        """Calculates the mean of the input data over a range of months in a range of
+           years.
 
-    def seasonal_climatology(self, data, year_range, month_range):
-        years = [x for x in range(year_range[0], year_range[1] + 1)]
+        Args:
+            data: Array of data with time as the first dimension.
+            year_range: List of the integer first and last years (inclusive).
+            month_range: List of the integer first and last months (inclusive), which
+                         may cross to the next year (i.e. [12, 2]).
+            partial: How to handle missing time steps ("raise", "drop" or "keep").
+
+        Returns:
+            Numpy array of the average data.
+        """
+        years = range(year_range[0], year_range[1] + 1)
         if month_range[1] - month_range[0] < 0:
             # We have crossed to the next year.
             months = [x for x in range(month_range[0], 13)] + \
@@ -35,77 +91,218 @@ class TimeSubset(object):
         else:
             months = [x for x in range(month_range[0], month_range[1] + 1)]
 
-        sum_, counter = None, 0
-        for i, point in enumerate(self.data):
-            month, year = self._month_and_year(point)
-            if month in months and year in years:
-                if sum_ is None:
-                    sum_ = data[i, ...]
-                else:
-                    sum_ += data[i, ...]
-                counter += 1
-
-        if counter != len(months)*len(years):
+        means, _ = self._reduce(data, lambda y, m: 0 if y in years and m in months else None,
+                                1, len(months)*len(years), partial)
+        if means.shape[0] == 0:
             raise ValueError("Expected monthly data and did not find enough months.")
-        return array(sum_[...]/counter)
+        return means[0]
 
-    def annual_mean(self, data, year):
+    def annual_mean(self, data, year, partial="raise"):
         """Calculates the annual mean of the input date for the input year.
 
         Args:
             data: Numpy array of data to be averaged.
             year: Integer year to average over.
+            partial: How to handle missing time steps ("raise", "drop" or "keep").
         """
-        start, end = None, None
-        for i, point in enumerate(self.data):
-            month, y = self._month_and_year(point)
-            if y == year:
-                if month == 1:
-                    start = i
-                elif month == 12:
-                    end = i + 1
-            if None not in [start, end]: break
-        else:
+        if year not in self._years:
             raise ValueError(f"could not find year {year}.")
-        return mean(array(data[start:end, ...]), axis=0)
+        means, _ = self._reduce(data, lambda y, m: 0 if y == year else None, 1, 12,
+                                partial)
+        if means.shape[0] == 0:
+            raise ValueError(f"could not find a complete year {year}.")
+        return means[0]
 
-    def annual_means(self, data):
+    def annual_means(self, data, partial="raise"):
         """Calculates the annual means of the input date for each year.
 
         Args:
             data: Numpy array of data to be averaged.
+            partial: How to handle missing time steps ("raise", "drop" or "keep").
 
         Returns:
             Numpy array of years that were averaged over and a numpy array of the
             average data.
         """
-        years = {}
-        for i, point in enumerate(self.data):
-            month, year = self._month_and_year(point)
-            if year not in years:
-                years[year] = [None, None]
-            if month == 1:
-                years[year][0] = i
-            elif month == 12:
-                years[year][1] = i + 1
-
-        years_data = sorted(years.keys())
-        means_data = zeros(tuple([len(years_data),] + list(data.shape[1:])))
-        for i, key in enumerate(years_data):
-            start, end = years[key]
-            means_data[i, ...] = mean(array(data[start:end, ...]), axis=0)
-        return array(years_data), means_data
-
-    def _month_and_year(self, time):
-        """Returns the integer month and year for the input time point.
+        years = self.years
+        index = {year: i for i, year in enumerate(years)}
+        means, kept = self._reduce(data, lambda y, m: index[y], years.size, 12, partial)
+        return array(years[kept]), means
+
+    def year_bounds(self, year):
+        """Finds the time indices of the input year.
 
         Args:
-            Integer month and year values.
+            year: Integer year.
+
+        Returns:
+            The integer start and end (exclusive) time indices.
+
+        Raises:
+            ValueError if the year is not found.
+        """
+        indices = flatnonzero(self._years == year)
+        if indices.size == 0:
+            raise ValueError(f"could not find year {year}.")
+        return indices[0], indices[-1] + 1
+
+    def monthly_sums(self, data, bin_function, num_bins, partial="raise"):
+        """Streams through the data, averaging the time steps of each month and then
+           summing the monthly means into bins.
+
+        Args:
+            data: Array of data with time as the first dimension.
+            bin_function: Function that maps a (year, month) to a bin index, or None if
+                          the month is not needed.
+            num_bins: Number of bins.
+            partial: How to handle months with missing time steps ("raise", "drop" or
+                     "keep").
+
+        Returns:
+            Numpy array of the sums of the monthly means in each bin, with bins as the
+            first dimension, and an integer numpy array of the number of months in each
+            bin.
+
+        Raises:
+            ValueError if a needed month is incomplete and partial is "raise".
+        """
+        if partial not in partial_options:
+            raise ValueError(f"partial must be one of: {partial_options}.")
+
+        starts, ends, expected_steps = self._month_steps()
+        bins = [bin_function(self._years[i], self._months[i]) for i in starts]
+        month_of_step = repeat(arange(starts.size), ends - starts)
+
+        shape = data.shape[1:]
+        sums = zeros((num_bins,) + shape, dtype=float64)
+        counts = zeros(num_bins, dtype=int)
+        block = max(1, self.memory_budget//max(1, int(prod(shape))*data.dtype.itemsize))
+        running = {}
+
+        def finish(k):
+            """Adds a finished month to its bin."""
+            month_sum = running.pop(k)
+            steps = ends[k] - starts[k]
+            if steps < expected_steps[k]:
+                if partial == "raise":
+                    raise ValueError(f"{self._years[starts[k]]}-{self._months[starts[k]]:02d}"
+                                     f" has {steps} of {expected_steps[k]} time steps.")
+                if partial == "drop":
+                    return
+            sums[bins[k]] += month_sum/steps
+            counts[bins[k]] += 1
+
+        needed = [k for k, b in enumerate(bins) if b is not None]
+        for start, end in _runs(starts[needed], ends[needed]):
+            for i in range(start, end, block):
+                j = min(i + block, end)
+                values = asarray(data[i:j, ...])
+                months = month_of_step[i:j]
+                cuts = flatnonzero(r_[True, months[1:] != months[:-1]])
+                for k, month_sum in zip(months[cuts], add.reduceat(values, cuts, axis=0,
+                                                                   dtype=float64)):
+                    running[k] = running[k] + month_sum if k in running else month_sum
+                    if ends[k] <= j:
+                        finish(k)
+        return sums, counts
+
+    def complete_months(self):
+        """Finds which months of the data have all of their time steps.
+
+        Returns:
+            Integer numpy arrays of the year and month of each month of the data, and
+            a boolean numpy array telling which of the months are complete.
+        """
+        starts, ends, expected_steps = self._month_steps()
+        return self._years[starts], self._months[starts], ends - starts >= expected_steps
+
+    def _month_steps(self):
+        """Finds the contiguous time steps of each month.
+
+        Returns:
+            Integer numpy arrays of the start and end (exclusive) time indices of each
+            month, and of the number of time steps that a complete month has.
+        """
+        month_id = self._years*12 + self._months
+        starts = flatnonzero(r_[True, month_id[1:] != month_id[:-1]])
+        ends = r_[starts[1:], month_id.size]
+        if self.monthly:
+            expected_steps = full(starts.size, 1)
+        else:
+            expected_steps = rint(self._days_in_month[starts]/self.time_step).astype(int)
+        return starts, ends, expected_steps
+
+    def _reduce(self, data, bin_function, num_bins, expected_months, partial):
+        """Streams through the data, averaging the time steps of each month and then
+           averaging the monthly means into bins.
+
+        Returns:
+            Numpy array of the bin means, with bins as the first dimension, and a
+            boolean numpy array telling which of the bins were kept.
         """
-        if isinstance(time, datetime64):
-            year = time.astype("datetime64[Y]").astype(int) + 1970
-            month = time.astype("datetime64[M]").astype(int) % 12 + 1
+        sums, counts = self.monthly_sums(data, bin_function, num_bins, partial)
+        return bin_means(sums, counts, expected_months, partial)
+
+
+def bin_means(sums, counts, expected_months, partial="raise"):
+    """Divides sums of monthly means by the number of months, checking that each bin
+       is complete.
+
+    Args:
+        sums: Numpy array of the sums of the monthly means, with bins as the first
+              dimension.
+        counts: Integer numpy array of the number of months in each bin.
+        expected_months: Number of months that make up a complete bin.
+        partial: How to handle incomplete bins ("raise", "drop" or "keep").  Empty bins
+                 are always left out.
+
+    Returns:
+        Numpy array of the bin means, with bins as the first dimension, and a boolean
+        numpy array telling which of the bins were kept.
+
+    Raises:
+        ValueError if a bin is incomplete and partial is "raise".
+    """
+    complete = counts >= expected_months
+    if partial == "raise" and not complete[counts > 0].all():
+        raise ValueError("Expected monthly data and did not find correct number of months.")
+    kept = complete if partial == "drop" else counts > 0
+    return sums[kept]/counts[kept].reshape((-1,) + (1,)*(sums.ndim - 1)), kept
+
+
+def _calendar_fields(time):
+    """Returns the integer year, month and number of days in the month of each time."""
+    if time.dtype == object and time.size and isinstance(time.flat[0], datetime64):
+        time = time.astype("datetime64[s]")
+    if time.dtype.kind == "M":
+        month = time.astype("datetime64[M]")
+        days = (month + 1).astype("datetime64[D]") - month.astype("datetime64[D]")
+        return (time.astype("datetime64[Y]").astype(int) + 1970,
+                month.astype(int) % 12 + 1, days.astype(int))
+    # cftime objects.
+    return (array([t.year for t in time], dtype=int), array([t.month for t in time], dtype=int),
+            array([t.daysinmonth for t in time], dtype=int))
+
+
+def _time_step(time):
+    """Returns the median spacing in days of the first time values."""
+    if time.size < 2:
+        # A single time is treated as monthly data.
+        return 30.
+    first = time[:min(time.size, 33)]
+    if first.dtype.kind == "M":
+        seconds = (first[1:] - first[:-1]).astype("timedelta64[s]").astype(float64)
+    else:
+        seconds = array([(b - a).total_seconds() for a, b in zip(first[:-1], first[1:])])
+    return float(median(seconds))/86400.
+
+
+def _runs(starts, ends):
+    """Merges adjacent [start, end) ranges."""
+    runs = []
+    for start, end in zip(starts, ends):
+        if runs and runs[-1][1] == start:
+            runs[-1][1] = end
         else:
-            year = time.year
-            month = time.month
-        return month, year
+            runs.append([start, end])
+    return runs
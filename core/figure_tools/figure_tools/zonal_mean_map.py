@@ -1,75 +1,203 @@
-from numpy import array, array_equal, mean, ndarray
+from numpy import asarray, cos, dtype, empty, float64, mean, prod, radians, zeros
 
-from .time_subsets import TimeSubset
+from .coarsen import block_centers, block_factors, block_mean
+from .grid import get_grid
+from .lon_lat_map import read_only_view
+from .map_expression import MapExpression
+from .statistics import MapStatistics
+from .time_subsets import default_memory_budget, TimeSubset
 
 
 class ZonalMeanMap(object):
     def __init__(self, data, latitude, y_axis_data, units=None, y_label=None,
                  invert_y_axis=False, timestamp=None):
-        self.data = data[...]
-        self.x_data = latitude[...]
-        self.y_data = y_axis_data[...]
+        self.data = read_only_view(data)
+        self.grid = get_grid(latitude, y_axis_data)
         self.invert_y_axis = invert_y_axis
         self.x_label = "Latitude"
         self.y_label = y_label
         self.data_label = units
         self.timestamp = timestamp
+        self._statistics = None
 
     def __add__(self, arg):
+        if isinstance(arg, MapExpression):
+            return self.lazy() + arg
         self._compatible(arg)
-        return ZonalMeanMap(self.data + arg.data, self.x_data, self.y_data,
-                            units=self.data_label, y_label=self.y_label,
-                            invert_y_axis=self.invert_y_axis, timestamp=self.timestamp)
+        return self._like(self.data + arg.data)
 
     def __sub__(self, arg):
+        if isinstance(arg, MapExpression):
+            return self.lazy() - arg
         self._compatible(arg)
-        return ZonalMeanMap(self.data - arg.data, self.x_data, self.y_data,
-                            units=self.data_label, y_label=self.y_label,
-                            invert_y_axis=self.invert_y_axis, timestamp=self.timestamp)
+        return self._like(self.data - arg.data)
+
+    def coarsen(self, shape):
+        """Block-averages the data to about the resolution that it is displayed at.
+
+        The averages are weighted by cos(latitude) and skip missing values.
+
+        Args:
+            shape: Tuple of the number of (rows, columns) of pixels that the map is
+                   displayed on.
+
+        Returns:
+            A ZonalMeanMap object, which is this map if it is not finer than the
+            pixels.
+        """
+        factors = block_factors(self.data.shape, shape)
+        if factors == (1, 1):
+            return self
+        weights = cos(radians(self.x_data))[None, :] + zeros(self.data.shape)
+        data = block_mean(self.data, weights, factors)
+        return ZonalMeanMap(data, block_centers(self.x_data, factors[1]),
+                            block_centers(self.y_data, factors[0]), units=self.data_label,
+                            y_label=self.y_label, invert_y_axis=self.invert_y_axis,
+                            timestamp=self.timestamp)
+
+    @property
+    def statistics(self):
+        """MapStatistics of the data, which are calculated the first time they are
+           needed."""
+        if self._statistics is None:
+            self._statistics = MapStatistics(self.data)
+        return self._statistics
+
+    @property
+    def x_data(self):
+        return self.grid.x
+
+    @property
+    def y_data(self):
+        return self.grid.y
+
+    def lazy(self):
+        """Starts a lazy arithmetic expression.
+
+        Returns:
+            A MapExpression that is evaluated in a single pass when its evaluate
+            method is called.
+        """
+        return MapExpression([(1, self),])
 
     @classmethod
     def from_xarray_dataset(cls, dataset, variable, time_method=None, time_index=None,
-                            year=None, y_axis=None, y_label=None, invert_y_axis=False):
-        """Instantiates a ZonalMeanMap object from an xarray dataset."""
+                            year=None, y_axis=None, y_label=None, invert_y_axis=False,
+                            memory_budget=default_memory_budget):
+        """Instantiates a ZonalMeanMap object from an xarray dataset.
+
+        Time dependent data is read in blocks of at most memory_budget bytes, which
+        are reduced over longitude as they are read, so the full field of the
+        selected time steps is never in memory at once.  Annual means average the
+        time steps of each month first, like LonLatMap, and raise a ValueError if the
+        year is incomplete.
+        """
         v = dataset.data_vars[variable]
-        data = array(v.data[...])
         axis_attrs = _dimension_order(dataset, v)
-        latitude = array(dataset.coords[v.dims[-2]].data[...])
-        y_dim = array(dataset.coords[v.dims[-3]].data[...])
+        latitude = asarray(dataset.coords[v.dims[-2]].data)
+        y_dim = asarray(dataset.coords[v.dims[-3]].data)
         y_dim_units = y_label or dataset.coords[v.dims[-3]].attrs["units"]
 
         if axis_attrs[0] == "t":
-            time = array(dataset.coords[v.dims[0]].data[...])
+            time = asarray(dataset.coords[v.dims[0]].data)
             if time_method == "instantaneous":
                 if time_method == None:
                     raise ValueError("time_index is required when time_method='instantaneous.'")
-                data = data[time_index, ...]
+                data = streaming_zonal_mean(v, time_index, time_index + 1, memory_budget)
                 timestamp = str(time[time_index])
             elif time_method == "annual mean":
                 if year == None:
                     raise ValueError("year is required when time_method='annual mean'.")
-                time = TimeSubset(time)
-                data = time.annual_mean(data, year)
+                data = TimeSubset(time, memory_budget).annual_mean(
+                    _ZonalMeans(v, memory_budget), year, partial="raise")
                 timestamp = str(year)
             else:
                 raise ValueError("time_method must be either 'instantaneous' or 'annual mean'.")
         else:
+            data = mean(asarray(v.data), -1)
             timestamp = None
 
-        return cls(mean(data, -1), latitude, y_dim, v.attrs["units"], y_dim_units,
+        return cls(data, latitude, y_dim, v.attrs["units"], y_dim_units,
                    invert_y_axis, timestamp)
 
+    def _like(self, data):
+        """Creates a ZonalMeanMap with the input data and the same axes and metadata."""
+        return ZonalMeanMap(data, self.x_data, self.y_data, units=self.data_label,
+                            y_label=self.y_label, invert_y_axis=self.invert_y_axis,
+                            timestamp=self.timestamp)
+
     def _compatible(self, arg):
         """Raises a ValueError if two objects are not compatible."""
-        for attr in ["x_data", "y_data", "invert_y_axis", "y_label", "data_label"]:
-            if isinstance(getattr(self, attr), ndarray):
-                equal = array_equal(getattr(self, attr), getattr(arg, attr))
+        if not isinstance(arg, ZonalMeanMap):
+            raise ValueError("input map must be a ZonalMeanMap.")
+        for attr in ["grid", "invert_y_axis", "y_label", "data_label"]:
+            if attr == "grid":
+                # Grids are interned, so identical grids are the same object.
+                equal = self.grid is arg.grid
             else:
                 equal = getattr(self, attr) == getattr(arg, attr)
             if not equal:
                 raise ValueError(f"The same {attr} is required for both objects.")
 
 
+def streaming_zonal_mean(data, start, end, memory_budget=default_memory_budget):
+    """Calculates the time mean of the zonal mean of (time, z, y, x) data, reading it
+       in blocks.
+
+    Blocks of time steps and levels are read (i.e. from a lazily loaded netCDF or dask
+    array) and reduced over longitude one at a time.
+
+    Args:
+        data: Array-like object with (time, z, y, x) dimensions.
+        start: Integer index of the first time step.
+        end: Integer index of the last time step (exclusive).
+        memory_budget: Maximum size in bytes of the blocks that are read.
+
+    Returns:
+        Numpy array with (z, y) dimensions.
+    """
+    shape = data.shape
+    level_bytes = max(1, int(prod(shape[2:]))*data.dtype.itemsize)
+    levels = max(1, min(shape[1], memory_budget//level_bytes))
+    times = max(1, memory_budget//(level_bytes*shape[1])) if levels == shape[1] else 1
+
+    sum_ = zeros(shape[1:-1], dtype=float64)
+    for t in range(start, end, times):
+        for z in range(0, shape[1], levels):
+            block = asarray(data[t:min(t + times, end), z:z + levels, ...])
+            sum_[z:z + levels, ...] += mean(block, axis=-1).sum(axis=0)
+    return sum_/(end - start)
+
+
+class _ZonalMeans(object):
+    """Array-like view of (time, z, y, x) data that is averaged over longitude as
+       blocks of time steps are read from it.
+
+    Attributes:
+        data: Array-like object with (time, z, y, x) dimensions.
+        dtype: numpy dtype of the averages.
+        memory_budget: Maximum size in bytes of the blocks that are read.
+        shape: Tuple of the (time, z, y) shape of the averages.
+    """
+    def __init__(self, data, memory_budget=default_memory_budget):
+        self.data = data
+        self.dtype = dtype(float64)
+        self.memory_budget = memory_budget
+        self.shape = tuple(data.shape[:-1])
+
+    def __getitem__(self, key):
+        """Reads the zonal means of a slice of time steps."""
+        start, end, _ = (key[0] if isinstance(key, tuple) else key).indices(self.shape[0])
+        level_bytes = max(1, int(prod(self.data.shape[2:]))*self.data.dtype.itemsize)
+        levels = max(1, min(self.shape[1], self.memory_budget//level_bytes))
+        result = empty((end - start,) + self.shape[1:], dtype=float64)
+        for t in range(start, end):
+            for z in range(0, self.shape[1], levels):
+                block = asarray(self.data[t, z:z + levels, ...])
+                result[t - start, z:z + levels, ...] = mean(block, axis=-1)
+        return result
+
+
 def _dimension_order(dataset, variable):
     """Raises a ValueError if the variable's dimensions are not in an expected order.
 
@@ -0,0 +1,35 @@
+from os import environ, pathsep
+from pathlib import Path
+from subprocess import CalledProcessError, run
+from sys import executable
+
+from setuptools import setup
+from setuptools.command.build_py import build_py
+
+
+class BuildPy(build_py):
+    """Builds the 110m geometry store into the package, so that maps can draw the
+       coastlines and borders without downloading the Natural Earth files."""
+    resolutions = ["110m",]
+
+    def run(self):
+        super().run()
+        directory = Path(self.build_lib) / "figure_tools" / "geometries"
+        paths = [directory / f"{feature}_{resolution}.npz"
+                 for feature in ("borders", "coastlines") for resolution in self.resolutions]
+        if self.dry_run or all(path.exists() for path in paths):
+            return
+        env = dict(environ)
+        env["PYTHONPATH"] = pathsep.join([self.build_lib, env.get("PYTHONPATH", "")])
+        try:
+            run([executable, "-c", "from figure_tools.geometry_store import main; main()",
+                 "--directory", str(directory), "--resolutions"] + self.resolutions,
+                env=env, check=True)
+        except CalledProcessError:
+            # Maps fall back to cartopy, with a warning, if the store is missing.
+            self.warn("could not build the geometry store, so it is not shipped with the"
+                      " package.  Run build-geometry-store where cartopy can download the"
+                      " Natural Earth files.")
+
+
+setup(cmdclass={"build_py": BuildPy})
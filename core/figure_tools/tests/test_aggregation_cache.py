@@ -0,0 +1,89 @@
+import gc
+
+from numpy import allclose, arange, datetime64, random
+from pytest import raises
+from xarray import Dataset
+
+from figure_tools import AggregationCache, LonLatMap
+from figure_tools.time_subsets import TimeSubset
+
+
+def monthly_dataset(start="2000-01", end="2004-01"):
+    time = arange(datetime64(start, "M"), datetime64(end, "M")).astype("datetime64[ns]")
+    return Dataset(
+        {"v": (["time", "lat", "lon"], random.random((time.size, 6, 8)), {"units": "K"})},
+        coords={
+            "time": ("time", time, {"axis": "T"}),
+            "lat": ("lat", arange(6.)*30. - 75., {"axis": "Y"}),
+            "lon": ("lon", arange(8.)*45., {"axis": "X"}),
+        },
+    )
+
+
+def daily_dataset(start="2000-01-01", end="2003-01-01"):
+    time = arange(datetime64(start), datetime64(end)).astype("datetime64[ns]")
+    return Dataset(
+        {"v": (["time", "lat", "lon"], random.random((time.size, 2, 3)), {"units": "K"})},
+        coords={
+            "time": ("time", time, {"axis": "T"}),
+            "lat": ("lat", [-45., 45.], {"axis": "Y"}),
+            "lon": ("lon", [0., 120., 240.], {"axis": "X"}),
+        },
+    )
+
+
+def test_assembled_from_partials():
+    """Means assembled from the partial sums match the raw data reductions."""
+    dataset = monthly_dataset()
+    time = TimeSubset(dataset["time"].values)
+    data = dataset["v"].values
+    cache = AggregationCache()
+    partials = cache.partials(dataset, "v")
+    assert cache.partials(dataset, "v") is partials
+
+    assert allclose(cache.annual_mean(dataset, "v", 2001), time.annual_mean(data, 2001))
+    years, means = cache.annual_means(dataset, "v")
+    expected_years, expected = time.annual_means(data)
+    assert (years == expected_years).all() and allclose(means, expected)
+    assert allclose(cache.annual_climatology(dataset, "v", [2001, 2003]),
+                    time.annual_climatology(data, [2001, 2003]))
+    for months in ([12, 2], [6, 8], [4, 7]):
+        assert allclose(cache.seasonal_climatology(dataset, "v", [2000, 2002], months),
+                        time.seasonal_climatology(data, [2000, 2002], months))
+
+    map_ = LonLatMap.from_xarray_dataset(dataset, "v", time_method="annual climatology",
+                                         year_range=[2000, 2003], cache=cache)
+    assert allclose(map_.data, time.annual_climatology(data, [2000, 2003]))
+
+
+def test_entries_freed_with_dataset():
+    cache = AggregationCache()
+    dataset = monthly_dataset()
+    cache.partials(dataset, "v")
+    assert len(cache._entries) == 1
+    del dataset
+    gc.collect()
+    assert len(cache._entries) == 0
+
+
+def test_incomplete_months():
+    """Months with missing time steps are handled like the raw data reductions."""
+    dataset = daily_dataset()
+    dataset = dataset.sel(time=(dataset.time < datetime64("2001-03-20")) |
+                               (dataset.time >= datetime64("2001-04-01")))
+    time = TimeSubset(dataset["time"].values)
+    data = dataset["v"].values
+    cache = AggregationCache()
+    with raises(ValueError):
+        cache.annual_mean(dataset, "v", 2001)
+    assert allclose(cache.annual_mean(dataset, "v", 2001, partial="keep"),
+                    time.annual_mean(data, 2001, partial="keep"))
+    assert allclose(cache.annual_mean(dataset, "v", 2002), time.annual_mean(data, 2002))
+    for partial in ("drop", "keep"):
+        years, means = cache.annual_means(dataset, "v", partial)
+        expected_years, expected = time.annual_means(data, partial)
+        assert (years == expected_years).all() and allclose(means, expected)
+    assert allclose(
+        cache.seasonal_climatology(dataset, "v", [2000, 2002], [3, 5], "keep"),
+        time.seasonal_climatology(data, [2000, 2002], [3, 5], "keep"),
+    )
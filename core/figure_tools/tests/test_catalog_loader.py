@@ -0,0 +1,87 @@
+from numpy import arange, allclose, linspace, random
+from pandas import DataFrame
+from pytest import raises
+from xarray import DataArray, Dataset
+
+from figure_tools import LonLatMap, open_static_field, open_variable_dataset, \
+                         register_cell_area
+from figure_tools import grid as grid_module
+from figure_tools.catalog_loader import catalog_paths
+
+
+class StubCatalog(object):
+    """Stands in for an intake-esm datastore, which holds its files in a DataFrame."""
+    def __init__(self, df):
+        self.df = df
+
+
+def write_timeseries(tmp_path, years):
+    """Writes one netCDF file of monthly data per year, and returns a catalog of them
+       (in reverse order)."""
+    rows = []
+    for year in years:
+        time = DataArray(arange(12)*30. + 365.*(year - years[0]) + 15., dims="time",
+                         attrs={"units": f"days since {years[0]}-01-01",
+                                "calendar": "noleap"})
+        data = random.random((12, 4, 8))
+        dataset = Dataset({"tas": (("time", "lat", "lon"), data, {"units": "K"})},
+                          coords={"time": time, "lat": linspace(-67.5, 67.5, 4),
+                                  "lon": arange(8)*45.})
+        path = tmp_path / f"atmos.{year}01-{year}12.tas.nc"
+        dataset.to_netcdf(path)
+        rows.append({"variable_id": "tas", "realm": "atmos", "frequency": "mon",
+                     "time_range": f"{year}01-{year}12", "path": str(path)})
+    return StubCatalog(DataFrame(rows[::-1]))
+
+
+def test_catalog_paths(tmp_path):
+    """Paths are sorted in time, and catalogs with more than one dataset are rejected."""
+    catalog = write_timeseries(tmp_path, [2000, 2001, 2002])
+    paths = catalog_paths(catalog, "tas")
+    assert paths == sorted(paths) and len(paths) == 3
+    assert catalog_paths(catalog.df, "tas") == paths
+
+    with raises(ValueError):
+        catalog_paths(catalog, "pr")
+    mixed = catalog.df.copy()
+    mixed.loc[0, "frequency"] = "day"
+    with raises(ValueError):
+        catalog_paths(StubCatalog(mixed), "tas")
+
+
+def test_open_variable_dataset(tmp_path):
+    """The files are concatenated in time and chunked by year."""
+    catalog = write_timeseries(tmp_path, [2000, 2001])
+    with open_variable_dataset(catalog, "tas", parallel=False) as dataset:
+        assert dataset["tas"].shape == (24, 4, 8)
+        assert dataset["tas"].chunks[0] == (12, 12)
+        assert (dataset["time"].diff("time") > 0).all()
+
+
+def test_open_static_field(tmp_path):
+    """Static fields are read from the catalog's fx files."""
+    area = random.random((4, 8))
+    path = tmp_path / "atmos.static.nc"
+    Dataset({"areacella": (("lat", "lon"), area)}).to_netcdf(path)
+    catalog = StubCatalog(DataFrame([{"variable_id": "areacella", "frequency": "fx",
+                                      "path": str(path)}]))
+    assert allclose(open_static_field(catalog, "areacella"), area)
+    assert open_static_field(catalog, "sftlf") is None
+
+
+def test_register_cell_area(tmp_path, monkeypatch):
+    """Maps on the grid of a catalog's cell areas are weighted by them."""
+    monkeypatch.setattr(grid_module, "_registered", {})
+    longitude, latitude = arange(6)*60. + 7., linspace(-61., 61., 3)
+    area = random.random((3, 6))
+    path = tmp_path / "atmos.static.nc"
+    Dataset({"area": (("lat", "lon"), area)},
+            coords={"lat": latitude, "lon": longitude}).to_netcdf(path)
+    catalog = StubCatalog(DataFrame([{"variable_id": "area", "frequency": "fx",
+                                      "path": str(path)}]))
+    assert register_cell_area(catalog.df[catalog.df["variable_id"] == "sftlf"]) is None
+    grid = register_cell_area(catalog)
+    data = random.random((3, 6))
+    map_ = LonLatMap(data, longitude, latitude)
+    assert map_.grid is grid
+    assert allclose(map_.global_mean(), (data*area).sum()/area.sum())
@@ -0,0 +1,50 @@
+from datetime import date, timedelta
+
+from numpy import arange, array
+from pytest import raises
+
+from figure_tools import CFDates, decode_cf_time
+
+
+def as_tuples(dates):
+    return list(zip(dates.year.tolist(), dates.month.tolist(), dates.day.tolist()))
+
+
+def test_proleptic_gregorian_matches_datetime():
+    """Daily values since year 1 match python's proleptic Gregorian dates."""
+    values = arange(0, 800000, 97) + 0.5
+    dates = decode_cf_time(values, "days since 0001-01-01 00:00:00", "proleptic_gregorian")
+    expected = [date(1, 1, 1) + timedelta(days=int(v)) for v in values]
+    assert as_tuples(dates) == [(d.year, d.month, d.day) for d in expected]
+
+
+def test_fixed_length_calendars():
+    """Calendars without leap years (or with only leap years) skip or keep February 29."""
+    values = array([58., 59., 365.])
+    assert as_tuples(decode_cf_time(values, "days since 2000-01-01", "noleap")) == \
+           [(2000, 2, 28), (2000, 3, 1), (2001, 1, 1)]
+    assert as_tuples(decode_cf_time(values, "days since 2000-01-01", "all_leap")) == \
+           [(2000, 2, 28), (2000, 2, 29), (2000, 12, 31)]
+    assert as_tuples(decode_cf_time(values, "days since 2000-01-01", "360_day")) == \
+           [(2000, 2, 29), (2000, 2, 30), (2001, 1, 6)]
+
+
+def test_standard_calendar_switches_to_julian():
+    """The standard calendar uses Julian dates before 1582-10-15."""
+    dates = decode_cf_time(array([-1., 0.]), "days since 1582-10-15", "standard")
+    assert as_tuples(dates) == [(1582, 10, 4), (1582, 10, 15)]
+
+
+def test_hours_and_reference_time():
+    """Units other than days and reference times of day are included."""
+    dates = decode_cf_time(array([11., 12., -13.]), "hours since 1850-01-01 12:00:00")
+    assert as_tuples(dates) == [(1850, 1, 1), (1850, 1, 2), (1849, 12, 31)]
+
+
+def test_concatenate():
+    first = decode_cf_time(arange(3.), "days since 2000-01-01", "noleap")
+    second = decode_cf_time(arange(3.), "days since 2001-01-01", "noleap")
+    dates = CFDates.concatenate([first, second])
+    assert len(dates) == 6 and dates.year.tolist() == [2000,]*3 + [2001,]*3
+    with raises(ValueError):
+        CFDates.concatenate([first, decode_cf_time(arange(3.), "days since 2000-01-01")])
@@ -0,0 +1,51 @@
+from numpy import allclose, arange, array, isnan, linspace, nan, ones, random
+
+from figure_tools import AnomalyTimeSeries, FigureSpec, LonLatMap, MapPanel, ZonalMeanMap
+from figure_tools.coarsen import block_centers, block_mean, display_shape
+
+
+def test_block_mean():
+    """Blocks are area-weighted, skip missing values, and may be smaller at the ends
+       of the axes."""
+    data = array([[1., 2., nan, 4., 5.],
+                  [3., nan, nan, nan, 7.]])
+    weights = array([[1., 1., 1., 1., 1.],
+                     [3., 3., 3., 3., 3.]])
+    assert allclose(block_mean(data, weights, (2, 2)), [[(1. + 2. + 9.)/5., 4., 26./4.]])
+    assert isnan(block_mean(data, weights, (1, 2))[1, 1])
+    assert allclose(block_centers(arange(5.), 2), [0.5, 2.5, 4.])
+
+
+def test_coarsened_maps():
+    """Maps are block-averaged to about the resolution of their plot, and the global
+       mean is kept."""
+    longitude, latitude = arange(1440)*0.25 + 0.125, linspace(-89.875, 89.875, 720)
+    map_ = LonLatMap(random.random((720, 1440)), longitude, latitude, units="K")
+    coarse = map_.coarsen((100, 500))
+    assert coarse.data.shape == (103, 720)
+    assert coarse.data_label == "K" and coarse.projection is map_.projection
+    assert allclose(coarse.global_mean(), map_.global_mean(), rtol=1.e-3)
+    assert map_.coarsen((1000, 2000)) is map_
+
+    zonal_mean = ZonalMeanMap(random.random((10, 720)), latitude, linspace(1000., 100., 10))
+    assert zonal_mean.coarsen((100, 100)).data.shape == (10, 103)
+
+    # Every time of an anomaly timeseries is kept.
+    anomalies = AnomalyTimeSeries(random.random((720, 30)), arange(30), latitude, "K")
+    assert anomalies.coarsen((100, 10)).data.shape == (103, 30)
+
+
+def test_panels_use_the_display_resolution():
+    """Panels are coarsened to the pixels of the figure, but their colorbar limits are
+       set by the full-resolution data."""
+    longitude, latitude = arange(1440)*0.25 + 0.125, linspace(-89.875, 89.875, 720)
+    data = ones((720, 1440))
+    data[0, 0] = 10.
+    map_ = LonLatMap(data, longitude, latitude)
+    spec = FigureSpec(num_rows=2, num_columns=2, size=(16, 10))
+    assert spec.display_shape() == display_shape((16, 10), 2, 2) == (500, 800)
+    panel = MapPanel.from_map(map_, "map", colorbar_range=[0, 2],
+                              display_shape=spec.display_shape())
+    assert panel.data.shape == (720, 1441)
+    panel = MapPanel.from_map(map_, "map", colorbar_range=[0, 2], display_shape=(100, 200))
+    assert panel.data.shape == (103, 207) and panel.extend == "max"
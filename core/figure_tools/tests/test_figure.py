@@ -0,0 +1,106 @@
+from concurrent.futures import Future
+
+import matplotlib.pyplot as plt
+from numpy import arange, linspace, random
+from PIL import Image
+from pytest import raises
+
+from figure_tools import Figure, FigureSpec, ImageCache, LonLatMap, MapPanel, RenderPool, \
+                         Renderer, ZonalMeanMap
+
+
+def zonal_mean_map():
+    return ZonalMeanMap(random.random((10, 36)), linspace(-87.5, 87.5, 36),
+                        linspace(1000., 100., 10), units="K", y_label="Pressure",
+                        invert_y_axis=True)
+
+
+def test_figure_does_not_use_pyplot(tmp_path):
+    """Figures are not registered with pyplot, and are released when closed."""
+    figures = plt.get_fignums()
+    with Figure(num_rows=1, num_columns=2, title="test") as figure:
+        figure.add_map(zonal_mean_map(), "first", 1)
+        figure.add_map(zonal_mean_map(), "second", 2, colorbar_range=[0, 1])
+        figure.save(tmp_path / "figure.png")
+        assert plt.get_fignums() == figures
+    assert (tmp_path / "figure.png").stat().st_size > 0
+    assert figure.figure is None
+
+
+def test_render_pool(tmp_path):
+    """Figure specifications are rendered in other processes."""
+    paths = [tmp_path / f"figure{i}.png" for i in range(3)]
+    with RenderPool(max_workers=2, renderer_options={"dpi": 50}) as pool:
+        for path in paths:
+            figure = Figure(num_rows=1, num_columns=1)
+            figure.add_map(zonal_mean_map(), "map", 1)
+            pool.submit(figure.spec, path, path.with_suffix(".thumbnail.png"))
+        assert pool.paths() == paths
+    for path in paths:
+        with Image.open(path) as image:
+            assert image.size == (800, 600)
+        assert path.with_suffix(".thumbnail.png").stat().st_size > 0
+
+
+def test_specs_are_hashed_by_contents():
+    """Identical specifications are equal, and are rendered once."""
+    map_ = zonal_mean_map()
+    first = FigureSpec(title="test").add(MapPanel.from_map(map_, "map", 1))
+    second = FigureSpec(title="test").add(MapPanel.from_map(map_, "map", 1))
+    other = FigureSpec(title="test").add(MapPanel.from_map(map_, "map", 1, num_levels=11))
+    assert first == second and hash(first) == hash(second)
+    assert first != other
+    assert len({first, second, other}) == 2
+
+    renderer = Renderer(ImageCache())
+    image = renderer.image(first)
+    assert renderer.image(second) is image
+    assert renderer.image(other) is not image
+
+
+def test_render_modes(tmp_path):
+    """Maps can be drawn as filled contours, cells or images."""
+    map_ = LonLatMap(random.random((90, 144)), arange(144)*2.5, linspace(-89., 89., 90),
+                     units="K")
+    for render_mode in ("contour", "pcolormesh", "image"):
+        with Figure(num_rows=1, num_columns=2) as figure:
+            figure.add_map(map_, "map", 1, render_mode=render_mode)
+            figure.add_map(zonal_mean_map(), "zonal", 2, colorbar_range=[0, 1],
+                           render_mode=render_mode)
+            figure.save(tmp_path / f"{render_mode}.png")
+        assert (tmp_path / f"{render_mode}.png").stat().st_size > 0
+    with raises(ValueError):
+        MapPanel.from_map(map_, "map", render_mode="contours")
+
+
+def test_image_formats_and_thumbnails(tmp_path):
+    """Images are encoded in the background, and thumbnails are made from the same
+       drawing."""
+    figure = Figure(num_rows=1, num_columns=1, size=(8, 6))
+    figure.add_map(zonal_mean_map(), "map", 1)
+    future = figure.save(tmp_path / "figure.webp", tmp_path / "figure.thumbnail.jpg",
+                         wait=False)
+    assert isinstance(future, Future)
+    assert future.result() == tmp_path / "figure.webp"
+    with Image.open(tmp_path / "figure.webp") as image:
+        assert image.format == "WEBP" and image.size == (800, 600)
+    with Image.open(tmp_path / "figure.thumbnail.jpg") as image:
+        assert image.format == "JPEG" and image.size == (480, 360)
+
+    renderer = Renderer(dpi=50, compression=9)
+    with Image.open(renderer.save(figure.spec, tmp_path / "small.png")) as image:
+        assert image.format == "PNG" and image.size == (400, 300)
+    assert renderer.image(figure.spec, "pdf").startswith(b"%PDF")
+    with raises(ValueError):
+        renderer.save(figure.spec, tmp_path / "figure.png", tmp_path / "thumbnail.pdf")
+
+
+def test_figure_dpi(tmp_path):
+    """Figures are drawn at the resolution that their maps were coarsened for."""
+    figure = Figure(num_rows=1, num_columns=1, size=(8, 6), dpi=25)
+    assert figure.spec.display_shape() == (150, 200)
+    figure.add_map(zonal_mean_map(), "map", 1)
+    assert figure.spec.add().dpi == 25
+    renderer = Renderer(dpi=50)
+    with Image.open(renderer.save(figure.spec, tmp_path / "figure.png")) as image:
+        assert image.size == (200, 150)
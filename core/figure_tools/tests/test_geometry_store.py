@@ -0,0 +1,57 @@
+import cartopy.crs as ccrs
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from numpy import array, float32, savez_compressed
+from pytest import warns
+
+from figure_tools import draw_coastlines, GeometryStore
+from figure_tools import geometry_store
+
+
+def write_store(directory):
+    """Writes a store with two coastlines, one of which crosses the date line."""
+    lines = [array([[0., 0.], [10., 10.], [20., 0.]], dtype=float32),
+             array([[170., -10.], [190., -10.]], dtype=float32)]
+    savez_compressed(directory / "coastlines_110m.npz",
+                     vertices=array([x for line in lines for x in line]),
+                     offsets=array([0, 3, 5]))
+
+
+def test_geometries_are_projected_once(tmp_path):
+    """Lines are read from the store and cached per projection."""
+    write_store(tmp_path)
+    store = GeometryStore(tmp_path)
+    lines = store.lines("coastlines")
+    assert [line.shape for line in lines] == [(3, 2), (2, 2)]
+    path = store.path("coastlines", "110m", ccrs.Mollweide())
+    assert store.path("coastlines", "110m", ccrs.Mollweide()) is path
+    assert store.path("coastlines", "110m", ccrs.Robinson()) is not path
+
+    # The line that crosses the date line is split at the edge of the map.
+    x = path.vertices[:, 0]
+    assert x.min() < -1.e7 and x.max() > 1.e7
+
+
+def test_missing_geometries(tmp_path):
+    """Features that are not in the store are not drawn."""
+    store = GeometryStore(tmp_path)
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot(1, 1, 1, projection=ccrs.Mollweide())
+    assert store.draw(axes, "borders") is None
+    write_store(tmp_path)
+    assert GeometryStore(tmp_path).draw(axes, "coastlines") is not None
+
+
+def test_fallback_warns_once(tmp_path, monkeypatch, recwarn):
+    """Drawing a feature that is not in the default store with cartopy warns once."""
+    monkeypatch.setattr(geometry_store, "default_store", GeometryStore(tmp_path))
+    monkeypatch.setattr(geometry_store, "_missing", set())
+    figure = Figure()
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot(1, 1, 1, projection=ccrs.Mollweide())
+    with warns(UserWarning, match="geometry store"):
+        draw_coastlines(axes)
+    recwarn.clear()
+    draw_coastlines(axes)
+    assert not [x for x in recwarn if "geometry store" in str(x.message)]
@@ -0,0 +1,209 @@
+import gc
+import tracemalloc
+
+from numpy import arange, float64, isclose, linspace, random, shares_memory
+from pytest import fixture, raises
+from xarray import Dataset, decode_cf, open_dataset
+
+from figure_tools import get_grid, LonLatMap, set_cell_area, ZonalMeanMap
+from figure_tools import grid as grid_module
+
+
+def array_allocations(constructor, nbytes):
+    """Counts the number of arrays of the input size allocated by a constructor.
+
+    Args:
+        constructor: Function that creates a map object.
+        nbytes: Size in bytes of the data array.
+
+    Returns:
+        The map object and the number of data-sized allocations.
+    """
+    tracemalloc.start()
+    try:
+        map_ = constructor()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return map_, peak//nbytes
+
+
+def grid(nlat=180, nlon=288):
+    latitude = linspace(-89.5, 89.5, nlat)
+    longitude = linspace(0., 360., nlon, endpoint=False)
+    return random.random((nlat, nlon)).astype(float64), longitude, latitude
+
+
+def test_lon_lat_map_no_copy():
+    """Maps hold read-only views of the input data."""
+    data, longitude, latitude = grid()
+    map_, allocations = array_allocations(
+        lambda: LonLatMap(data, longitude, latitude, add_cyclic_point=False),
+        data.nbytes,
+    )
+    assert allocations == 0
+    assert shares_memory(map_.data, data)
+    with raises(ValueError):
+        map_.data[0, 0] = 1.
+    assert data.flags.writeable
+
+
+def test_lon_lat_map_cyclic_point():
+    """The cyclic point is only added when the map is drawn."""
+    data, longitude, latitude = grid()
+    map_, allocations = array_allocations(
+        lambda: LonLatMap(data, longitude, latitude),
+        data.nbytes,
+    )
+    assert allocations == 0
+    assert map_.data.shape == data.shape
+    cyclic_data, cyclic_longitude, _ = map_.cyclic()
+    assert cyclic_data.shape == (data.shape[0], data.shape[1] + 1)
+    assert cyclic_longitude[-1] == longitude[0] + 360.
+
+
+def test_lon_lat_map_global_mean():
+    """The global mean is not biased by a repeated longitude column."""
+    data, longitude, latitude = grid()
+    data[...] = 0.
+    data[:, 0] = longitude.size
+    assert isclose(LonLatMap(data, longitude, latitude).global_mean(), 1.)
+
+
+def test_lon_lat_map_from_xarray_dataset():
+    """Maps created from in-memory datasets do not copy the data."""
+    data, longitude, latitude = grid()
+    dataset = Dataset(
+        {"olr": (["lat", "lon"], data, {"units": "W m-2"})},
+        coords={"lat": ("lat", latitude, {"axis": "Y"}),
+                "lon": ("lon", longitude, {"axis": "X"})},
+    )
+    map_, allocations = array_allocations(
+        lambda: LonLatMap.from_xarray_dataset(dataset, "olr"),
+        data.nbytes,
+    )
+    assert allocations == 0
+
+
+def test_zonal_mean_map_no_copy():
+    """Zonal mean maps hold read-only views of the input arrays."""
+    data, pressure, latitude = grid(nlat=90, nlon=33)
+    data = data.T
+    map_, allocations = array_allocations(
+        lambda: ZonalMeanMap(data, latitude, pressure),
+        data.nbytes,
+    )
+    assert allocations == 0
+    assert shares_memory(map_.data, data)
+    assert not map_.data.flags.writeable
+
+
+def test_zonal_mean_map_streaming(tmp_path):
+    """Annual mean zonal means are read in blocks within the memory budget."""
+    nt, nz, nlat, nlon = 24, 8, 90, 144
+    time = (arange(nt) + 0.5)*365./12.
+    dataset = Dataset(
+        {"v": (["time", "pfull", "lat", "lon"], random.random((nt, nz, nlat, nlon)),
+               {"units": "kg m-3"})},
+        coords={
+            "time": ("time", time, {"axis": "T", "units": "days since 2000-01-01",
+                                    "calendar": "standard"}),
+            "pfull": ("pfull", linspace(1., 1000., nz), {"axis": "Z", "units": "hPa"}),
+            "lat": ("lat", linspace(-89., 89., nlat), {"axis": "Y"}),
+            "lon": ("lon", linspace(0., 357.5, nlon), {"axis": "X"}),
+        },
+    )
+    dataset.to_netcdf(tmp_path / "v.nc")
+    expected = dataset["v"].values[12:].mean(axis=(0, -1))
+
+    with open_dataset(tmp_path / "v.nc") as lazy:
+        budget = 2*nlat*nlon*8
+        map_, allocations = array_allocations(
+            lambda: ZonalMeanMap.from_xarray_dataset(lazy, "v", time_method="annual mean",
+                                                     year=2001, memory_budget=budget),
+            budget,
+        )
+    assert isclose(map_.data, expected).all()
+    assert allocations <= 4
+
+
+def test_zonal_mean_map_annual_mean_by_month():
+    """Annual means of daily data weight each month equally, and partial years
+       raise."""
+    time = arange(365*2) + 0.5
+    data = random.random((time.size, 2, 3, 4))
+    dataset = decode_cf(Dataset(
+        {"v": (["time", "pfull", "lat", "lon"], data, {"units": "K"})},
+        coords={
+            "time": ("time", time, {"axis": "T", "units": "days since 2000-01-01",
+                                    "calendar": "noleap"}),
+            "pfull": ("pfull", [10., 100.], {"axis": "Z", "units": "hPa"}),
+            "lat": ("lat", [-45., 0., 45.], {"axis": "Y"}),
+            "lon": ("lon", [0., 90., 180., 270.], {"axis": "X"}),
+        },
+    ))
+    days = (31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+    edges = [365 + sum(days[:i]) for i in range(13)]
+    expected = sum(data[edges[i]:edges[i + 1]].mean(axis=(0, -1)) for i in range(12))/12.
+    map_ = ZonalMeanMap.from_xarray_dataset(dataset, "v", time_method="annual mean",
+                                            year=2001)
+    assert isclose(map_.data, expected).all()
+    with raises(ValueError):
+        ZonalMeanMap.from_xarray_dataset(dataset.isel(time=slice(0, 500)), "v",
+                                         time_method="annual mean", year=2001)
+
+
+def test_grid_does_not_follow_the_coordinates():
+    """Changing the coordinate arrays in place does not change a shared grid."""
+    data, longitude, latitude = grid(nlat=7, nlon=11)
+    map_ = LonLatMap(data, longitude, latitude)
+    longitude[0] = 1.
+    assert map_.x_data[0] == 0.
+    assert LonLatMap(data, linspace(0., 360., 11, endpoint=False), latitude).grid is \
+           map_.grid
+
+
+def test_shared_grid():
+    """Maps with the same coordinate values share one grid object."""
+    data, longitude, latitude = grid()
+    a = LonLatMap(data, longitude, latitude)
+    b = LonLatMap(data, longitude.copy(), latitude.copy())
+    assert a.grid is b.grid
+    assert a.x_data is b.x_data
+    assert (a + b).grid is a.grid
+    assert not a.x_data.flags.writeable
+    c = LonLatMap(data, longitude + 1., latitude)
+    assert c.grid is not a.grid
+    with raises(ValueError):
+        _ = a + c
+
+
+@fixture
+def registry(monkeypatch):
+    """Keeps the quantities that a test registers for grids out of the process-wide
+       registry."""
+    monkeypatch.setattr(grid_module, "_registered", {})
+
+
+def test_cell_area_weights(registry):
+    """Cell areas registered for a grid are used by every map on the grid."""
+    data, longitude, latitude = grid(nlat=5, nlon=9)
+    map_ = LonLatMap(data, longitude, latitude)
+    cell_area = data*0. + 1.
+    cell_area[0, :] = 0.
+    set_cell_area(map_.grid, cell_area)
+    assert isclose(LonLatMap(data, longitude, latitude).global_mean(), data[1:].mean())
+    mask = data > 0.5
+    assert isclose(map_.global_mean(mask), data[1:][mask[1:]].mean())
+
+
+def test_cell_area_outlives_the_grid(registry):
+    """Registered cell areas are kept after every map on the grid is released."""
+    data, longitude, latitude = grid(nlat=6, nlon=10)
+    data[...] = 1.
+    data[:2] = 0.5
+    cell_area = data*0. + 1.
+    cell_area[:2] = 0.
+    set_cell_area(get_grid(longitude, latitude), cell_area)
+    gc.collect()
+    assert isclose(LonLatMap(data, longitude, latitude).global_mean(), 1.)
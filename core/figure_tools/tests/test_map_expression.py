@@ -0,0 +1,70 @@
+from numpy import allclose, arange, float64, linspace, random
+from pytest import raises
+
+from figure_tools import LonLatMap, MapExpression, ZonalMeanMap
+
+
+def lon_lat_maps(num_maps, nlat=180, nlon=288, units="W m-2"):
+    latitude = linspace(-89.5, 89.5, nlat)
+    longitude = linspace(0., 360., nlon, endpoint=False)
+    return [LonLatMap(random.random((nlat, nlon)), longitude, latitude, units=units)
+            for _ in range(num_maps)]
+
+
+def test_lazy_budget():
+    """A lazy expression matches the eager result."""
+    a, b, c, d = lon_lat_maps(4)
+    expression = a.lazy() + b - c - d
+    assert isinstance(expression, MapExpression)
+    budget = expression.evaluate()
+    assert isinstance(budget, LonLatMap)
+    assert allclose(budget.data, (a + b - c - d).data)
+    assert budget.data_label == a.data_label
+
+
+def test_lazy_scalar_coefficients():
+    """Expressions can be scaled and negated."""
+    a, b = lon_lat_maps(2)
+    result = (2.*a.lazy() - 0.5*(b.lazy() - a)).evaluate()
+    assert allclose(result.data, 2.5*a.data - 0.5*b.data)
+    assert allclose((-a.lazy()).evaluate().data, -1*a.data)
+    assert allclose((a - (b.lazy() + a)).evaluate().data, -1*b.data)
+
+
+def test_lazy_coefficients_promote_integer_maps():
+    """Floating point coefficients promote integer data, like eager arithmetic does."""
+    latitude, longitude = linspace(-89.5, 89.5, 18), linspace(0., 360., 36, endpoint=False)
+    integers = LonLatMap(arange(18*36).reshape(18, 36), longitude, latitude)
+    result = (integers.lazy()*0.5 + integers).evaluate()
+    assert result.data.dtype == float64
+    assert allclose(result.data, 1.5*integers.data)
+
+
+def test_lazy_incompatible_grids():
+    """Incompatible maps are rejected when the expression is evaluated."""
+    a, = lon_lat_maps(1)
+    b, = lon_lat_maps(1, nlat=90)
+    with raises(ValueError):
+        (a.lazy() + b).evaluate()
+
+
+def test_lazy_zonal_mean_map():
+    """ZonalMeanMaps support lazy expressions too."""
+    latitude = linspace(-89.5, 89.5, 180)
+    pressure = linspace(1000., 10., 33)
+    a, b, c = [ZonalMeanMap(random.random((33, 180)), latitude, pressure)
+               for _ in range(3)]
+    result = (a.lazy() + b - c).evaluate()
+    assert isinstance(result, ZonalMeanMap)
+    assert allclose(result.data, a.data + b.data - c.data)
+
+
+def test_zonal_mean_map_rejects_other_maps():
+    """ZonalMeanMaps cannot be combined with other kinds of maps."""
+    latitude = linspace(-89.5, 89.5, 180)
+    a = ZonalMeanMap(random.random((33, 180)), latitude, linspace(1000., 10., 33))
+    b, = lon_lat_maps(1)
+    with raises(ValueError):
+        a + b
+    with raises(ValueError):
+        (a.lazy() - b).evaluate()
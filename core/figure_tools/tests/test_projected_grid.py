@@ -0,0 +1,71 @@
+import cartopy.crs as ccrs
+from numpy import allclose, arange, concatenate, diff, isnan, linspace, random
+
+from figure_tools.projected_grid import pixel_index, projected_grid
+
+
+def test_projected_grid_is_cached():
+    """The mesh is projected once per grid and projection."""
+    longitude, latitude = arange(144)*2.5, linspace(-89., 89., 90)
+    first = projected_grid(longitude, latitude, ccrs.Mollweide())
+    assert projected_grid(longitude.copy(), latitude, ccrs.Mollweide()) is first
+    assert projected_grid(longitude, latitude, ccrs.Robinson()) is not first
+    assert (diff(first.x, axis=-1) > 0).all()
+
+
+def test_column_on_the_edge():
+    """A column on the western edge is repeated at the eastern edge."""
+    longitude, latitude = arange(144)*2.5, linspace(-89., 89., 90)
+    data = random.random((90, 144))
+    projected = projected_grid(longitude, latitude, ccrs.Mollweide())
+    values = projected.project(data)
+    assert values.shape == projected.x.shape == (90, 145)
+    assert allclose(values[:, 0], data[:, 72]) and allclose(values[:, -1], data[:, 72])
+
+
+def test_projected_data_is_continuous():
+    """Longitudes are unrolled from the western edge, and the edge values are
+       interpolated between the first and last columns."""
+    longitude, latitude = arange(144)*2.5 + 1.25, linspace(-89., 89., 90)
+    data = random.random((90, 144))
+    projected = projected_grid(longitude, latitude, ccrs.PlateCarree(central_longitude=180.))
+    assert (diff(projected.x, axis=-1) > 0).all()
+    values = projected.project(data)
+    assert allclose(values[:, 1:-1], data)
+    assert allclose(values[:, 0], 0.5*(data[:, 143] + data[:, 0]))
+    assert allclose(values[:, -1], values[:, 0])
+
+    projected = projected_grid(longitude, latitude, ccrs.Robinson(central_longitude=-90.))
+    assert (diff(projected.x, axis=-1) > 0).all()
+    values = projected.project(data)
+    assert allclose(values[:, 1:-1], concatenate((data[:, 36:], data[:, :36]), axis=-1))
+
+    # A cyclic point is dropped.
+    cyclic = projected_grid(concatenate((longitude, [361.25])), latitude, ccrs.PlateCarree())
+    assert cyclic.columns.size == 144
+
+
+def test_unsupported_grids():
+    """Regional grids and projections without a single boundary meridian fall back to
+       projecting the contours."""
+    latitude = linspace(-89., 89., 90)
+    assert projected_grid(linspace(0., 90., 37), latitude, ccrs.Mollweide()) is None
+    assert projected_grid(arange(144)*2.5, latitude, ccrs.Orthographic()) is None
+
+
+def test_pixel_index():
+    """Pixels are mapped to the closest grid cell, and pixels outside of the
+       projection's domain are left empty."""
+    longitude, latitude = arange(144)*2.5, linspace(-89., 89., 90)
+    data = random.random((90, 144))
+    index = pixel_index(longitude, latitude, ccrs.Mollweide(), (50, 100))
+    assert pixel_index(longitude, latitude, ccrs.Mollweide(), (50, 100)) is index
+    image = index.resample(data)
+    assert image.shape == (50, 100)
+    assert isnan(image[0, 0]) and isnan(image[-1, -1])
+    assert image[25, 50] == data[45, 1]
+
+    # Pixels are empty outside of a regional grid.
+    regional = pixel_index(linspace(0., 90., 37), latitude, ccrs.PlateCarree(), (90, 180))
+    image = regional.resample(random.random((90, 37)))
+    assert not isnan(image[45, 91]) and isnan(image[45, 80]) and isnan(image[45, 140])
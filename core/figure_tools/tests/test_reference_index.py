@@ -0,0 +1,52 @@
+from numpy import allclose, arange, linspace, random
+from pandas import DataFrame
+from xarray import DataArray, Dataset
+
+from figure_tools import build_reference_index, open_reference_index, open_variable_dataset
+from figure_tools.reference_index import reference_index_sources
+
+
+def write_timeseries(tmp_path, years, variable="tas"):
+    """Writes one netCDF file of monthly data per year, and returns a catalog of them."""
+    rows = []
+    for year in years:
+        time = DataArray(arange(12)*30. + 365.*(year - 2000) + 15., dims="time",
+                         attrs={"units": "days since 2000-01-01", "calendar": "noleap"})
+        dataset = Dataset({variable: (("time", "lat", "lon"), random.random((12, 4, 8)))},
+                          coords={"time": time, "lat": linspace(-67.5, 67.5, 4),
+                                  "lon": arange(8)*45.})
+        path = tmp_path / f"atmos.{year}01-{year}12.{variable}.nc"
+        dataset.to_netcdf(path)
+        rows.append({"variable_id": variable, "realm": "atmos", "frequency": "mon",
+                     "time_range": f"{year}01-{year}12", "path": str(path)})
+    return DataFrame(rows)
+
+
+def test_reference_index_matches_files(tmp_path):
+    """An index opens the files as one dataset, and records which files it indexes."""
+    catalog = write_timeseries(tmp_path, [2000, 2001])
+    paths = list(catalog["path"])
+    for name in ["index.json", "index.parq"]:
+        index = build_reference_index(paths, tmp_path / name, parallel=True)
+        assert reference_index_sources(index) == paths
+        with open_reference_index(index) as dataset, \
+             open_variable_dataset(catalog, "tas", parallel=False) as expected:
+            assert allclose(dataset["tas"], expected["tas"])
+            assert "reference_index_sources" not in dataset.attrs
+    assert reference_index_sources(tmp_path / "missing.json") is None
+
+
+def test_stale_reference_index_is_rebuilt(tmp_path):
+    """An index built from other files is rebuilt, and the data is chunked like it is
+       when the files are opened directly."""
+    index = tmp_path / "index.parq"
+    catalog = write_timeseries(tmp_path, [2000, 2001])
+    with open_variable_dataset(catalog, "tas", reference_index=index) as dataset:
+        assert dataset["tas"].shape == (24, 4, 8)
+        assert dataset["tas"].chunks[0] == (12, 12)
+
+    catalog = write_timeseries(tmp_path, [2000, 2001, 2002], variable="pr")
+    with open_variable_dataset(catalog, "pr", reference_index=index) as dataset:
+        assert "pr" in dataset and "tas" not in dataset
+        assert dataset["pr"].shape == (36, 4, 8)
+    assert reference_index_sources(index) == list(catalog["path"])
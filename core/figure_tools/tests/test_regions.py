@@ -0,0 +1,70 @@
+from numpy import allclose, diff, flatnonzero, isnan, linspace, nan, random
+
+from figure_tools import area_weights, continents, get_grid, Region, regional_means, \
+                         Regions
+
+
+def lon_lat_grid(nlat=90, nlon=144):
+    latitude = linspace(-90. + 90./nlat, 90. - 90./nlat, nlat)
+    longitude = linspace(0., 360., nlon, endpoint=False)
+    return get_grid(longitude, latitude)
+
+
+def masked_mean(data, weights, mask):
+    """Reference area-weighted mean over a mask."""
+    w = weights*mask
+    return (data*w).sum(axis=(-2, -1))/w.sum()
+
+
+def test_regional_means_match_masked_means():
+    """All regions and time steps are reduced together, including overlapping regions."""
+    grid = lon_lat_grid()
+    regions = Regions(list(continents) + [Region("Globe", box=(0, 360, -90, 90))])
+    data = random.random((5, 90, 144))
+    means = regional_means(data, grid, regions)
+    assert means.shape == (5, len(regions))
+    weights = area_weights(grid).weights
+    for i, region in enumerate(regions):
+        assert allclose(means[:, i], masked_mean(data, weights, region.mask(grid)))
+    assert allclose(means[:, -1], area_weights(grid).global_mean(data))
+
+
+def test_box_crosses_date_line():
+    """Boxes with negative longitudes select cells on a 0-360 grid."""
+    grid = lon_lat_grid()
+    mask = Region("Pacific", box=(-170, -150, -10, 10)).mask(grid)
+    longitude = grid.x[mask.any(axis=0)]
+    assert longitude.min() >= 190. and longitude.max() <= 210.
+
+
+def test_polygon_matches_box():
+    """A rectangular polygon rasterizes like the equivalent box."""
+    grid = lon_lat_grid()
+    box = Region("box", box=(10, 50, -20, 30)).mask(grid)
+    polygon = Region("polygon", polygon=[(10, -20), (50, -20), (50, 30), (10, 30)]).mask(grid)
+    assert (box[1:-1, 1:-1] == polygon[1:-1, 1:-1]).all()
+
+
+def test_compressed_data_with_nans():
+    """Means of compressed (i.e. land point) data skip NaN values."""
+    grid = lon_lat_grid()
+    data = random.random((3, 90, 144))
+    data[:, :, :72] = nan
+    index = flatnonzero(~isnan(data[0]))
+    compressed = data.reshape((3, -1))[:, index]
+    regions = Regions([Region("east", box=(0, 177, -90, 90)),
+                       Region("west", box=(180, 359, -90, 90))])
+    full = regional_means(data, grid, regions)
+    assert allclose(regional_means(compressed, grid, regions, index=index), full,
+                    equal_nan=True)
+    assert isnan(full[:, 0]).all() and not isnan(full[:, 1]).any()
+
+
+def test_window_crosses_date_line():
+    """Windows are contiguous in longitude and include a halo of cells."""
+    grid = lon_lat_grid()
+    latitude, longitude, shifted = Region("North America", box=(-170, -47, 0, 85)).window(grid)
+    assert (diff(shifted) > 0).all()
+    assert shifted[0] < -170. and shifted[-1] > -47.
+    assert allclose(shifted % 360., grid.x[longitude])
+    assert grid.y[latitude].min() < 0. and grid.y[latitude].max() > 85.
@@ -0,0 +1,77 @@
+from numpy import allclose, arange, cos, isclose, isnan, linspace, meshgrid, pi, random, \
+                  sin
+from scipy.sparse import csr_matrix, load_npz
+from xarray import DataArray
+
+from figure_tools import get_grid, get_regridder, LonLatMap, Regridder
+
+
+def lon_lat_grid(nlat, nlon):
+    latitude = linspace(-90. + 90./nlat, 90. - 90./nlat, nlat)
+    longitude = linspace(0., 360., nlon, endpoint=False)
+    return longitude, latitude
+
+
+def test_bilinear_matches_xarray(tmp_path):
+    """Bilinear weights reproduce xarray's linear interpolation inside the source grid."""
+    source, target = lon_lat_grid(90, 144), lon_lat_grid(60, 96)
+    data = random.random((90, 144))
+    expected = DataArray(data, dims=["y", "x"], coords={"x": source[0], "y": source[1]}) \
+               .interp(x=target[0][target[0] <= source[0][-1]], y=target[1]).values
+    regridded = get_regridder(get_grid(*source), get_grid(*target), "bilinear",
+                              cache_directory=tmp_path)(data)
+    assert allclose(regridded[:, target[0] <= source[0][-1]], expected)
+
+
+def test_batched_leading_dimensions(tmp_path):
+    """Extra leading dimensions are regridded in one product."""
+    source, target = get_grid(*lon_lat_grid(90, 144)), get_grid(*lon_lat_grid(45, 72))
+    data = random.random((3, 2, 90, 144))
+    regridder = get_regridder(source, target, "conservative", cache_directory=tmp_path)
+    regridded = regridder(data)
+    assert regridded.shape == (3, 2, 45, 72)
+    assert allclose(regridded[1, 0], regridder(data[1, 0]))
+
+
+def test_conservative_preserves_global_mean(tmp_path, monkeypatch):
+    """Conservative regridding preserves the area-weighted global mean."""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    source, target = lon_lat_grid(180, 288), lon_lat_grid(64, 128)
+    longitude, latitude = meshgrid(*source)
+    data = 200. + 50.*cos(pi*latitude/180.) + 10.*sin(3.*pi*longitude/180.)
+    model = LonLatMap(random.random((64, 128)), *target)
+    obs = LonLatMap(data, *source)
+    mean = obs.global_mean()
+    obs.regrid_to_map(model, method="conservative")
+    assert obs.grid is model.grid
+    assert isclose(obs.global_mean(), mean, rtol=1.e-3)
+
+
+def test_integer_data():
+    """Integer data (i.e. masks) is regridded to floats, with NaN in the uncovered
+       cells."""
+    source, target = get_grid(arange(4.), arange(2.)), get_grid(arange(2.), arange(2.))
+    weights = csr_matrix(([0.5, 0.5, 1., 1.], ([0, 0, 1, 2], [0, 1, 2, 3])), shape=(4, 8))
+    regridder = Regridder(source, target, weights=weights.astype("float32"))
+    regridded = regridder(arange(8).reshape((2, 4)))
+    assert regridded.dtype.kind == "f"
+    assert allclose(regridded.ravel()[:3], [0.5, 2., 3.]) and isnan(regridded[1, 1])
+
+
+def test_cached_weights(tmp_path):
+    """Weights are computed once per pair of grids and stored on disk."""
+    source, target = get_grid(*lon_lat_grid(30, 48)), get_grid(*lon_lat_grid(20, 36))
+    regridder = get_regridder(source, target, "bilinear", cache_directory=tmp_path)
+    assert get_regridder(source, target, "bilinear") is regridder
+    assert (tmp_path / f"{source.key}-{target.key}-bilinear.npz").is_file()
+
+
+def test_corrupt_cached_weights(tmp_path):
+    """A truncated weights file is recomputed and replaced."""
+    source, target = get_grid(*lon_lat_grid(24, 40)), get_grid(*lon_lat_grid(12, 20))
+    path = tmp_path / f"{source.key}-{target.key}-bilinear.npz"
+    path.write_bytes(b"PK\x03\x04truncated")
+    data = random.random((24, 40))
+    regridded = get_regridder(source, target, "bilinear", cache_directory=tmp_path)(data)
+    assert list(tmp_path.iterdir()) == [path]
+    assert allclose(Regridder(source, target, "bilinear", load_npz(path))(data), regridded)
@@ -0,0 +1,35 @@
+from numpy import abs, allclose, isclose, isnan, linspace, nan, percentile, random
+
+from figure_tools import LonLatMap, MapStatistics
+
+
+def test_statistics():
+    """Quantiles are estimated to about a histogram bin width, and missing values are
+       skipped."""
+    data = random.normal(size=(180, 360))
+    data[:10] = nan
+    statistics = MapStatistics(data)
+    valid = data[10:]
+    assert statistics.nan_count == 3600 and statistics.size == data.size
+    assert statistics.min == valid.min() and statistics.max == valid.max()
+    assert statistics.global_mean is None
+    width = (valid.max() - valid.min())/1000.
+    for q in (0.05, 0.5, 0.95):
+        assert isclose(statistics.quantile(q), percentile(valid, 100*q), atol=width)
+        assert isclose(statistics.quantile(q, absolute=True),
+                       percentile(abs(valid), 100*q), atol=width)
+    assert isnan(MapStatistics(data[:10]).quantile(0.5))
+
+
+def test_map_statistics_are_cached(tmp_path, monkeypatch):
+    """The statistics are calculated once, and again when the map is regridded."""
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    map_ = LonLatMap(random.random((90, 144)), linspace(0., 357.5, 144),
+                     linspace(-89., 89., 90))
+    statistics = map_.statistics
+    assert map_.statistics is statistics
+    assert allclose(map_.global_mean(), statistics.global_mean)
+    map_.regrid_to_map(LonLatMap(random.random((45, 72)), linspace(0., 355., 72),
+                                 linspace(-88., 88., 45)))
+    assert map_.statistics is not statistics
+    assert map_.statistics.size == 45*72
@@ -0,0 +1,55 @@
+from numpy import allclose, arange, datetime64, random
+from pytest import raises
+
+from figure_tools.time_subsets import TimeSubset
+
+
+def monthly(start="2000-01", end="2003-01"):
+    return arange(datetime64(start, "M"), datetime64(end, "M")).astype("datetime64[ns]")
+
+
+def daily(start="2000-01-01", end="2003-01-01", hours=24):
+    return arange(datetime64(start), datetime64(end), hours*3600,
+                  dtype="datetime64[s]").astype("datetime64[ns]")
+
+
+def test_monthly_annual_means():
+    """Monthly data is averaged over each year's twelve months."""
+    time = monthly()
+    data = random.random((time.size, 4, 5))
+    subset = TimeSubset(time)
+    years, means = subset.annual_means(data)
+    assert years.tolist() == [2000, 2001, 2002]
+    assert allclose(means, data.reshape((3, 12, 4, 5)).mean(axis=1))
+    assert allclose(subset.annual_mean(data, 2001), data[12:24].mean(axis=0))
+    assert allclose(subset.seasonal_climatology(data, [2000, 2001], [6, 8]),
+                    data[[5, 6, 7, 17, 18, 19]].mean(axis=0))
+
+
+def test_sub_daily_streaming():
+    """Sub-daily data is reduced to monthly means first, reading small blocks."""
+    time = daily(hours=3)
+    data = random.random((time.size, 3))
+    subset = TimeSubset(time, memory_budget=100*3*8)
+    assert not subset.monthly
+    months = time.astype("datetime64[M]")
+    monthly_means = [data[months == m].mean(axis=0) for m in monthly()]
+    _, means = subset.annual_means(data)
+    assert allclose(means[1], sum(monthly_means[12:24])/12.)
+    assert allclose(subset.annual_climatology(data, [2000, 2002]),
+                    sum(monthly_means)/len(monthly_means))
+
+
+def test_partial_periods():
+    """Incomplete months and years raise errors unless they are dropped or kept."""
+    time = daily("2000-03-15", "2002-07-01")
+    data = random.random((time.size, 2))
+    subset = TimeSubset(time)
+    with raises(ValueError):
+        subset.annual_means(data)
+    years, _ = subset.annual_means(data, partial="drop")
+    assert years.tolist() == [2001]
+    years, _ = subset.annual_means(data, partial="keep")
+    assert years.tolist() == [2000, 2001, 2002]
+    with raises(ValueError):
+        subset.annual_mean(data, 2000, partial="drop")
@@ -1,10 +1,11 @@
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 import json
 from pathlib import Path
 
 from analysis_scripts import AnalysisScript
-from figure_tools import LonLatMap, zonal_mean_vertical_and_column_integrated_map, \
-                         ZonalMeanMap
+from figure_tools import LonLatMap, open_variable_dataset, register_cell_area, RenderPool, \
+                         zonal_mean_vertical_and_column_integrated_map, ZonalMeanMap
 import intake
 
 
@@ -48,12 +49,17 @@ class AerosolAnalysisScript(AnalysisScript):
 
     Attributes:
        description: Longer form description for the analysis.
+       max_workers: Number of variables that are read and reduced concurrently.
+       memory_budget: Maximum number of bytes of 4D data that are read at once,
+                      shared by all of the workers.
        title: Title that describes the analysis.
     """
-    def __init__(self):
+    def __init__(self, max_workers=4, memory_budget=1024*1024*1024):
         self.metadata = Metadata()
         self.description = "Calculates aerosol mass metrics."
         self.title = "Aerosol Masses"
+        self.max_workers = max_workers
+        self.memory_budget = memory_budget
 
     def requires(self):
         """Provides metadata describing what is needed for this analysis to run.
@@ -175,38 +181,52 @@ class AerosolAnalysisScript(AnalysisScript):
 
         # Connect to the catalog and find the necessary datasets.
         catalog = intake.open_esm_datastore(catalog)
+        # Weight the global means by the true cell areas if the catalog has them.
+        register_cell_area(catalog.search(realm=self.metadata.realm))
+
+        # Read and reduce the variables concurrently, splitting the memory budget
+        # between the workers.
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {name: pool.submit(self._make_map, catalog, name, variable, config)
+                       for name, variable in self.metadata.variables().items()}
+            maps = {name: future.result() for name, future in futures.items()}
+
+        with RenderPool(max_workers=self.max_workers) as pool:
+            for name in self.metadata.variables().keys():
+                if name.endswith("column"): continue
+                spec = zonal_mean_vertical_and_column_integrated_map(
+                    maps[name],
+                    maps[f"{name}_column"],
+                    f"{name.replace('_', ' ')} Mass",
+                )
+                pool.submit(spec, Path(png_dir) / f"{name}.png")
+            return pool.paths()
+
+    def _make_map(self, catalog, name, variable, config=None):
+        """Reads a variable and creates its 1980 annual mean map.
 
-        maps = {}
-        for name, variable in self.metadata.variables().items():
-            print(f"Working on variable {name}")
-            # Filter the catalog down to a single dataset for each variable.
-            query_params = {"variable_id": variable}
-            query_params.update(vars(self.metadata))
-            if config:
-                query_params.update(config)
-            datasets = catalog.search(**query_params).to_dataset_dict(progressbar=False)
-            if len(list(datasets.values())) != 1:
-                print(variable, datasets)
-                raise ValueError("could not filter the catalog down to a single dataset.")
-            dataset = list(datasets.values())[0]
-
-            if name.endswith("column"):
-                # Lon-lat maps.
-                maps[name] = LonLatMap.from_xarray_dataset(dataset, variable, year=1980,
-                                                           time_method="annual mean")
-            else:
-                maps[name] = ZonalMeanMap.from_xarray_dataset(dataset, variable, year=1980,
-                                                              time_method="annual mean",
-                                                              invert_y_axis=True)
-
-        figure_paths = []
-        for name in self.metadata.variables().keys():
-            if name.endswith("column"): continue
-            figure = zonal_mean_vertical_and_column_integrated_map(
-                maps[name],
-                maps[f"{name}_column"],
-                f"{name.replace('_', ' ')} Mass",
-            )
-            figure.save(Path(png_dir) / f"{name}.png")
-            figure_paths.append(Path(png_dir)/ f"{name}.png")
-        return figure_paths
+        Args:
+            catalog: intake-esm datastore.
+            name: Name used in this script for the variable.
+            variable: Catalog variable id.
+            config: Dictionary of catalog metadata.
+
+        Returns:
+            A LonLatMap for column variables, otherwise a ZonalMeanMap.
+        """
+        print(f"Working on variable {name}")
+        # Filter the catalog down to a single dataset for each variable.
+        query_params = {"variable_id": variable}
+        query_params.update(vars(self.metadata))
+        if config:
+            query_params.update(config)
+        dataset = open_variable_dataset(catalog.search(**query_params), variable)
+
+        if name.endswith("column"):
+            # Lon-lat maps.
+            return LonLatMap.from_xarray_dataset(dataset, variable, year=1980,
+                                                 time_method="annual mean")
+        budget = self.memory_budget//self.max_workers
+        return ZonalMeanMap.from_xarray_dataset(dataset, variable, year=1980,
+                                                time_method="annual mean",
+                                                invert_y_axis=True, memory_budget=budget)
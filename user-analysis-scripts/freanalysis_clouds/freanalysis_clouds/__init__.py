@@ -3,7 +3,7 @@ import json
 from pathlib import Path
 
 from analysis_scripts import AnalysisScript
-from figure_tools import Figure, LonLatMap
+from figure_tools import Figure, LonLatMap, open_variable_dataset, register_cell_area
 import intake
 
 
@@ -95,6 +95,8 @@ class CloudAnalysisScript(AnalysisScript):
 
         # Connect to the catalog.
         catalog = intake.open_esm_datastore(catalog)
+        # Weight the global means by the true cell areas if the catalog has them.
+        register_cell_area(catalog.search(realm=self.metadata.realm))
 
         if not config:
             config = {}
@@ -105,20 +107,18 @@ class CloudAnalysisScript(AnalysisScript):
             query_params.update(vars(self.metadata))
             if config:
                 query_params.update(config)
-            datasets = catalog.search(**query_params).to_dataset_dict(progressbar=False)
-            if len(list(datasets.values())) != 1:
-                raise ValueError("could not filter the catalog down to a single dataset.", datasets)
-            dataset = list(datasets.values())[0]
+            dataset = open_variable_dataset(catalog.search(**query_params), variable)
 
             # Create Lon-lat maps.
             maps[name] = LonLatMap.from_xarray_dataset(dataset, variable, year=1980,
                                                        time_method="annual mean")
 
         # Create the figure.
-        figure = Figure(num_rows=3, num_columns=1, title="Cloud Fraction", size=(16, 10))
-        figure.add_map(maps["high_cloud_fraction"], "High Clouds", 1, colorbar_range= [0, 100])
-        figure.add_map(maps["middle_cloud_fraction"], "Middle Clouds", 2, colorbar_range=[0, 100])
-        figure.add_map(maps["low_cloud_fraction"], "Low Clouds", 3, colorbar_range=[0, 100])
         output = Path(png_dir) / "cloud-fraction.png"
-        figure.save(output)
+        with Figure(num_rows=3, num_columns=1, title="Cloud Fraction", size=(16, 10)) as figure:
+            figure.add_map(maps["high_cloud_fraction"], "High Clouds", 1, colorbar_range= [0, 100])
+            figure.add_map(maps["middle_cloud_fraction"], "Middle Clouds", 2,
+                           colorbar_range=[0, 100])
+            figure.add_map(maps["low_cloud_fraction"], "Low Clouds", 3, colorbar_range=[0, 100])
+            figure.save(output)
         return [output,]
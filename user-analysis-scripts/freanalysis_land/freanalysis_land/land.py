@@ -1,16 +1,100 @@
-import datetime
+from dataclasses import dataclass
+import hashlib
 import json
 from pathlib import Path
 import re
 
 from analysis_scripts import AnalysisScript
+from figure_tools import area_weights, CFDates, continents, decode_time_axis, draw_borders, \
+                         draw_coastlines, get_grid, open_static_field, Region, regional_means, \
+                         Regions
 import intake
+from matplotlib.colors import Normalize
 import matplotlib.pyplot as plt
-import cartopy
 import cartopy.crs as ccrs
+import numpy as np
 import pandas as pd
 import xarray as xr
 
+from .land_points import LandPoints
+
+
+@dataclass
+class StaticFields:
+    """Time-invariant land model fields, read from the catalog's static files.
+
+    Attributes:
+       land_area: Area of the land part of each grid cell.
+       soil_area: Area of the soil part of each grid cell.
+       land_frac: Fraction of each grid cell covered by land.
+    """
+    land_area: np.ndarray = None
+    soil_area: np.ndarray = None
+    land_frac: np.ndarray = None
+
+    @classmethod
+    def from_catalog(cls, catalog, shape=None):
+        """Reads the static fields that are available in the catalog.
+
+        Parameters:
+        ----------
+        catalog : intake_esm.esm_datastore
+            The data catalog.
+        shape : tuple, optional
+            The (lat, lon) shape of the grid that the fields must match.
+
+        Returns:
+        -------
+        StaticFields
+
+        Raises:
+        ------
+        ValueError
+            If a field does not match the shape of the grid.
+        """
+        fields = {}
+        for name in cls.__annotations__.keys():
+            field = open_static_field(catalog, name)
+            if field is not None:
+                if shape is not None and field.shape != tuple(shape):
+                    raise ValueError(f"static field {name} shape {field.shape} does not"
+                                     f" match the grid {tuple(shape)}.")
+                fields[name] = np.where(np.isfinite(field.values), field.values, 0.)
+        return cls(**fields)
+
+    @classmethod
+    def sources(cls, catalog, frequency="fx"):
+        """Lists the static files of the fields in the catalog.
+
+        Parameters:
+        ----------
+        catalog : intake_esm.esm_datastore
+            The data catalog.
+        frequency : str, optional
+            Frequency used in the catalog for static files.
+
+        Returns:
+        -------
+        list
+            Sorted (path, modification time) tuples, with a time of None for files
+            that cannot be found locally.
+        """
+        df = getattr(catalog, "df", catalog)
+        df = df[df["variable_id"].isin(list(cls.__annotations__.keys())) &
+                (df["frequency"] == frequency)]
+        return sorted((str(path), Path(path).stat().st_mtime if Path(path).is_file() else None)
+                      for path in df["path"])
+
+    def weights(self, var):
+        """Returns the area weights for a variable, or None if there are none.
+
+        Soil variables are weighted by the soil area and all other variables by the
+        land area.
+        """
+        if var in ['cSoil', 'mrso'] and self.soil_area is not None:
+            return self.soil_area
+        return self.land_area
+
 
 class LandAnalysisScript(AnalysisScript):
     """A class for performing various analysis tasks relating to GFDL land model output,
@@ -50,8 +134,8 @@ class LandAnalysisScript(AnalysisScript):
         var : str
             The name of the variable in the dataset to be plotted.
         
-        dates: list
-            The list of dates from the dataframe, converted to period index.
+        dates: figure_tools.CFDates
+            The decoded dates of the time axis.
 
         plt_time : int, optional
             The time index to plot from the variable data. Defaults to the length of `dates` - 1, or last date in dataset.
@@ -87,30 +171,28 @@ class LandAnalysisScript(AnalysisScript):
         projection = ccrs.PlateCarree()
         fig = plt.figure(figsize=(8.5, 11))
 
+        # The regional panels share the colormap normalization of the global map.
+        norm = Normalize(vmin=np.nanmin(data), vmax=np.nanmax(data))
+
         # Global map
         ax_global = fig.add_subplot(3, 1, 1, projection=projection)
-        ax_global.set_title('Global Map')
-        mesh = ax_global.pcolormesh(lon, lat, data, transform=projection, cmap=colormap)
-        ax_global.coastlines()
-
-        # List of bounding boxes for different continents (min_lon, max_lon, min_lat, max_lat)
-        regions = {
-            'North America': [-170, -47, 0, 85],
-            'South America': [-90, -30, -60, 15],
-            'Europe': [-10, 60, 30, 75],
-            'Africa': [-20, 50, -35, 37],
-            'Asia': [60, 150, 5, 75],
-            'Australia': [110, 180, -50, 0]
-        }
-
-        # Create subplots for each region
-        for i, (region, bbox) in enumerate(regions.items(), start=1):
+        date = dates[plt_time]
+        ax_global.set_title(f'Global Map ({date.year:04d}-{date.month:02d}-{date.day:02d})')
+        mesh = ax_global.pcolormesh(lon, lat, data, transform=projection, cmap=colormap,
+                                    norm=norm)
+        draw_coastlines(ax_global)
+
+        # Create subplots for each continent, drawing only the cells inside of it.
+        grid = get_grid(lon.values, lat.values)
+        for i, region in enumerate(continents, start=1):
             ax = fig.add_subplot(3, 3, i + 3, projection=projection)
-            ax.set_extent(bbox, crs=projection)
-            ax.set_title(region)
-            ax.pcolormesh(lon, lat, data, transform=projection, cmap=colormap)
-            ax.coastlines()
-            ax.add_feature(cartopy.feature.BORDERS)
+            ax.set_extent(region.extent, crs=projection)
+            ax.set_title(region.name)
+            y, x, region_lon = region.window(grid)
+            ax.pcolormesh(region_lon, grid.y[y], data[np.ix_(y, x)], transform=projection,
+                          cmap=colormap, norm=norm)
+            draw_coastlines(ax)
+            draw_borders(ax)
 
         # Add colorbar
         fig.colorbar(mesh, ax=ax_global, orientation='horizontal', pad=0.05, aspect=50)
@@ -119,8 +201,197 @@ class LandAnalysisScript(AnalysisScript):
 
         return fig
 
-    def timeseries(self, dataset, var, dates_period, var_range=None, minlon = 0,
-                   maxlon = 360, minlat = -90, maxlat=90, timerange=None, title=''):
+    def open_variable(self, catalog, var):
+        """
+        Open and combine all of the files of a variable, and decode their time axes.
+
+        The time axis of each file is decoded with its own units and calendar, before
+        the files are combined.
+
+        Parameters:
+        ----------
+        catalog : intake_esm.esm_datastore
+            The data catalog.
+        var : str
+            The name of the variable.
+
+        Returns:
+        -------
+        tuple of xarray.Dataset and figure_tools.CFDates
+            The combined dataset and the dates of its time axis.
+        """
+        cat = catalog.search(variable_id=var, realm='land_cmip')
+        datasets = cat.to_dataset_dict(cdf_kwargs={'chunks': {'time': 12}, 'decode_times': False})
+        datasets = list(dict(sorted(datasets.items())).values())
+        dates = CFDates.concatenate([decode_time_axis(d.time) for d in datasets])
+        return xr.concat(datasets, dim='time'), dates
+
+    @staticmethod
+    def period_index(dates):
+        """
+        Convert decoded dates to a daily pandas.PeriodIndex.
+
+        Parameters:
+        ----------
+        dates : figure_tools.CFDates
+            The decoded dates.
+
+        Returns:
+        -------
+        pandas.PeriodIndex
+        """
+        return pd.PeriodIndex.from_fields(year=dates.year, month=dates.month,
+                                          day=dates.day, freq='D')
+
+    def static_fields(self, catalog, dataset):
+        """
+        Get the static land model fields for the grid of a dataset.
+
+        The static fields are read only once per grid and set of static files, so
+        catalogs with different (or no) static files on the same grid do not share
+        them.
+
+        Parameters:
+        ----------
+        catalog : intake_esm.esm_datastore
+            The data catalog.
+
+        dataset : xarray.Dataset
+            A dataset on the grid of interest.
+
+        Returns:
+        -------
+        StaticFields
+        """
+        grid = get_grid(dataset.lon.values, dataset.lat.values)
+        shape = (grid.y.size, grid.x.size)
+        sources = repr(StaticFields.sources(catalog)).encode("utf-8")
+        return grid.cached(f"land_static_fields:{hashlib.sha1(sources).hexdigest()}",
+                           lambda: StaticFields.from_catalog(catalog, shape), register=True)
+
+    def land_points(self, dataset, var, static=None):
+        """
+        Get the land cells of the grid of a dataset.
+
+        The land cells are found from the land area in the static fields if it is
+        available, otherwise from the finite values of the first time step of the
+        variable, and are cached on the grid for each distinct mask.
+
+        Parameters:
+        ----------
+        dataset : xarray.Dataset
+            A dataset on the grid of interest.
+        var : str
+            The name of a variable in the dataset.
+        static : StaticFields, optional
+            The static fields for the grid.
+
+        Returns:
+        -------
+        LandPoints
+
+        Raises:
+        ------
+        ValueError
+            If the static land area does not match the shape of the grid.
+        """
+        grid = get_grid(dataset.lon.values, dataset.lat.values)
+        shape = (grid.y.size, grid.x.size)
+        if static is not None and static.land_area is not None and \
+           static.land_area.shape != shape:
+            raise ValueError(f"static land area shape {static.land_area.shape} does not"
+                             f" match the grid {shape}.")
+
+        if static is not None and static.land_area is not None:
+            mask = static.land_area > 0
+        else:
+            mask = np.isfinite(dataset[var][0].values)
+        key = f"land_points:{hashlib.sha1(mask.tobytes()).hexdigest()}"
+        return grid.cached(key, lambda: LandPoints.from_mask(mask), register=True)
+
+    def regional_means(self, dataset, var, regions, weights=None, var_range=None,
+                       time_chunk=12, points=None):
+        """
+        Calculate area-weighted means of a variable over several regions for every
+        time step.
+
+        Only the land cells are gathered into a compact (time, cell) array, so the
+        reduction does not operate on the ocean fill values of the full grid, and all
+        of the regions are reduced together.
+
+        Parameters:
+        ----------
+        dataset : xarray.Dataset
+            The dataset containing the variable.
+        var : str
+            The name of the variable.
+        regions : figure_tools.Regions
+            The regions.
+        weights : numpy.ndarray, optional
+            The (lat, lon) area weights (i.e. land or soil area).  If not provided, the
+            weights are proportional to cos(latitude).
+        var_range : tuple of float, optional
+            The range of variable values to include (min, max]. Default is (0, inf).
+        time_chunk : int, optional
+            The number of time steps that are read at once.
+        points : LandPoints, optional
+            The land cells of the grid.  Defaults to land_points(dataset, var).
+
+        Returns:
+        -------
+        numpy.ndarray
+            The weighted means with (time, region) dimensions.
+        """
+        grid = get_grid(dataset.lon.values, dataset.lat.values)
+        if points is None:
+            points = self.land_points(dataset, var)
+        if weights is None:
+            weights = area_weights(grid).weights
+        cells = points.subset(weights > 0)
+        lower, upper = var_range if var_range is not None else (0, np.inf)
+
+        means = []
+        for values in cells.gather_blocks(dataset[var], time_chunk):
+            values = np.where((values > lower) & (values <= upper), values, np.nan)
+            means.append(regional_means(values, grid, regions, weights, cells.index))
+        return np.concatenate(means)
+
+    def weighted_mean(self, dataset, var, weights=None, var_range=None, minlon=0,
+                      maxlon=360, minlat=-90, maxlat=90, time_chunk=12, points=None):
+        """
+        Calculate area-weighted means of a variable over a longitude/latitude box for
+        every time step.
+
+        Parameters:
+        ----------
+        dataset : xarray.Dataset
+            The dataset containing the variable.
+        var : str
+            The name of the variable.
+        weights : numpy.ndarray, optional
+            The (lat, lon) area weights (i.e. land or soil area).  If not provided, the
+            weights are proportional to cos(latitude).
+        var_range : tuple of float, optional
+            The range of variable values to include (min, max]. Default is (0, inf).
+        minlon, maxlon, minlat, maxlat : float, optional
+            The bounds of the longitude/latitude box.
+        time_chunk : int, optional
+            The number of time steps that are read at once.
+        points : LandPoints, optional
+            The land cells of the grid.  Defaults to land_points(dataset, var).
+
+        Returns:
+        -------
+        numpy.ndarray
+            The weighted mean for each time step.
+        """
+        box = Regions([Region('box', box=(minlon, maxlon, minlat, maxlat))])
+        return self.regional_means(dataset, var, box, weights, var_range, time_chunk,
+                                   points)[:, 0]
+
+    def timeseries(self, dataset, var, dates, var_range=None, minlon = 0,
+                   maxlon = 360, minlat = -90, maxlat=90, timerange=None, title='',
+                   weights=None, points=None):
         '''
         Generate a time series plot of the specified variable from a dataset within a
         given geographic and temporal range.
@@ -131,8 +402,8 @@ class LandAnalysisScript(AnalysisScript):
             The dataset containing the variable to be plotted.
         var : str
             The name of the variable to plot from the dataset.
-        dates_period : pandas.DatetimeIndex
-            The dates for the time series data.
+        dates : figure_tools.CFDates
+            The decoded dates of the time axis.
         var_range : tuple of float, optional
             The range of variable values to include in the plot (min, max). If not provided,
             the default range is (0, inf).
@@ -149,6 +420,10 @@ class LandAnalysisScript(AnalysisScript):
             available years in the dataset will be plotted.
         title : str, optional
             The title of the plot. Default is an empty string.
+        weights : numpy.ndarray, optional
+            The (lat, lon) area weights (i.e. land or soil area from the static fields).
+        points : LandPoints, optional
+            The land cells of the grid.
 
         Returns:
         --------
@@ -158,27 +433,13 @@ class LandAnalysisScript(AnalysisScript):
         Notes:
         ------
         The function filters the dataset based on the provided variable range, longitude,
-        and latitude bounds. It then calculates the monthly and annual means of the
-        specified variable and plots the seasonal and annual means.
+        and latitude bounds. It then calculates the area-weighted monthly and annual means
+        of the specified variable and plots the seasonal and annual means.
         '''
-        if var_range is not None:
-            data_filtered = dataset.where((dataset[var] > var_range[0]) & 
-                                          (dataset[var] <= var_range[1]) &
-                                          (dataset.lat >= minlat) &
-                                          (dataset.lon >= minlon) &
-                                          (dataset.lat <= maxlat) &
-                                          (dataset.lon <= maxlon))
-        else:
-            data_filtered = dataset.where((dataset[var] > 0) &
-                                          (dataset.lat >= minlat) &
-                                          (dataset.lon >= minlon) &
-                                          (dataset.lat <= maxlat) &
-                                          (dataset.lon <= maxlon))
-        data_filtered['time'] = dates_period
-
-        data_df = pd.DataFrame(index = dates_period)
-        data_df['monthly_mean'] = data_filtered.resample(time='YE').mean(dim=['lat','lon'],
-                                                                         skipna=True)[var].values
+        data_df = pd.DataFrame(index = self.period_index(dates))
+        data_df['monthly_mean'] = self.weighted_mean(dataset, var, weights, var_range,
+                                                     minlon, maxlon, minlat, maxlat,
+                                                     points=points)
         data_df['monthly_shift'] = data_df['monthly_mean'].shift(1)
 
         if timerange is not None:
@@ -215,24 +476,19 @@ class LandAnalysisScript(AnalysisScript):
         # Soil Carbon
         var = 'cSoil'
         print('Soil Carbon Analysis')
-        cat = col.search(variable_id=var, realm='land_cmip')
-        other_dict = cat.to_dataset_dict(cdf_kwargs={'chunks': {'time': 12}, 'decode_times': False})
-        combined_dataset = xr.concat(list(dict(sorted(other_dict.items())).values()), dim='time')
+        combined_dataset, dates = self.open_variable(col, var)
 
-        # Other data:
-        # land_static_file = re.search('land_static:\s([\w.]*)',combined_dataset.associated_files).group(1)
-        # STATIC FILES SHOULD BE PART OF THE CATALOG FOR EASY ACCESS
+        static = self.static_fields(col, combined_dataset)
+        points = self.land_points(combined_dataset, var, static)
 
         # Select Data and plot
-        dates = [datetime.date(1,1,1) + datetime.timedelta(d) for d in combined_dataset['time'].values] # Needs to be made dynamic
-        dates_period = pd.PeriodIndex(dates,freq='D')
-
         sm_fig = self.global_map(combined_dataset,var,dates,title='Soil Carbon Content (kg/m^2)')
         figure_paths = [Path(png_dir) / f"{var}_global_map.png",]
         plt.savefig(str(figure_paths[-1]))
         plt.close()
 
-        ts_fig = self.timeseries(combined_dataset,var,dates_period,title='Global Average Soil Carbon')
+        ts_fig = self.timeseries(combined_dataset,var,dates,title='Global Average Soil Carbon',
+                                 weights=static.weights(var), points=points)
         figure_paths.append(Path(png_dir) / f"{var}_global_ts.png")
         plt.savefig(str(figure_paths[-1]))
         plt.close()
@@ -240,18 +496,9 @@ class LandAnalysisScript(AnalysisScript):
         # Soil Moisture
         var = 'mrso'
         print ('Soil Moisture Analysis')
-        cat = col.search(variable_id=var,realm='land_cmip')
-        other_dict = cat.to_dataset_dict(cdf_kwargs={'chunks':{'time':12},'decode_times':False})
-        combined_dataset = xr.concat(list(dict(sorted(other_dict.items())).values()), dim='time')
-
-        # Other data:
-        # soil_area_file = re.search('soil_area:\s([\w.]*)',combined_dataset.associated_files).group(1)
-        # STATIC FILES SHOULD BE PART OF THE CATALOG FOR EASY ACCESS
+        combined_dataset, dates = self.open_variable(col, var)
 
         # Select Data and plot
-        dates = [datetime.date(1,1,1) + datetime.timedelta(d) for d in combined_dataset['time'].values] # Needs to be made dynamic
-        dates_period = pd.PeriodIndex(dates,freq='D')
-
         sm_fig = self.global_map(combined_dataset,var,dates,title='Soil Moisture (kg/m^2)')
         figure_paths.append(Path(png_dir) / f"{var}_global_map.png")
         plt.savefig(str(figure_paths[-1]))
@@ -0,0 +1,116 @@
+import numpy as np
+
+
+class LandPoints(object):
+    """Compressed representation of the land cells of a longitude-latitude grid.
+
+    Land model output is mostly ocean fill values, so reductions are done on
+    (..., cell) arrays that are gathered from the land cells only.  The flat grid
+    index of each cell is kept, so the values can be scattered back onto the grid
+    for plotting.
+
+    Attributes:
+       index: Flat (lat*lon) grid index of each land cell.
+       shape: Tuple of the (lat, lon) shape of the grid.
+    """
+    def __init__(self, index, shape):
+        self.index = np.asarray(index, dtype=np.intp)
+        self.shape = tuple(shape)
+
+    @classmethod
+    def from_mask(cls, mask):
+        """
+        Create the land points from a boolean mask.
+
+        Parameters:
+        ----------
+        mask : numpy.ndarray
+            A (lat, lon) array that is True for land cells (i.e. land_area > 0 from the
+            static file, or the finite values of the first time step).
+
+        Returns:
+        -------
+        LandPoints
+        """
+        mask = np.asarray(mask, dtype=bool)
+        return cls(np.flatnonzero(mask), mask.shape)
+
+    @property
+    def size(self):
+        """The number of land cells."""
+        return self.index.size
+
+    def subset(self, mask):
+        """
+        Select the land cells inside of a region.
+
+        Parameters:
+        ----------
+        mask : numpy.ndarray
+            A (lat, lon) boolean array that is True inside of the region.
+
+        Returns:
+        -------
+        LandPoints
+        """
+        return LandPoints(self.index[np.asarray(mask).ravel()[self.index]], self.shape)
+
+    def gather(self, data):
+        """
+        Gather the land cells of gridded data.
+
+        Parameters:
+        ----------
+        data : numpy.ndarray
+            An array with (..., lat, lon) dimensions.
+
+        Returns:
+        -------
+        numpy.ndarray
+            An array with (..., cell) dimensions.
+        """
+        data = np.asarray(data)
+        return data.reshape(data.shape[:-2] + (-1,))[..., self.index]
+
+    def gather_blocks(self, data_array, time_chunk=12):
+        """
+        Read a (time, lat, lon) variable a block of time steps at a time and gather
+        its land cells.
+
+        Parameters:
+        ----------
+        data_array : xarray.DataArray
+            The variable.
+        time_chunk : int, optional
+            The number of time steps that are read at once.
+
+        Yields:
+        -------
+        numpy.ndarray
+            Arrays with (time, cell) dimensions.
+        """
+        for start in range(0, data_array.shape[0], time_chunk):
+            yield self.gather(data_array[start:start + time_chunk].values)
+
+    def scatter(self, values, fill_value=np.nan):
+        """
+        Scatter land cell values back onto the grid.
+
+        Parameters:
+        ----------
+        values : numpy.ndarray
+            An array with (..., cell) dimensions.
+        fill_value : float, optional
+            The value of the cells that are not land cells.
+
+        Returns:
+        -------
+        numpy.ndarray
+            An array with (..., lat, lon) dimensions.
+        """
+        values = np.asarray(values)
+        dtype = np.result_type(values, np.float32)
+        grid = np.full(values.shape[:-1] + (self.shape[0]*self.shape[1],), fill_value,
+                       dtype=dtype)
+        grid[..., self.index] = values
+        return grid.reshape(values.shape[:-1] + self.shape)
@@ -0,0 +1,27 @@
+from numpy import arange, isnan, nan, zeros
+from numpy.random import default_rng
+
+from freanalysis_land.land_points import LandPoints
+
+
+def test_gather_scatter():
+    data = default_rng(0).random((4, 6, 8))
+    data[:, :2, :] = nan
+    points = LandPoints.from_mask(~isnan(data[0]))
+    assert points.size == 4*8
+    land = points.gather(data)
+    assert land.shape == (4, 32)
+    assert not isnan(land).any()
+    grid = points.scatter(land)
+    assert (isnan(grid) == isnan(data)).all()
+    assert (grid[~isnan(grid)] == data[~isnan(data)]).all()
+
+
+def test_subset():
+    mask = arange(48).reshape((6, 8)) % 2 == 0
+    points = LandPoints.from_mask(mask)
+    box = zeros((6, 8), dtype=bool)
+    box[:3, :] = True
+    subset = points.subset(box)
+    assert subset.size == 12
+    assert (subset.index < 24).all()
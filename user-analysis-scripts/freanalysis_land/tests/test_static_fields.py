@@ -0,0 +1,71 @@
+from numpy import arange, linspace, ones, zeros
+from pandas import DataFrame
+from pytest import raises
+from xarray import Dataset
+
+from freanalysis_land.land import LandAnalysisScript, StaticFields
+
+
+def write_static_catalog(tmp_path, shape, offset=0.):
+    """Writes a land area file with the input (lat, lon) shape, and returns a
+       catalog of it."""
+    dataset = Dataset({"land_area": (("lat", "lon"), ones(shape))},
+                      coords={"lat": linspace(-60., 60., shape[0]) + offset,
+                              "lon": arange(shape[1])*360./shape[1] + offset})
+    path = tmp_path / "land.static.nc"
+    dataset.to_netcdf(path)
+    return DataFrame([{"variable_id": "land_area", "frequency": "fx",
+                       "path": str(path)}])
+
+
+def dataset_on_grid(shape, offset):
+    """Returns a dataset with one variable on a grid that no other test uses."""
+    return Dataset({"gpp": (("time", "lat", "lon"), ones((2,) + shape))},
+                   coords={"lat": linspace(-60., 60., shape[0]) + offset,
+                           "lon": arange(shape[1])*360./shape[1] + offset})
+
+
+def test_static_fields_match_the_grid(tmp_path):
+    catalog = write_static_catalog(tmp_path, (4, 8))
+    static = StaticFields.from_catalog(catalog, (4, 8))
+    assert static.land_area.shape == (4, 8)
+    with raises(ValueError):
+        StaticFields.from_catalog(catalog, (5, 8))
+
+
+def test_static_fields_are_cached_per_catalog(tmp_path):
+    script = LandAnalysisScript()
+    dataset = dataset_on_grid((4, 8), 0.75)
+    empty = DataFrame(columns=["variable_id", "frequency", "path"])
+    assert script.static_fields(empty, dataset).land_area is None
+    (tmp_path / "a").mkdir()
+    catalog = write_static_catalog(tmp_path / "a", (4, 8), offset=0.75)
+    static = script.static_fields(catalog, dataset)
+    assert static.land_area.shape == (4, 8)
+    assert script.static_fields(catalog, dataset) is static
+    assert script.static_fields(empty, dataset).land_area is None
+
+
+def test_land_points_reject_mismatched_static_fields():
+    script = LandAnalysisScript()
+    dataset = dataset_on_grid((4, 8), 0.25)
+    with raises(ValueError):
+        script.land_points(dataset, "gpp", StaticFields(land_area=zeros((5, 8))))
+    points = script.land_points(dataset, "gpp", StaticFields(land_area=ones((4, 8))))
+    assert points.size == 32
+
+
+def test_land_points_are_cached_per_variable_and_land_area():
+    script = LandAnalysisScript()
+    dataset = dataset_on_grid((4, 8), 0.5)
+    dataset["nee"] = dataset.gpp.where(dataset.lat > 0)
+    assert script.land_points(dataset, "gpp").size == 32
+    assert script.land_points(dataset, "nee").size == 16
+    other = dataset.copy()
+    other["gpp"] = dataset.gpp.where(dataset.lon < 180.)
+    assert script.land_points(other, "gpp").size == 16
+    land_area = zeros((4, 8))
+    land_area[:, :2] = 1.
+    assert script.land_points(dataset, "gpp", StaticFields(land_area=land_area)).size == 8
+    land_area[:, :4] = 1.
+    assert script.land_points(dataset, "gpp", StaticFields(land_area=land_area)).size == 16
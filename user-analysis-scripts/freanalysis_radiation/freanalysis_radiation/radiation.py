@@ -4,7 +4,8 @@ from pathlib import Path
 
 from analysis_scripts import AnalysisScript
 from figure_tools import AnomalyTimeSeries, GlobalMeanTimeSeries, LonLatMap, \
-                         observation_vs_model_maps, radiation_decomposition, \
+                         observation_vs_model_maps, open_variable_dataset, \
+                         radiation_decomposition, register_cell_area, RenderPool, \
                          timeseries_and_anomalies
 import intake
 
@@ -50,12 +51,14 @@ class RadiationAnalysisScript(AnalysisScript):
 
     Attributes:
        description: Longer form description for the analysis.
+       max_workers: Number of processes that render the figures.
        title: Title that describes the analysis.
     """
-    def __init__(self):
+    def __init__(self, max_workers=4):
         self.metadata = Metadata()
         self.description = "Calculates radiative flux metrics."
         self.title = "Radiative Fluxes"
+        self.max_workers = max_workers
 
     def requires(self):
         """Provides metadata describing what is needed for this analysis to run.
@@ -218,6 +221,8 @@ class RadiationAnalysisScript(AnalysisScript):
 
         # Connect to the catalog and find the necessary datasets.
         catalog = intake.open_esm_datastore(catalog)
+        # Weight the global means by the true cell areas if the catalog has them.
+        register_cell_area(catalog.search(realm=self.metadata.realm))
 
         anomalies = {}
         maps = {}
@@ -228,12 +233,7 @@ class RadiationAnalysisScript(AnalysisScript):
             query_params.update(vars(self.metadata))
             if config:
                 query_params.update(config)
-            datasets = catalog.search(**query_params).to_dataset_dict(
-                progressbar=True,
-            )
-            if len(list(datasets.values())) != 1:
-                raise ValueError(f"could not filter the dataset down to just {variable}.")
-            dataset = list(datasets.values())[0]
+            dataset = open_variable_dataset(catalog.search(**query_params), variable)
 
             # Lon-lat maps.
             maps[name] = LonLatMap.from_xarray_dataset(
@@ -253,41 +253,37 @@ class RadiationAnalysisScript(AnalysisScript):
                     variable,
                 )
 
-        figure_paths = []
-
-        # OLR anomally timeseries.
-        figure = timeseries_and_anomalies(timeseries["rlut"], anomalies["rlut"],
-                                          "OLR Global Mean & Anomalies")
-        figure_paths.append(Path(png_dir) / "olr-anomalies.png")
-        figure.save(figure_paths[-1])
+        # The figures are rendered in other processes while the budgets are calculated.
+        with RenderPool(max_workers=self.max_workers) as pool:
+            # OLR anomally timeseries.
+            spec = timeseries_and_anomalies(timeseries["rlut"], anomalies["rlut"],
+                                            "OLR Global Mean & Anomalies")
+            pool.submit(spec, Path(png_dir) / "olr-anomalies.png")
 
-        # OLR.
-        figure = radiation_decomposition(maps["rlutcsaf"], maps["rlutaf"],
-                                         maps["rlutcs"], maps["rlut"], "OLR")
-        figure_paths.append(Path(png_dir) / "olr.png")
-        figure.save(figure_paths[-1])
+            # OLR.
+            spec = radiation_decomposition(maps["rlutcsaf"], maps["rlutaf"],
+                                           maps["rlutcs"], maps["rlut"], "OLR")
+            pool.submit(spec, Path(png_dir) / "olr.png")
 
-        # SW TOTA.
-        figure = radiation_decomposition(maps["rsutcsaf"], maps["rsutaf"],
-                                         maps["rsutcs"], maps["rsut"],
-                                         "Shortwave Outgoing Toa")
-        figure_paths.append(Path(png_dir) / "sw-up-toa.png")
-        figure.save(figure_paths[-1])
+            # SW TOTA.
+            spec = radiation_decomposition(maps["rsutcsaf"], maps["rsutaf"],
+                                           maps["rsutcs"], maps["rsut"],
+                                           "Shortwave Outgoing Toa")
+            pool.submit(spec, Path(png_dir) / "sw-up-toa.png")
 
-        # Surface radiation budget.
-        surface_budget = []
-        for suffix in ["csaf", "af", "cs", ""]:
-            surface_budget.append(maps[f"rlds{suffix}"] + maps[f"rsds{suffix}"] -
-                                  maps[f"rlus{suffix}"] - maps[f"rsus{suffix}"])
-        figure = radiation_decomposition(*surface_budget, "Surface Radiation Budget")
-        figure_paths.append(Path(png_dir) / "surface-radiation-budget.png")
-        figure.save(figure_paths[-1])
+            # Surface radiation budget.
+            surface_budget = []
+            for suffix in ["csaf", "af", "cs", ""]:
+                surface_budget.append((maps[f"rlds{suffix}"].lazy() + maps[f"rsds{suffix}"] -
+                                       maps[f"rlus{suffix}"] - maps[f"rsus{suffix}"]).evaluate())
+            spec = radiation_decomposition(*surface_budget, "Surface Radiation Budget")
+            pool.submit(spec, Path(png_dir) / "surface-radiation-budget.png")
 
-        # TOA radiation budget.
-        toa_budget = []
-        for suffix in ["csaf", "af", "cs", ""]:
-            toa_budget.append(maps[f"rsdt"] - maps[f"rlut{suffix}"] - maps[f"rsut{suffix}"])
-        figure = radiation_decomposition(*toa_budget, "TOA Radiation Budget")
-        figure_paths.append(Path(png_dir) / "toa-radiation-budget.png")
-        figure.save(figure_paths[-1])
-        return figure_paths
+            # TOA radiation budget.
+            toa_budget = []
+            for suffix in ["csaf", "af", "cs", ""]:
+                toa_budget.append((maps[f"rsdt"].lazy() - maps[f"rlut{suffix}"] -
+                                   maps[f"rsut{suffix}"]).evaluate())
+            spec = radiation_decomposition(*toa_budget, "TOA Radiation Budget")
+            pool.submit(spec, Path(png_dir) / "toa-radiation-budget.png")
+            return pool.paths()
@@ -295,9 +295,8 @@ class RadiationVsCeresAnalysisScript(AnalysisScript):
         )
         obs_map.regrid_to_map(model_map)
 
-        figure = chuck_radiation(model_map, obs_map, f"{title}")
         output = Path(png_dir) / f"{title.lower().replace(' ', '-')}.png"
-        figure.save(output)
+        chuck_radiation(model_map, obs_map, f"{title}").save(output)
         return output
 
 